@@ -0,0 +1,201 @@
+import heapq
+
+
+class RunningStats:
+    """
+    This class keeps count, sum, minimum and maximum of a metric up to date as values come and go.
+    Minimum and maximum are kept in heaps; removed entries are only marked (tombstones)
+    and dropped when they reach the top of a heap, so every operation is O(log n) amortized.
+    Heaps hold only (value, seq) pairs, which garbage collector doesn't track; items are kept in a dict.
+    Parent Class: None
+    Args:
+        items (dict): seq -> item mapping, may be shared between many RunningStats
+        count (int): number of values
+        total (float): sum of values
+    """
+
+    def __init__(self, items=None):
+        self.items = {} if items is None else items
+        self.count = 0
+        self.total = 0
+        self._max_heap = []
+        self._min_heap = []
+        self._removed_from_max = set()
+        self._removed_from_min = set()
+
+    def add(self, value, seq, item):
+        """
+        Adds value
+        param: value: metric value
+        param: seq: unique, increasing number of the entry; on equal values lower seq wins
+        param: item: object returned by `max` and `min`
+        """
+
+        self.count += 1
+        self.total += value
+        self.items[seq] = item
+        heapq.heappush(self._max_heap, (-value, seq))
+        heapq.heappush(self._min_heap, (value, seq))
+
+    def add_many(self, values, seqs, items):
+        """
+        Adds many values at once; batches bigger than about 1/8 of the heap are merged
+        with one heapify, which is cheaper than pushing values one by one
+        param: values, seqs, items: lists of the same length, see `add`
+        """
+
+        if 8 * len(values) < len(self._max_heap):
+            for value, seq, item in zip(values, seqs, items):
+                self.add(value, seq, item)
+            return
+        self.count += len(values)
+        self.total += sum(values)
+        self.items.update(zip(seqs, items))
+        self._max_heap.extend(zip([-value for value in values], seqs))
+        self._min_heap.extend(zip(values, seqs))
+        heapq.heapify(self._max_heap)
+        heapq.heapify(self._min_heap)
+
+    def remove(self, value, seq):
+        """
+        Removes value previously added with the same seq
+        """
+
+        self.count -= 1
+        self.total -= value
+        if not self.count:
+            self.total = 0
+        self.items.pop(seq, None)
+        self._removed_from_max.add(seq)
+        self._removed_from_min.add(seq)
+        if len(self._removed_from_max) > self.count:
+            self._compact()
+
+    def _compact(self):
+        self._max_heap = [entry for entry in self._max_heap if entry[1] not in self._removed_from_max]
+        self._min_heap = [entry for entry in self._min_heap if entry[1] not in self._removed_from_min]
+        heapq.heapify(self._max_heap)
+        heapq.heapify(self._min_heap)
+        self._removed_from_max.clear()
+        self._removed_from_min.clear()
+
+    @staticmethod
+    def _top(heap, removed):
+        while heap and heap[0][1] in removed:
+            removed.discard(heapq.heappop(heap)[1])
+        return heap[0] if heap else None
+
+    def max(self):
+        """
+        Return: item with largest value (first added on ties) or None if empty
+        """
+
+        top = self._top(self._max_heap, self._removed_from_max)
+        return self.items[top[1]] if top else None
+
+    def min(self):
+        """
+        Return: item with smallest value (first added on ties) or None if empty
+        """
+
+        top = self._top(self._min_heap, self._removed_from_min)
+        return self.items[top[1]] if top else None
+
+    def max_value(self):
+        top = self._top(self._max_heap, self._removed_from_max)
+        return -top[0] if top else None
+
+    def min_value(self):
+        top = self._top(self._min_heap, self._removed_from_min)
+        return top[0] if top else None
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        """
+        Return: dict with 'count', 'sum', 'mean', 'min' and 'max' values
+        """
+
+        return {'count': self.count, 'sum': self.total, 'mean': self.mean(),
+                'min': self.min_value(), 'max': self.max_value()}
+
+
+class MetricAggregates:
+    """
+    This class keeps RunningStats of area and perimeter, for all shapes and for every shape class.
+    Compact and interned shapes are counted as their `full_class`, e.g. as geometry.Circle.
+    Parent Class: None
+    Args:
+        shapes (dict): seq -> shape mapping shared by all RunningStats
+        total (dict): metric name -> RunningStats of all shapes
+        by_class (dict): shape class -> metric name -> RunningStats
+    """
+
+    METRICS = ('area', 'perimeter')
+
+    def __init__(self):
+        self.shapes = {}
+        self.total = {metric: RunningStats(self.shapes) for metric in self.METRICS}
+        self.by_class = {}
+
+    @staticmethod
+    def _class_of(shape_class):
+        return getattr(shape_class, 'full_class', shape_class)
+
+    def add(self, shape, seq):
+        shape_class = self._class_of(shape.__class__)
+        class_stats = self.by_class.get(shape_class)
+        if class_stats is None:
+            class_stats = self.by_class[shape_class] = {metric: RunningStats(self.shapes) for metric in self.METRICS}
+        for metric in self.METRICS:
+            value = getattr(shape, metric)
+            self.total[metric].add(value, seq, shape)
+            class_stats[metric].add(value, seq, shape)
+
+    def add_many(self, shapes, seqs):
+        """
+        Adds many shapes at once
+        param: seqs: list of seq numbers of the shapes, see RunningStats.add
+        """
+
+        grouped = {}
+        for shape, seq in zip(shapes, seqs):
+            shape_class = self._class_of(shape.__class__)
+            group = grouped.get(shape_class)
+            if group is None:
+                group = grouped[shape_class] = ([], [])
+            group[0].append(shape)
+            group[1].append(seq)
+        for metric in self.METRICS:
+            values = [getattr(shape, metric) for shape in shapes]
+            self.total[metric].add_many(values, seqs, shapes)
+        for shape_class, (class_shapes, class_seqs) in grouped.items():
+            class_stats = self.by_class.get(shape_class)
+            if class_stats is None:
+                class_stats = self.by_class[shape_class] = {metric: RunningStats(self.shapes) for metric in self.METRICS}
+            for metric in self.METRICS:
+                values = [getattr(shape, metric) for shape in class_shapes]
+                class_stats[metric].add_many(values, class_seqs, class_shapes)
+
+    def remove(self, shape, seq):
+        shape_class = self._class_of(shape.__class__)
+        class_stats = self.by_class[shape_class]
+        for metric in self.METRICS:
+            value = getattr(shape, metric)
+            self.total[metric].remove(value, seq)
+            class_stats[metric].remove(value, seq)
+        if not class_stats[self.METRICS[0]].count:
+            del self.by_class[shape_class]
+
+    def get(self, metric, shape_class=None):
+        """
+        Return: RunningStats of metric for all shapes or for shapes of given class only
+        """
+
+        if shape_class is None:
+            return self.total[metric]
+        shape_class = self._class_of(shape_class)
+        if shape_class not in self.by_class:
+            return RunningStats()
+        return self.by_class[shape_class][metric]
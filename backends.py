@@ -0,0 +1,126 @@
+import importlib.util
+import operator
+import os
+
+# Backend used for batch computations is chosen by GEOMETRY_BACKEND environment variable
+# ('python', 'numpy' or 'auto') or by `use`. 'auto' picks NumPy when it is installed.
+# Nothing heavy is imported until the first batch computation, so `import geometry` stays fast.
+ENV_VARIABLE = 'GEOMETRY_BACKEND'
+
+
+class PythonBackend:
+    """
+    This class is the reference backend: every row becomes a shape object and metrics come
+    from the scalar `get_area` and `get_perimeter` of its class, so results match exactly.
+    Parent Class: None
+    """
+
+    name = 'python'
+
+    def metrics(self, shape_class, columns):
+        """
+        Computes rounded area and perimeter of many shapes of one class
+        param: columns: dict mapping every name of `shape_class.params` to sequence of values
+        Return: tuple (list of areas, list of perimeters); `ValueError` if any row is invalid
+        """
+
+        shapes = [shape_class(*params) for params in zip(*(columns[name] for name in shape_class.params))]
+        return [shape.area for shape in shapes], [shape.perimeter for shape in shapes]
+
+    def scale(self, shape_class, shapes, k):
+        """
+        Scales shapes of one class in place by k, see Shape.scale_many; metrics of every shape
+        are computed again with the scalar formulas of its class
+        """
+
+        for shape in shapes:
+            shape._rescale(k)
+
+
+class NumpyBackend:
+    """
+    This class computes metrics of whole columns at once with vectorized kernels
+    of `shape_store.KERNELS`, validating rows with `ingest.VALID_ROWS`.
+    Parent Class: None
+    """
+
+    name = 'numpy'
+
+    def metrics(self, shape_class, columns):
+        """
+        Same as PythonBackend.metrics
+        Return: tuple of two float64 arrays
+        """
+
+        import numpy as np
+        from ingest import VALID_ROWS
+        from shape_store import KERNELS
+        if shape_class not in KERNELS:
+            raise TypeError("{} has no vectorized kernels.".format(shape_class.__name__))
+        values = [np.asarray(columns[name], dtype=np.float64) for name in shape_class.params]
+        valid = VALID_ROWS[shape_class](*values)
+        if not valid.all():
+            # let the scalar check raise the error message of the first invalid row
+            row = [float(column[int(np.argmin(valid))]) for column in values]
+            shape_class.validate(*row)
+            raise ValueError("{} parameters are incorrect: {}.".format(shape_class.__name__, row))
+        area_kernel, perimeter_kernel = KERNELS[shape_class]
+        return np.rint(area_kernel(*values)), np.rint(perimeter_kernel(*values))
+
+    def scale(self, shape_class, shapes, k):
+        """
+        Same as PythonBackend.scale, but new metrics of all shapes come from one vectorized pass:
+        unrounded metrics of current parameters times k (perimeter) and k^2 (area), then rounded
+        """
+
+        import numpy as np
+        from shape_store import KERNELS
+        if shape_class not in KERNELS or not shapes:
+            return PythonBackend().scale(shape_class, shapes, k)
+        values = [np.fromiter(map(operator.attrgetter(name), shapes), dtype=np.float64, count=len(shapes))
+                  for name in shape_class.params]
+        area_kernel, perimeter_kernel = KERNELS[shape_class]
+        areas = np.rint(area_kernel(*values) * (k * k)).astype(np.int64).tolist()
+        perimeters = np.rint(perimeter_kernel(*values) * k).astype(np.int64).tolist()
+        for shape, area, perimeter in zip(shapes, areas, perimeters):
+            shape._rescale(k, area, perimeter)
+
+
+BACKENDS = {'python': PythonBackend, 'numpy': NumpyBackend}
+
+_current = None
+
+
+def numpy_available():
+    """
+    Checks if NumPy is installed, without importing it
+    """
+
+    return importlib.util.find_spec('numpy') is not None
+
+
+def use(name):
+    """
+    Selects backend: 'python', 'numpy' or 'auto'
+    Return: selected backend
+    """
+
+    global _current
+    if name == 'auto':
+        name = 'numpy' if numpy_available() else 'python'
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend {!r}, use one of: auto, {}.".format(name, ', '.join(BACKENDS)))
+    if name == 'numpy' and not numpy_available():
+        raise ValueError("Backend 'numpy' needs NumPy installed.")
+    _current = BACKENDS[name]()
+    return _current
+
+
+def current():
+    """
+    Return: selected backend; on first call it is chosen from GEOMETRY_BACKEND (default 'auto')
+    """
+
+    if _current is None:
+        return use(os.environ.get(ENV_VARIABLE, 'auto').strip().lower() or 'auto')
+    return _current
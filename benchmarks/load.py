@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import random
+import time
+
+from client import ShapeClient
+from server import HOST, ShapeServer
+
+
+def make_records(count, rng):
+    records = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            records.append({'class': 'Circle', 'r': rng.uniform(1, 100)})
+        elif kind == 1:
+            records.append({'class': 'Rectangle', 'a': rng.uniform(1, 100), 'b': rng.uniform(1, 100)})
+        else:
+            records.append({'class': 'Square', 'a': rng.uniform(1, 100)})
+    return records
+
+
+async def run_client(host, port, requests, batch, depth, seed):
+    """
+    One client: sends `requests` requests, at most `depth` of them at a time over one connection.
+    Every fourth request is a query, the others add `batch` shapes.
+    Return: number of added shapes
+    """
+
+    rng = random.Random(seed)
+    client = await ShapeClient.connect(host, port)
+    window = asyncio.Semaphore(depth)
+    added = 0
+
+    async def one(number):
+        nonlocal added
+        async with window:
+            if number % 4 == 3:
+                await (client.largest('area') if number % 8 == 3 else client.summary())
+            else:
+                added += (await client.add(make_records(batch, rng)))['added']
+
+    await asyncio.gather(*(one(number) for number in range(requests)))
+    await client.close()
+    return added
+
+
+async def run(clients, requests, batch, depth, host=None, port=None):
+    """
+    Runs `clients` concurrent clients against server at host:port, or against a server started here
+    Return: dict with 'seconds', 'requests', 'shapes', 'requests_per_second', 'shapes_per_second'
+    """
+
+    server = None
+    if port is None:
+        server = await ShapeServer().start(HOST, 0)
+        host, port = HOST, server.port
+    start = time.perf_counter()
+    added = await asyncio.gather(*(run_client(host, port, requests, batch, depth, seed)
+                                   for seed in range(clients)))
+    seconds = time.perf_counter() - start
+    if server is not None:
+        await server.close()
+    total = clients * requests
+    return {'seconds': seconds, 'requests': total, 'shapes': sum(added),
+            'requests_per_second': total / seconds, 'shapes_per_second': sum(added) / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure throughput of the shapes server under concurrent clients.")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--requests', type=int, default=200, help="requests sent by every client")
+    parser.add_argument('--batch', type=int, default=100, help="shapes in one add request")
+    parser.add_argument('--depth', type=int, default=8, help="pipelined requests in flight per connection")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, help="use running server instead of starting one in this process")
+    args = parser.parse_args()
+
+    print('{:>8} {:>10} {:>10} {:>14} {:>14}'.format('clients', 'requests', 'seconds', 'requests/s', 'shapes/s'))
+    for clients in args.clients:
+        result = asyncio.run(run(clients, args.requests, args.batch, args.depth, args.host, args.port))
+        print('{:>8} {:>10} {:>10.3f} {:>14.0f} {:>14.0f}'.format(
+            clients, result['requests'], result['seconds'], result['requests_per_second'],
+            result['shapes_per_second']))
+
+
+if __name__ == '__main__':
+    main()
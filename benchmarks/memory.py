@@ -0,0 +1,51 @@
+import argparse
+import gc
+import tracemalloc
+
+import compact
+import geometry
+
+SHAPES = ('Circle', 'Triangle', 'Rectangle', 'Square', 'EquilateralTriangle', 'RegularPentagon')
+ARGUMENTS = {'Circle': 1, 'Triangle': 3, 'Rectangle': 2}
+
+
+def bytes_per_instance(shape_class, count, read_metrics=False):
+    """
+    Measures memory allocated by `count` instances of shape_class, without the list holding them
+    param: read_metrics: if True, area and perimeter of every shape are read after construction
+    Return: bytes per instance (float)
+    """
+
+    arity = ARGUMENTS.get(shape_class.__name__, 1)
+    shapes = [None] * count
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        side = 3.0 + i % 1000
+        shapes[i] = shape_class(*([side] * arity))
+        if read_metrics:
+            shapes[i].area, shapes[i].perimeter
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del shapes
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory used by geometry and compact shapes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--shapes', nargs='+', default=list(SHAPES), choices=SHAPES)
+    args = parser.parse_args()
+
+    print('{:>10} {:>20} {:>10} {:>10} {:>16}'.format('count', 'class', 'geometry', 'compact', 'compact + metrics'))
+    for count in args.sizes:
+        for name in args.shapes:
+            full = bytes_per_instance(getattr(geometry, name), count)
+            lazy = bytes_per_instance(getattr(compact, name), count)
+            read = bytes_per_instance(getattr(compact, name), count, read_metrics=True)
+            print('{:>10} {:>20} {:>10.1f} {:>10.1f} {:>16.1f}'.format(count, name, full, lazy, read))
+
+
+if __name__ == '__main__':
+    main()
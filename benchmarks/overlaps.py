@@ -0,0 +1,66 @@
+import argparse
+import itertools
+import math
+import random
+import time
+
+import geometry
+import spatial
+
+DENSITY = 0.05
+
+
+def make_scene(count, seed=0):
+    """
+    Places `count` random shapes of size 1 to 2 in a square scaled so that the number of shapes
+    per unit of area is the same for every count (a sparse scene)
+    Return: ShapeList
+    """
+
+    rng = random.Random(seed)
+    side = math.sqrt(count / DENSITY)
+    factories = (
+        lambda: geometry.Circle(rng.uniform(0.5, 1)),
+        lambda: geometry.Rectangle(rng.uniform(1, 2), rng.uniform(1, 2)),
+        lambda: geometry.EquilateralTriangle(rng.uniform(1, 2)),
+        lambda: geometry.RegularPentagon(rng.uniform(0.6, 1.2)),
+    )
+    shapes = geometry.ShapeList()
+    shapes.extend(factories[i % len(factories)]().place(rng.uniform(0, side), rng.uniform(0, side),
+                                                        rng.uniform(0, 2 * math.pi)) for i in range(count))
+    return shapes
+
+
+def brute_force(shapes):
+    """
+    Return: number of overlapping pairs found by testing all pairs
+    """
+
+    return sum(1 for first, second in itertools.combinations(shapes.shapes, 2)
+               if spatial.shapes_overlap(first, second))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure scaling of ShapeList.find_overlaps on sparse scenes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--brute-force-limit', type=int, default=2000,
+                        help="also test all pairs for scenes up to this size")
+    args = parser.parse_args()
+
+    print('{:>10} {:>10} {:>12} {:>16} {:>14}'.format('count', 'pairs', 'seconds', 'us per shape', 'all pairs s'))
+    for count in args.sizes:
+        shapes = make_scene(count)
+        start = time.perf_counter()
+        pairs = sum(1 for _ in shapes.find_overlaps())
+        elapsed = time.perf_counter() - start
+        brute = ''
+        if count <= args.brute_force_limit:
+            start = time.perf_counter()
+            if brute_force(shapes) != pairs:
+                raise AssertionError("find_overlaps and all pairs test differ for {} shapes".format(count))
+            brute = '{:.3f}'.format(time.perf_counter() - start)
+        print('{:>10} {:>10} {:>12.3f} {:>16.2f} {:>14}'.format(count, pairs, elapsed, elapsed / count * 1e6, brute))
+
+
+if __name__ == '__main__':
+    main()
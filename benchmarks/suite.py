@@ -0,0 +1,310 @@
+import argparse
+import atexit
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+
+import geometry
+import table
+
+SIZES = (1000, 10000, 100000, 1000000, 10000000)
+SHAPE_FACTORIES = (
+    lambda rng: geometry.Circle(rng.uniform(1, 100)),
+    lambda rng: geometry.Triangle(*_triangle_sides(rng)),
+    lambda rng: geometry.EquilateralTriangle(rng.uniform(1, 100)),
+    lambda rng: geometry.Rectangle(rng.uniform(1, 100), rng.uniform(1, 100)),
+    lambda rng: geometry.Square(rng.uniform(1, 100)),
+    lambda rng: geometry.RegularPentagon(rng.uniform(1, 100)),
+)
+
+
+def _triangle_sides(rng):
+    a, b = rng.uniform(1, 100), rng.uniform(1, 100)
+    return a, b, rng.uniform(abs(a - b) + 0.01, a + b - 0.01)
+
+
+def make_shapes(count, seed=0):
+    """
+    Return: list of `count` random shapes of all classes, the same for the same seed
+    """
+
+    rng = random.Random(seed)
+    return [SHAPE_FACTORIES[i % len(SHAPE_FACTORIES)](rng) for i in range(count)]
+
+
+def make_shape_list(count, seed=0):
+    shapes = geometry.ShapeList()
+    for shape in make_shapes(count, seed):
+        shapes.add_shape(shape)
+    return shapes
+
+
+# Every case gets number of shapes and returns function that is timed; preparing data is not timed.
+def case_construct(count):
+    rng = random.Random(0)
+    factories = [SHAPE_FACTORIES[i % len(SHAPE_FACTORIES)] for i in range(count)]
+    return lambda: [factory(rng) for factory in factories]
+
+
+def _duplicated_params(count, distinct=100):
+    rng = random.Random(0)
+    sides = [float(rng.randint(1, distinct)) for _ in range(count)]
+    return [(geometry.Square, (side,)) if i % 2 else (geometry.Circle, (side,)) for i, side in enumerate(sides)]
+
+
+def case_construct_duplicates(count):
+    params = _duplicated_params(count)
+    return lambda: [shape_class(*args) for shape_class, args in params]
+
+
+def case_make_duplicates(count):
+    params = _duplicated_params(count)
+
+    def run():
+        geometry.interner.clear()
+        return [geometry.make(shape_class, *args) for shape_class, args in params]
+    return run
+
+
+def case_get_area(count):
+    shapes = make_shapes(count)
+    return lambda: [shape.get_area() for shape in shapes]
+
+
+def _circle_columns(count):
+    rng = random.Random(0)
+    return {'r': [rng.uniform(1, 100) for _ in range(count)]}
+
+
+def case_compute_metrics_python(count):
+    columns = _circle_columns(count)
+    return lambda: geometry.compute_metrics(geometry.Circle, columns, 'python')
+
+
+def case_compute_metrics_numpy(count):
+    columns = _circle_columns(count)
+    return lambda: geometry.compute_metrics(geometry.Circle, columns, 'numpy')
+
+
+def case_get_perimeter(count):
+    shapes = make_shapes(count)
+    return lambda: [shape.get_perimeter() for shape in shapes]
+
+
+def case_add_shape(count):
+    shapes = make_shapes(count)
+
+    def run():
+        shape_list = geometry.ShapeList()
+        for shape in shapes:
+            shape_list.add_shape(shape)
+    return run
+
+
+def case_get_shapes_table(count):
+    shape_list = make_shape_list(count)
+
+    def run():
+        # every shape is formatted again, as before rows were cached
+        shape_list._table = table.TableCache()
+        return shape_list.get_shapes_table()
+    return run
+
+
+def case_get_shapes_table_warm(count):
+    shape_list = make_shape_list(count)
+    shape_list.get_shapes_table()
+    return shape_list.get_shapes_table
+
+
+def case_largest_by_area(count):
+    return make_shape_list(count).get_largest_shape_by_area
+
+
+def case_largest_by_perimeter(count):
+    return make_shape_list(count).get_largest_shape_by_perimeter
+
+
+QUERY = 'class in (Circle, Square) and area > 100 and perimeter < 50'
+
+
+def case_query_loop(count):
+    shapes = make_shapes(count)
+    return lambda: [shape for shape in shapes if type(shape) in (geometry.Circle, geometry.Square)
+                    and shape.get_area() > 100 and shape.get_perimeter() < 50]
+
+
+def case_query_cold(count):
+    shape_list = make_shape_list(count)
+
+    def run():
+        shape_list.columns = None
+        return shape_list.query(QUERY)
+    return run
+
+
+def case_query_warm(count):
+    shape_list = make_shape_list(count)
+    shape_list.query(QUERY)
+    return lambda: shape_list.query(QUERY)
+
+
+def _alternating_scale(scale):
+    """
+    Calls scale with k and 1/k in turn, so repeated runs keep shapes of the same size
+    """
+
+    factors = itertools.cycle((1.001, 1 / 1.001))
+    return lambda: scale(next(factors))
+
+
+def case_scale_python(count):
+    shape_list = make_shape_list(count)
+    return _alternating_scale(lambda k: shape_list.scale(k, 'python'))
+
+
+def case_scale_numpy(count):
+    shape_list = make_shape_list(count)
+    return _alternating_scale(lambda k: shape_list.scale(k, 'numpy'))
+
+
+def case_scale_store(count):
+    from shape_store import ShapeStore
+    store = ShapeStore()
+    for shape in make_shapes(count):
+        store.add_shape(shape)
+    return _alternating_scale(store.scale)
+
+
+_SEGMENTS = itertools.count()
+
+
+def _shared_reader(count):
+    """
+    Publishes random shapes to shared memory, unlinked at exit
+    Return: SharedShapeReader attached to them
+    """
+
+    from shared_store import SharedShapeReader, SharedShapeWriter
+    writer = SharedShapeWriter('shapes_suite_{}_{}'.format(os.getpid(), next(_SEGMENTS)), make_shapes(count))
+    atexit.register(writer.close)
+    writer.publish()
+    return SharedShapeReader(writer.name)
+
+
+def case_shared_attach(count):
+    from shared_store import SharedShapeReader
+    name = _shared_reader(count).name
+    return lambda: SharedShapeReader(name)
+
+
+def case_shared_largest(count):
+    return _shared_reader(count).get_largest_shape_by_area
+
+
+def case_shared_aggregate(count):
+    return _shared_reader(count).aggregate
+
+
+CASES = {
+    'construct': case_construct,
+    'construct_duplicates': case_construct_duplicates,
+    'make_duplicates': case_make_duplicates,
+    'get_area': case_get_area,
+    'get_perimeter': case_get_perimeter,
+    'compute_metrics_python': case_compute_metrics_python,
+    'compute_metrics_numpy': case_compute_metrics_numpy,
+    'add_shape': case_add_shape,
+    'get_shapes_table': case_get_shapes_table,
+    'get_shapes_table_warm': case_get_shapes_table_warm,
+    'largest_by_area': case_largest_by_area,
+    'largest_by_perimeter': case_largest_by_perimeter,
+    'query_loop': case_query_loop,
+    'query_cold': case_query_cold,
+    'query_warm': case_query_warm,
+    'scale_python': case_scale_python,
+    'scale_numpy': case_scale_numpy,
+    'scale_store': case_scale_store,
+    'shared_attach': case_shared_attach,
+    'shared_largest': case_shared_largest,
+    'shared_aggregate': case_shared_aggregate,
+}
+
+
+def measure(function, repeat):
+    """
+    Fast functions are called in a loop lasting at least 0.2 s (see timeit.Timer.autorange)
+    Return: best wall time of one call out of `repeat` measurements, in seconds
+    """
+
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(cases, sizes, repeat):
+    """
+    Return: dict of results in format written to JSON file
+    """
+
+    results = {}
+    for size in sizes:
+        for name in cases:
+            key = '{}[{}]'.format(name, size)
+            results[key] = measure(CASES[name](size), repeat)
+            print('{:<32} {:>12.6f} s'.format(key, results[key]), file=sys.stderr)
+    return {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeat': repeat},
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Compares results of the same benchmarks
+    param: threshold: allowed slowdown, e.g. 0.1 means 10%
+    Return: list of (benchmark, baseline time, current time, ratio) for benchmarks slower than allowed
+    """
+
+    regressions = []
+    for key, seconds in current['results'].items():
+        before = baseline['results'].get(key)
+        if before and seconds / before > 1 + threshold:
+            regressions.append((key, before, seconds, seconds / before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run geometry benchmarks and compare them with a baseline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="JSON file with results to compare with")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="report benchmarks slower than baseline by more than this fraction (default 0.1)")
+    args = parser.parse_args(argv)
+
+    current = run(args.cases, args.sizes, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(current, json.load(file), args.threshold)
+        for key, before, after, ratio in regressions:
+            print('REGRESSION {}: {:.6f} s -> {:.6f} s ({:+.1%})'.format(key, before, after, ratio - 1))
+        if regressions:
+            return 1
+        print('No regressions above {:.0%}.'.format(args.threshold))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import argparse
+import decimal
+import time
+
+import numpy as np
+
+import geometry
+
+PRECISION = 60
+
+
+def heron(a, b, c):
+    """
+    Plain Heron's formula, as Triangle.get_area computed it before, for comparison
+    """
+
+    s = (a + b + c) / 2
+    return np.sqrt(s * (s - a) * (s - b) * (s - c))
+
+
+def make_triangles(count, needles=0.0, seed=0):
+    """
+    Returns three arrays of sides of random triangles; `needles` is the fraction of needle-like
+    triangles with one side up to 1e-12 of the others
+    """
+
+    rng = np.random.default_rng(seed)
+    a = rng.uniform(1, 100, count)
+    b = rng.uniform(1, 100, count)
+    c = rng.uniform(np.abs(a - b), a + b)
+    needle = rng.random(count) < needles
+    length = rng.uniform(1, 100, count)
+    short = length * 10 ** rng.uniform(-12, -3, count)
+    a[needle] = length[needle]
+    b[needle] = length[needle] + short[needle] * rng.uniform(-0.9, 0.9, count)[needle]
+    c[needle] = short[needle]
+    valid = ~np.isnan(geometry.triangle_area(a, b, c))
+    return a[valid], b[valid], c[valid]
+
+
+def reference_area(a, b, c):
+    """
+    Heron's formula in decimal arithmetic with PRECISION digits; float sides are converted exactly
+    """
+
+    with decimal.localcontext() as context:
+        context.prec = PRECISION
+        a, b, c = decimal.Decimal(a), decimal.Decimal(b), decimal.Decimal(c)
+        s = (a + b + c) / 2
+        return float((s * (s - a) * (s - b) * (s - c)).sqrt())
+
+
+def relative_errors(kernel, a, b, c, reference):
+    with np.errstate(invalid='ignore'):
+        areas = kernel(a, b, c)
+    errors = np.abs(areas - reference) / reference
+    return np.where(np.isnan(errors), np.inf, errors)
+
+
+def accuracy(count, needles):
+    """
+    Return: dict mapping kernel name to (median, maximum) relative error against the reference
+    """
+
+    a, b, c = make_triangles(count, needles, seed=1)
+    reference = np.array([reference_area(*sides) for sides in zip(a.tolist(), b.tolist(), c.tolist())])
+    result = {}
+    for name, kernel in (('heron', heron), ('kahan', geometry.triangle_area)):
+        errors = relative_errors(kernel, a, b, c, reference)
+        result[name] = (float(np.median(errors)), float(errors.max()))
+    return result
+
+
+def throughput(count, scalar_count):
+    """
+    Return: dict mapping method name to nanoseconds per triangle
+    """
+
+    a, b, c = make_triangles(count)
+    result = {}
+    for name, kernel in (('heron', heron), ('kahan', geometry.triangle_area)):
+        start = time.perf_counter()
+        with np.errstate(invalid='ignore'):
+            kernel(a, b, c)
+        result[name + ' (numpy)'] = (time.perf_counter() - start) / len(a) * 1e9
+    sides = list(zip(a[:scalar_count].tolist(), b[:scalar_count].tolist(), c[:scalar_count].tolist()))
+    start = time.perf_counter()
+    for a_side, b_side, c_side in sides:
+        geometry.triangle_area(a_side, b_side, c_side)
+    result['kahan (scalar)'] = (time.perf_counter() - start) / len(sides) * 1e9
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare speed and accuracy of triangle area kernels.")
+    parser.add_argument('--count', type=int, default=10000000, help="triangles for throughput")
+    parser.add_argument('--scalar-count', type=int, default=1000000, help="triangles for scalar throughput")
+    parser.add_argument('--accuracy-count', type=int, default=20000, help="triangles for accuracy")
+    args = parser.parse_args()
+
+    print('{:>16} {:>12}'.format('kernel', 'ns/triangle'))
+    for name, nanoseconds in throughput(args.count, args.scalar_count).items():
+        print('{:>16} {:>12.2f}'.format(name, nanoseconds))
+    print()
+    print('{:>10} {:>8} {:>14} {:>14}'.format('triangles', 'kernel', 'median error', 'max error'))
+    for label, needles in (('random', 0.0), ('needles', 1.0)):
+        for name, (median, maximum) in accuracy(args.accuracy_count, needles).items():
+            print('{:>10} {:>8} {:>14.3e} {:>14.3e}'.format(label, name, median, maximum))
+
+
+if __name__ == '__main__':
+    main()
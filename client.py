@@ -0,0 +1,104 @@
+import asyncio
+import itertools
+
+from server import HOST, PORT, encode_message, read_message, shape_record
+
+
+class ServerError(Exception):
+    """
+    Raised when server rejected a request
+    """
+
+
+class ShapeClient:
+    """
+    This class is an asyncio client of `server.ShapeServer`.
+    Requests may be sent concurrently from many tasks over one connection; they are pipelined
+    (written without waiting for earlier responses) and matched with responses by id.
+    Parent Class: None
+    Args:
+        reader, writer: streams of open connection, see `connect`
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host=HOST, port=PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        try:
+            while True:
+                response = await read_message(self.reader)
+                if response is None:
+                    break
+                future = self._pending.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (ConnectionError, ValueError) as error:
+            self._fail(error)
+        else:
+            self._fail(ConnectionError("Server closed connection."))
+
+    def _fail(self, error):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def request(self, op, **params):
+        """
+        Sends request and waits for its response
+        Return: result of the request, `ServerError` if server rejected it
+        """
+
+        if self._receiver.done():
+            raise ConnectionError("Connection is closed.")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        params.update(id=request_id, op=op)
+        self.writer.write(encode_message(params))
+        await self.writer.drain()
+        response = await future
+        if not response['ok']:
+            raise ServerError(response['error'])
+        return response['result']
+
+    async def add(self, shapes):
+        """
+        param: shapes: Shape objects or records like {'class': 'Circle', 'r': 2.5}
+        Return: {'added': number of added shapes, 'errors': [[index, message], ...]}
+        """
+
+        return await self.request('add', shapes=[shape if isinstance(shape, dict) else shape_record(shape)
+                                                 for shape in shapes])
+
+    async def count(self):
+        return await self.request('count')
+
+    async def largest(self, by='area'):
+        return await self.request('largest', by=by)
+
+    async def summary(self):
+        return await self.request('summary')
+
+    async def aggregate(self):
+        return await self.request('aggregate')
+
+    async def table(self, fmt='table'):
+        return await self.request('table', format=fmt)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._receiver
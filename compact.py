@@ -0,0 +1,144 @@
+import geometry
+from geometry import Shape
+
+
+class CompactShape(Shape):
+    """
+    This is a abstract class for memory-compact variants of `geometry` shapes.
+    Compact classes have the same names, parameters, formulas and string representation,
+    but keep data in `__slots__` instead of `__dict__`. Area and perimeter are computed on first use
+    and cached; changing a side or radius clears the cache. Compact shapes can be placed like
+    regular ones; geometry of placed shapes comes from `full_class`.
+    Parent Class: Shape
+    Class attributes:
+        full_class (type): `geometry` class with the same parameters and formulas
+    """
+
+    __slots__ = ('_area', '_perimeter', 'center', 'rotation')
+    full_class = Shape
+
+    def __init__(self, *params):
+        self.full_class.validate(*params)
+        for name, value in zip(self.params, params):
+            setattr(self, '_' + name, value)
+        self._area = None
+        self._perimeter = None
+        self.center = None
+        self.rotation = 0.0
+
+    @property
+    def area(self):
+        if self._area is None:
+            self._area = self.full_class.get_area(self)
+        return self._area
+
+    @property
+    def perimeter(self):
+        if self._perimeter is None:
+            self._perimeter = self.full_class.get_perimeter(self)
+        return self._perimeter
+
+    def get_area(self):
+        return self.area
+
+    def get_perimeter(self):
+        return self.perimeter
+
+    def __str__(self):
+        return self.full_class.__str__(self)
+
+    def local_vertices(self):
+        return self.full_class.local_vertices(self)
+
+    def get_bounding_box(self):
+        return self.full_class.get_bounding_box(self)
+
+    def contains_point(self, x, y):
+        return self.full_class.contains_point(self, x, y)
+
+    def distance_to(self, x, y):
+        return self.full_class.distance_to(self, x, y)
+
+    def _rescale(self, k, area=None, perimeter=None):
+        for name in self.length_params:
+            slot = '_' + name
+            setattr(self, slot, getattr(self, slot) * k)
+        if self.center is not None:
+            self.center = (self.center[0] * k, self.center[1] * k)
+        self._area = area
+        self._perimeter = perimeter
+
+    def to_shape(self):
+        """
+        Builds regular `geometry` shape with the same parameters
+        """
+
+        return self.full_class(*(getattr(self, name) for name in self.params))
+
+    @classmethod
+    def get_area_formula(cls):
+        return cls.area_formula
+
+    @classmethod
+    def get_perimeter_formula(cls):
+        return cls.perimeter_formula
+
+
+def _parameter(name):
+    slot = '_' + name
+
+    def get(self):
+        return getattr(self, slot)
+
+    def set(self, value):
+        setattr(self, slot, value)
+        self._area = None
+        self._perimeter = None
+
+    return property(get, set, doc="{} (float), changing it clears cached area and perimeter".format(name))
+
+
+def _alias(name):
+    return property(lambda self: getattr(self, name), doc="equal to {}".format(name))
+
+
+def _make_compact(full_class, aliases=None):
+    namespace = {
+        '__slots__': tuple('_' + name for name in full_class.params),
+        '__doc__': "Compact variant of geometry.{} with lazily cached metrics.".format(full_class.__name__),
+        '__module__': __name__,
+        'full_class': full_class,
+        'params': full_class.params,
+        'length_params': tuple(name for name in full_class.length_params if name in full_class.params),
+        'area_formula': full_class.area_formula,
+        'perimeter_formula': full_class.perimeter_formula,
+    }
+    if 'n' not in full_class.params and hasattr(full_class, 'n'):
+        # number of sides fixed by the class, e.g. RegularPentagon.n
+        namespace['n'] = full_class.n
+    for name in full_class.params:
+        namespace[name] = _parameter(name)
+    for name, target in (aliases or {}).items():
+        namespace[name] = _alias(target)
+    return type(full_class.__name__, (CompactShape,), namespace)
+
+
+Circle = _make_compact(geometry.Circle)
+Triangle = _make_compact(geometry.Triangle)
+EquilateralTriangle = _make_compact(geometry.EquilateralTriangle, {'b': 'a', 'c': 'a'})
+Rectangle = _make_compact(geometry.Rectangle)
+Square = _make_compact(geometry.Square, {'b': 'a'})
+RegularPentagon = _make_compact(geometry.RegularPentagon)
+RegularPolygon = _make_compact(geometry.RegularPolygon)
+
+COMPACT_CLASSES = {compact_class.full_class: compact_class for compact_class in
+                   (Circle, Triangle, EquilateralTriangle, Rectangle, Square, RegularPentagon, RegularPolygon)}
+
+
+def to_compact(shape):
+    """
+    Returns compact copy of `geometry` shape
+    """
+
+    compact_class = COMPACT_CLASSES[type(shape)]
+    return compact_class(*(getattr(shape, name) for name in compact_class.params))
@@ -0,0 +1,209 @@
+import math
+
+import numpy as np
+
+from geometry import (Circle, Triangle, EquilateralTriangle, Rectangle, Square, RegularPentagon, RegularPolygon,
+                      Polygon, polygon_coefficients)
+from shape_store import polygon_area_coefficients
+
+
+def _inside_polygon(x, y, xs, ys):
+    """
+    Checks points against convex polygon with counterclockwise vertices (xs[k], ys[k]);
+    the loop goes over edges only, points are handled by broadcasting
+    """
+
+    inside = np.ones(np.broadcast(x, xs[0]).shape, dtype=bool)
+    for k in range(len(xs)):
+        x1, y1, x2, y2 = xs[k], ys[k], xs[(k + 1) % len(xs)], ys[(k + 1) % len(xs)]
+        inside &= (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1) >= 0
+    return inside
+
+
+def _triangle_vertices(a, b, c):
+    # the same layout as Triangle.local_vertices
+    x = (b ** 2 + c ** 2 - a ** 2) / (2 * c)
+    y = np.sqrt(np.maximum(b ** 2 - x ** 2, 0.0))
+    cx, cy = (c + x) / 3, y / 3
+    return [-cx, c - cx, x - cx], [-cy, -cy, y - cy]
+
+
+PENTAGON_ANGLES = [math.pi / 2 + 2 * math.pi * k / 5 for k in range(5)]
+
+
+def _pentagon_vertices(a):
+    radius = a / (2 * math.sin(math.pi / 5))
+    return ([radius * math.cos(angle) for angle in PENTAGON_ANGLES],
+            [radius * math.sin(angle) for angle in PENTAGON_ANGLES])
+
+
+def _inside_regular_polygon(x, y, n, a):
+    # first vertex points up (see RegularPolygon.local_vertices); the edge of the sector holding the point
+    # has its middle in the middle of the sector, at the distance of apothem from the center;
+    # apothem = 2 * area / (n * a), so it comes from the same coefficient table as the area
+    sector = 2 * np.pi / n
+    angle = np.arctan2(y, x) - np.pi / 2
+    middle = (np.floor(angle / sector) + 0.5) * sector
+    return np.hypot(x, y) * np.cos(angle - middle) <= 2 * a * polygon_area_coefficients(n) / n
+
+
+def _regular_vertices(n, a):
+    radius = a * polygon_coefficients(int(n))[1]
+    angles = [math.pi / 2 + 2 * math.pi * k / n for k in range(int(n))]
+    return [radius * math.cos(angle) for angle in angles], [radius * math.sin(angle) for angle in angles]
+
+
+# Vectorized point-in-shape kernels in the frame of the shape (center at (0, 0), no rotation).
+# Every kernel takes x and y arrays and parameter columns in the order of `shape_class.params`;
+# all arguments broadcast, e.g. x of shape (1, N) with parameters of shape (M, 1) gives (M, N) mask.
+LOCAL_CONTAINS = {
+    Circle: lambda x, y, r: x ** 2 + y ** 2 <= r ** 2,
+    Triangle: lambda x, y, a, b, c: _inside_polygon(x, y, *_triangle_vertices(a, b, c)),
+    EquilateralTriangle: lambda x, y, a: _inside_polygon(x, y, *_triangle_vertices(a, a, a)),
+    Rectangle: lambda x, y, a, b: (np.abs(x) <= a / 2) & (np.abs(y) <= b / 2),
+    Square: lambda x, y, a: (np.abs(x) <= a / 2) & (np.abs(y) <= a / 2),
+    RegularPentagon: lambda x, y, a: _inside_polygon(x, y, *_pentagon_vertices(a)),
+    RegularPolygon: _inside_regular_polygon,
+}
+
+# Bounding boxes in the frame of the shape, as (x min, y min, x max, y max)
+LOCAL_BOXES = {
+    Circle: lambda r: (-r, -r, r, r),
+    Triangle: lambda a, b, c: _vertices_box(*_triangle_vertices(a, b, c)),
+    EquilateralTriangle: lambda a: _vertices_box(*_triangle_vertices(a, a, a)),
+    Rectangle: lambda a, b: (-a / 2, -b / 2, a / 2, b / 2),
+    Square: lambda a: (-a / 2, -a / 2, a / 2, a / 2),
+    RegularPentagon: lambda a: _vertices_box(*_pentagon_vertices(a)),
+    RegularPolygon: lambda n, a: _vertices_box(*_regular_vertices(n, a)),
+}
+
+
+def _vertices_box(xs, ys):
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+POLYGON_CHUNK = 1000000
+
+
+def _inside_any_polygon(x, y, xy):
+    """
+    Even-odd rule for polygon with any number of vertices (concave too), vectorized over points and edges;
+    points are taken in chunks so that the (points x edges) arrays have at most POLYGON_CHUNK cells.
+    Points lying on edges are inside, like for other shapes.
+    """
+
+    x1, y1 = xy[:, 0], xy[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    inside = np.empty(len(x), dtype=bool)
+    step = max(POLYGON_CHUNK // len(xy), 1)
+    for start in range(0, len(x), step):
+        px, py = x[start:start + step, np.newaxis], y[start:start + step, np.newaxis]
+        crossing = (y1 > py) != (y2 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            at_x = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        on_edge = (((x2 - x1) * (py - y1) == (y2 - y1) * (px - x1))
+                   & (np.minimum(x1, x2) <= px) & (px <= np.maximum(x1, x2))
+                   & (np.minimum(y1, y2) <= py) & (py <= np.maximum(y1, y2)))
+        inside[start:start + step] = ((np.count_nonzero(crossing & (px < at_x), axis=1) % 2 == 1)
+                                      | on_edge.any(axis=1))
+    return inside
+
+
+def _shape_class(shape):
+    shape_class = getattr(shape.__class__, 'full_class', shape.__class__)
+    if shape_class is not Polygon and shape_class not in LOCAL_CONTAINS:
+        raise TypeError("{} doesn't support containment queries.".format(shape_class.__name__))
+    return shape_class
+
+
+def as_points(points):
+    """
+    Return: float64 array of shape (N, 2), `ValueError` for anything else
+    """
+
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("Points must be an array of shape (N, 2).")
+    return points
+
+
+def _to_local(points, center, rotation):
+    """
+    Moves and rotates points into the frame of shape(s); center and rotation may be columns of shape (M, 1)
+    """
+
+    dx, dy = points[:, 0] - center[0], points[:, 1] - center[1]
+    cos, sin = np.cos(rotation), np.sin(rotation)
+    return dx * cos + dy * sin, dy * cos - dx * sin
+
+
+def contains(shape, points):
+    """
+    Checks which points lie inside placed shape or on its boundary, see Shape.contains
+    Return: boolean array of length N, all False for shape that is not placed
+    """
+
+    points = as_points(points)
+    shape_class = _shape_class(shape)
+    center = getattr(shape, 'center', None)
+    if center is None:
+        return np.zeros(len(points), dtype=bool)
+    if shape_class is Polygon:
+        return _inside_any_polygon(points[:, 0], points[:, 1], shape.world_xy())
+    x, y = _to_local(points, center, shape.rotation)
+    return LOCAL_CONTAINS[shape_class](x, y, *(getattr(shape, name) for name in shape_class.params))
+
+
+def _column(values):
+    return np.fromiter(values, dtype=np.float64)[:, np.newaxis]
+
+
+def contains_many(shapes, points):
+    """
+    Checks all points against all shapes; shapes of one class are checked together,
+    so the only Python loop goes over shape classes (and over polygons, which are checked one by one)
+    Return: boolean array of shape (number of shapes, N), rows of shapes that are not placed are all False
+    """
+
+    points = as_points(points)
+    grouped = {}
+    for row, shape in enumerate(shapes):
+        if getattr(shape, 'center', None) is not None:
+            grouped.setdefault(_shape_class(shape), []).append((row, shape))
+    mask = np.zeros((len(shapes), len(points)), dtype=bool)
+    for shape_class, members in grouped.items():
+        if shape_class is Polygon:
+            for row, shape in members:
+                mask[row] = contains(shape, points)
+            continue
+        rows = np.array([row for row, _ in members])
+        center = (_column(shape.center[0] for _, shape in members), _column(shape.center[1] for _, shape in members))
+        x, y = _to_local(points, center, _column(shape.rotation for _, shape in members))
+        params = [_column(getattr(shape, name) for _, shape in members) for name in shape_class.params]
+        mask[rows] = LOCAL_CONTAINS[shape_class](x, y, *params)
+    return mask
+
+
+def estimate_area(shape, samples=1000000, seed=None):
+    """
+    Monte Carlo estimate of the area: uniform random points are drawn from the bounding box
+    of the shape (in its own frame, so the shape doesn't have to be placed) and the area of the box
+    is multiplied by the fraction of points inside. Standard error is about box area * 0.5 / sqrt(samples).
+    Useful for cross-checking `get_area` of new shape classes.
+    Return: float
+    """
+
+    shape_class = _shape_class(shape)
+    rng = np.random.default_rng(seed)
+    if shape_class is Polygon:
+        xy = np.frombuffer(shape.vertices, dtype=np.float64).reshape(-1, 2)
+        (x_min, y_min), (x_max, y_max) = xy.min(axis=0), xy.max(axis=0)
+        x, y = rng.uniform(x_min, x_max, samples), rng.uniform(y_min, y_max, samples)
+        inside = _inside_any_polygon(x, y, xy)
+        return float((x_max - x_min) * (y_max - y_min) * np.count_nonzero(inside) / samples)
+    params = [getattr(shape, name) for name in shape_class.params]
+    x_min, y_min, x_max, y_max = LOCAL_BOXES[shape_class](*params)
+    x = rng.uniform(x_min, x_max, samples)
+    y = rng.uniform(y_min, y_max, samples)
+    inside = LOCAL_CONTAINS[shape_class](x, y, *params)
+    return float((x_max - x_min) * (y_max - y_min) * np.count_nonzero(inside) / samples)
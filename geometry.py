@@ -1,11 +1,29 @@
+import functools
+import itertools
 import math
+import numbers
+from array import array
+from collections import OrderedDict
+
+import table
+from aggregates import MetricAggregates
+from order_index import MetricIndex
 
 
 class Shape:
     """
     This is a abstract class representing geometrical shape.
+    Class attribute `params` lists names of constructor arguments in order.
+    Shapes have no position until `place` is called; then `center` and `rotation` are set.
     """
 
+    __slots__ = ()
+    params = ()
+    # Attributes that are lengths: scaling shape by k multiplies them by k, perimeter by k and area by k^2
+    length_params = ()
+    center = None
+    rotation = 0.0
+
     def __init__(self):
         """
         Constructs Shape object
@@ -15,6 +33,16 @@ class Shape:
         """
         pass
 
+    @classmethod
+    def validate(cls, *params):
+        """
+        Checks if shape can be built with given parameters, in `params` order.
+
+        Raises:
+            ValueError: If any of the parameters is incorrect.
+        """
+        pass
+
     def get_area(self):
         """
         Calculates shape's area.
@@ -42,6 +70,153 @@ class Shape:
         """
         pass
 
+    def place(self, x, y, rotation=0.0):
+        """
+        Puts shape on the plane. Place shapes before adding them to a ShapeList.
+
+        Args:
+            x (float): x coordinate of the center of the shape
+            y (float): y coordinate of the center of the shape
+            rotation (float): counterclockwise rotation around the center, in radians
+
+        Returns:
+            Shape: the same shape, e.g. `Circle(2).place(1, 1)`
+        """
+        self.center = (x, y)
+        self.rotation = rotation
+        return self
+
+    def scale(self, k):
+        """
+        Scales shape in place by factor k, e.g. to change units; the center of placed shape is scaled too.
+
+        Args:
+            k (float): scale factor, above 0
+
+        Returns:
+            Shape: the same shape
+
+        Raises:
+            ValueError: If k is not above 0.
+        """
+        _validate_scale(k)
+        self._rescale(k)
+        return self
+
+    @classmethod
+    def scale_many(cls, shapes, k, backend=None):
+        """
+        Scales many shapes of this class in place by factor k, without validating them again:
+        scaling by k > 0 keeps every shape valid. With 'numpy' backend new metrics of all shapes
+        are computed at once, see `backends`.
+
+        Args:
+            shapes (list): shapes of this class, each object once
+            k (float): scale factor, above 0
+            backend (str): name of backend to use for this call instead of the selected one
+        """
+        import backends
+        _validate_scale(k)
+        selected = backends.current() if backend is None else backends.BACKENDS[backend]()
+        selected.scale(cls, shapes, k)
+
+    def _rescale(self, k, area=None, perimeter=None):
+        """
+        Multiplies length parameters and center by k and sets new metrics, computed from formulas
+        of the class when they are not given.
+        """
+        for name in self.length_params:
+            setattr(self, name, getattr(self, name) * k)
+        if self.center is not None:
+            self.center = (self.center[0] * k, self.center[1] * k)
+        self.area = self.get_area() if area is None else area
+        self.perimeter = self.get_perimeter() if perimeter is None else perimeter
+
+    def local_vertices(self):
+        """
+        Returns vertices of the shape centered at (0, 0), counterclockwise.
+
+        Returns:
+            list: (x, y) tuples, or None for shapes without vertices
+        """
+        return None
+
+    def get_vertices(self):
+        """
+        Returns vertices of placed shape, counterclockwise.
+
+        Returns:
+            list: (x, y) tuples, or None if shape has no vertices or is not placed
+        """
+        local = self.local_vertices()
+        if local is None or self.center is None:
+            return None
+        cx, cy = self.center
+        cos, sin = math.cos(self.rotation), math.sin(self.rotation)
+        return [(cx + x * cos - y * sin, cy + x * sin + y * cos) for x, y in local]
+
+    def is_convex(self):
+        """
+        Returns True if shape is convex, which is true for all shapes with fixed number of parameters
+        """
+        return True
+
+    def get_bounding_box(self):
+        """
+        Returns axis-aligned bounding box of placed shape.
+
+        Returns:
+            tuple: (min x, min y, max x, max y), or None if shape is not placed
+        """
+        vertices = self.get_vertices()
+        if vertices is None:
+            return None
+        xs, ys = zip(*vertices)
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def contains_point(self, x, y):
+        """
+        Checks if point lies inside placed shape or on its boundary.
+
+        Returns:
+            bool: False also for shapes that are not placed
+        """
+        vertices = self.get_vertices()
+        if vertices is None:
+            return False
+        for (x1, y1), (x2, y2) in zip(vertices, vertices[1:] + vertices[:1]):
+            if (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1) < 0:
+                return False
+        return True
+
+    def contains(self, points):
+        """
+        Checks many points at once, vectorized with NumPy, see `containment` module.
+
+        Args:
+            points: array-like of shape (N, 2) with x and y coordinates
+
+        Returns:
+            numpy.ndarray: boolean mask of length N, all False if shape is not placed
+        """
+        import containment
+        return containment.contains(self, points)
+
+    def distance_to(self, x, y):
+        """
+        Calculates distance from point to placed shape, 0 for points inside.
+
+        Returns:
+            float: distance, or None if shape is not placed
+        """
+        vertices = self.get_vertices()
+        if vertices is None:
+            return None
+        if self.contains_point(x, y):
+            return 0.0
+        return min(_segment_distance(x, y, start, end)
+                   for start, end in zip(vertices, vertices[1:] + vertices[:1]))
+
     @classmethod
     def get_area_formula(cls):
         """
@@ -63,6 +238,23 @@ class Shape:
         pass
 
 
+def _validate_scale(k):
+    if not k > 0:
+        raise ValueError("Scale factor is incorrect.")
+
+
+def _segment_distance(x, y, start, end):
+    """
+    Returns distance from point (x, y) to segment from start to end
+    """
+
+    (x1, y1), (x2, y2) = start, end
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    t = 0.0 if not length else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length))
+    return math.hypot(x - x1 - t * dx, y - y1 - t * dy)
+
+
 class Circle(Shape):
     """
     This class represents Circle shape
@@ -72,10 +264,11 @@ class Circle(Shape):
     """
     perimeter_formula = '2 × π × r'
     area_formula = 'π × r^2'
+    params = ('r',)
+    length_params = ('r',)
 
     def __init__(self, r):
-        if r <= 0:
-            raise ValueError("Circle radius value is incorrect.")
+        Circle.validate(r)
         self.r = r
         self.perimeter = self.get_perimeter()
         self.area = self.get_area()
@@ -86,9 +279,30 @@ class Circle(Shape):
     def get_perimeter(self):
         return round(2 * math.pi * self.r)
 
+    @classmethod
+    def validate(cls, r):
+        if r <= 0:
+            raise ValueError("Circle radius value is incorrect.")
+
     def __str__(self):
         return "Circle, r = {}".format(self.r)
 
+    def get_bounding_box(self):
+        if self.center is None:
+            return None
+        x, y = self.center
+        return x - self.r, y - self.r, x + self.r, y + self.r
+
+    def contains_point(self, x, y):
+        if self.center is None:
+            return False
+        return (x - self.center[0]) ** 2 + (y - self.center[1]) ** 2 <= self.r ** 2
+
+    def distance_to(self, x, y):
+        if self.center is None:
+            return None
+        return max(math.hypot(x - self.center[0], y - self.center[1]) - self.r, 0.0)
+
     @classmethod
     def get_area_formula(cls):
         return cls.area_formula
@@ -98,6 +312,42 @@ class Circle(Shape):
         return cls.perimeter_formula
 
 
+def _triangle_area(a, b, c):
+    if a < b:
+        a, b = b, a
+    if b < c:
+        b, c = c, b
+    if a < b:
+        a, b = b, a
+    # a - b is exact when it matters (Sterbenz lemma), so the sign of c - (a - b) is exact:
+    # triangle inequality is checked without rounding of b + c
+    gap = c - (a - b)
+    if c <= 0 or gap <= 0:
+        return math.nan
+    return math.sqrt((a + (b + c)) * gap * (c + (a - b)) * (a + (b - c))) / 4
+
+
+def triangle_area(a, b, c):
+    """
+    Calculates area of triangle with Kahan's formula for sorted sides a >= b >= c; unlike Heron's
+    formula it stays accurate for needle-like triangles. Works on numbers and elementwise on NumPy
+    arrays; checking if sides make a triangle is done in the same pass.
+    Return: area (float or numpy array), NaN where sides don't make a triangle
+    """
+
+    if isinstance(a, numbers.Real) and isinstance(b, numbers.Real) and isinstance(c, numbers.Real):
+        return _triangle_area(a, b, c)
+    import numpy as np
+    a, b, c = (np.asarray(side, dtype=np.float64) for side in (a, b, c))
+    # sorting network: only comparisons, values are not changed
+    first, second = np.maximum(a, b), np.minimum(a, b)
+    a, rest = np.maximum(first, c), np.minimum(first, c)
+    b, c = np.maximum(second, rest), np.minimum(second, rest)
+    gap = c - (a - b)
+    product = (a + (b + c)) * gap * (c + (a - b)) * (a + (b - c))
+    return np.sqrt(np.where((c > 0) & (gap > 0), product, np.nan)) / 4
+
+
 class Triangle(Shape):
     """
     This class represents Triangle shape
@@ -110,29 +360,42 @@ class Triangle(Shape):
 
     perimeter_formula = "a + b + c"
     area_formula = "sqrt(s(s-a)(s-b)(s-c))"
+    params = ('a', 'b', 'c')
+    length_params = ('a', 'b', 'c')
 
     def __init__(self, a, b, c):
-        if (a <= 0) or (b <= 0) or (c <= 0):
-            raise ValueError("Value of the side of triangle is incorrect.")
-        if (a >= b + c) or (b >= a + c) or (c >= a + b):
-            raise ValueError("Wrong value. Triangle cant be build with that length of sides {}, {}, {}.".format(a, b, c))
-
+        area = _triangle_area(a, b, c)
+        if math.isnan(area):
+            Triangle.validate(a, b, c)
         self.a = a
         self.b = b
         self.c = c
         self.perimeter = self.get_perimeter()
-        self.area = self.get_area()
+        self.area = round(area)
 
     def get_area(self):
-        s = (self.a + self.b + self.c) / 2
-        return round(math.sqrt(s * (s - self.a) * (s - self.b) * (s - self.c)))
+        return round(_triangle_area(self.a, self.b, self.c))
 
     def get_perimeter(self):
         return round(self.a + self.b + self.c)
 
+    @classmethod
+    def validate(cls, a, b, c):
+        if (a <= 0) or (b <= 0) or (c <= 0):
+            raise ValueError("Value of the side of triangle is incorrect.")
+        if math.isnan(_triangle_area(a, b, c)):
+            raise ValueError("Wrong value. Triangle cant be build with that length of sides {}, {}, {}.".format(a, b, c))
+
     def __str__(self):
         return "Triangle, a = {}, b = {}, c = {}".format(self.a, self.b, self.c)
 
+    def local_vertices(self):
+        # side c lies on x axis, side b goes from its start to the third vertex; centroid is moved to (0, 0)
+        x = (self.b ** 2 + self.c ** 2 - self.a ** 2) / (2 * self.c)
+        y = math.sqrt(max(self.b ** 2 - x ** 2, 0.0))
+        cx, cy = (self.c + x) / 3, y / 3
+        return [(-cx, -cy), (self.c - cx, -cy), (x - cx, y - cy)]
+
     @classmethod
     def get_area_formula(cls):
         return cls.area_formula
@@ -144,7 +407,7 @@ class Triangle(Shape):
 
 class EquilateralTriangle(Triangle):
     """
-    This class represents Equilateral Triangle shape
+    This class represents Equilateral Triangle shape, the regular polygon with n = 3
     Parent Class: Triangle
     Args:
         a (float): the length of the side of the triangle
@@ -152,10 +415,16 @@ class EquilateralTriangle(Triangle):
 
     perimeter_formula = "3 * a"
     area_formula = "(a2 sqrt(5(5+2sqrt(5))))/4"
+    params = ('a',)
+    n = 3
 
     def __init__(self, a):
         Triangle.__init__(self, a, b=a, c=a)
 
+    @classmethod
+    def validate(cls, a):
+        super().validate(a, a, a)
+
     def __str__(self):
         return "Equilateral Triangle, a = {}".format(self.a)
 
@@ -179,10 +448,11 @@ class Rectangle(Shape):
 
     perimeter_formula = "2 * (a + b)"
     area_formula = "a * b"
+    params = ('a', 'b')
+    length_params = ('a', 'b')
 
     def __init__(self, a, b):
-        if (a <= 0) or (b <= 0):
-            raise ValueError("Rectangle sides values are incorrect.")
+        Rectangle.validate(a, b)
         self.a = a
         self.b = b
         self.perimeter = self.get_perimeter()
@@ -194,9 +464,18 @@ class Rectangle(Shape):
     def get_perimeter(self):
         return round(2 * (self.a + self.b))
 
+    @classmethod
+    def validate(cls, a, b):
+        if (a <= 0) or (b <= 0):
+            raise ValueError("Rectangle sides values are incorrect.")
+
     def __str__(self):
         return "Rectangle, a = {}, b = {}".format(self.a, self.b)
 
+    def local_vertices(self):
+        x, y = self.a / 2, self.b / 2
+        return [(-x, -y), (x, -y), (x, y), (-x, y)]
+
     @classmethod
     def get_perimeter_formula(cls):
         return cls.perimeter_formula
@@ -208,7 +487,7 @@ class Rectangle(Shape):
 
 class Square(Rectangle):
     """
-    This class represents Square shape
+    This class represents Square shape, the regular polygon with n = 4
     Parent Class: Rectangle
     Args:
         a (float): the length of the side of the square
@@ -216,10 +495,16 @@ class Square(Rectangle):
 
     perimeter_formula = "4 * a"
     area_formula = "a * a"
+    params = ('a',)
+    n = 4
 
     def __init__(self, a):
         Rectangle.__init__(self, a, b=a)
 
+    @classmethod
+    def validate(cls, a):
+        super().validate(a, a)
+
     def __str__(self):
         return "Square, a = {}".format(self.a)
 
@@ -231,30 +516,115 @@ class Square(Rectangle):
     def get_area_formula(cls):
         return cls.area_formula
 
-class RegularPentagon(Shape):
+# Area and circumradius coefficients of regular polygons per number of sides n:
+# area = area coefficient * a2, circumradius = radius coefficient * a (perimeter is just n * a).
+# Shapes with 3, 4 and 5 sides use closed forms; other values are computed once per n and kept
+# for the POLYGON_CACHE_SIZE most recently used n, so unusual inputs can't grow the cache forever.
+POLYGON_CACHE_SIZE = 1024
+POLYGON_COEFFICIENTS = {
+    3: (math.sqrt(3) / 4, 1 / math.sqrt(3)),
+    4: (1.0, 1 / math.sqrt(2)),
+    5: (math.sqrt(5 * (5 + 2 * math.sqrt(5))) / 4, 1 / (2 * math.sin(math.pi / 5))),
+}
+
+
+def polygon_coefficients(n):
     """
-    This class represents Regular Pentagon shape
+    Returns (area coefficient, circumradius coefficient) of regular polygon with n sides, from cache
+    """
+
+    coefficients = POLYGON_COEFFICIENTS.get(n)
+    if coefficients is None:
+        coefficients = _computed_polygon_coefficients(n)
+    return coefficients
+
+
+@functools.lru_cache(maxsize=POLYGON_CACHE_SIZE)
+def _computed_polygon_coefficients(n):
+    return n / (4 * math.tan(math.pi / n)), 1 / (2 * math.sin(math.pi / n))
+
+
+class RegularPolygon(Shape):
+    """
+    This class represents Regular Polygon shape
     Parent Class: Shape
+    Args:
+        n (int): the number of sides, at least 3
+        a (float): the length of the side of the regular polygon
+    """
+
+    perimeter_formula = "n * a"
+    area_formula = "n * a2 / (4 * tan(pi / n))"
+    params = ('n', 'a')
+    length_params = ('a',)
+
+    def __init__(self, n, a):
+        RegularPolygon.validate(n, a)
+        self.n = int(n)
+        self.a = a
+        self.perimeter = self.get_perimeter()
+        self.area = self.get_area()
+
+    def get_area(self):
+        return round(pow(self.a, 2) * polygon_coefficients(self.n)[0])
+
+    def get_perimeter(self):
+        return round(self.a * self.n)
+
+    @classmethod
+    def validate(cls, n, a):
+        if not math.isfinite(n) or n < 3 or n != int(n):
+            raise ValueError("Regular polygon number of sides is incorrect.")
+        if a <= 0:
+            raise ValueError("Regular polygon side value is incorrect.")
+
+    def __str__(self):
+        return "Regular polygon, n = {}, a = {}".format(int(self.n), self.a)
+
+    def local_vertices(self):
+        radius = self.a * polygon_coefficients(self.n)[1]
+        return [(radius * math.cos(math.pi / 2 + 2 * math.pi * k / self.n),
+                 radius * math.sin(math.pi / 2 + 2 * math.pi * k / self.n)) for k in range(self.n)]
+
+    @classmethod
+    def get_perimeter_formula(cls):
+        return cls.perimeter_formula
+
+    @classmethod
+    def get_area_formula(cls):
+        return cls.area_formula
+
+
+class RegularPentagon(RegularPolygon):
+    """
+    This class represents Regular Pentagon shape
+    Parent Class: RegularPolygon
     Args:
         a (float): the length of the side of the regular pentagon
     """
 
     perimeter_formula = "5 * a"
     area_formula = "a2 * sqrt(5(5+2sqrt(5))))/4"
+    params = ('a',)
+    n = 5
 
     def __init__(self, a):
-        if a <= 0:
-            raise ValueError("Regular pentagon side value is incorrect.")
+        RegularPentagon.validate(a)
         self.a = a
         self.perimeter = self.get_perimeter()
         self.area = self.get_area()
 
     def get_area(self):
-        return round(pow(self.a, 2) * math.sqrt(5 * (5 + 2 * math.sqrt(5))) / 4)
+        return round(pow(self.a, 2) * POLYGON_COEFFICIENTS[5][0])
 
     def get_perimeter(self):
         return round(self.a * 5)
 
+    @classmethod
+    def validate(cls, a):
+        if a <= 0:
+            raise ValueError("Regular pentagon side value is incorrect.")
+
     def __str__(self):
         return "Regular pentagon, a = {}".format(self.a)
 
@@ -267,16 +637,245 @@ class RegularPentagon(Shape):
         return cls.area_formula
 
 
+class Polygon(Shape):
+    """
+    This class represents Polygon shape with any number of vertices, e.g. a building footprint.
+    Vertices are kept in one contiguous array of floats (x0, y0, x1, y1, ...);
+    area (shoelace formula), perimeter, bounding box and containment are computed with NumPy.
+    Polygon is placed where its vertices are: `center` is its centroid, `place` moves and rotates it.
+    Parent Class: Shape
+    Args:
+        vertices: iterable of (x, y) pairs, read once, e.g. generator reading a file (see `from_file`)
+    """
+
+    perimeter_formula = "sum of lengths of sides"
+    area_formula = "|sum(x[i] * y[i+1] - x[i+1] * y[i])| / 2"
+    params = ('vertices',)
+
+    def __init__(self, vertices):
+        self.vertices = array('d', itertools.chain.from_iterable(vertices))
+        Polygon.validate(self.vertices)
+        self.center = self._origin = self._centroid()
+        self.perimeter = self.get_perimeter()
+        self.area = self.get_area()
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Reads vertices streamed from text file, one vertex per line as `x y` or `x,y`;
+        empty lines and lines starting with '#' are skipped
+        Return: Polygon
+        """
+
+        return cls(_read_vertices(path))
+
+    def _xy(self):
+        import numpy as np
+        return np.frombuffer(self.vertices, dtype=np.float64).reshape(-1, 2)
+
+    def _shoelace_terms(self):
+        import numpy as np
+        x, y = self._xy().T
+        next_x, next_y = np.roll(x, -1), np.roll(y, -1)
+        return x, y, next_x, next_y, x * next_y - next_x * y
+
+    def _centroid(self):
+        x, y, next_x, next_y, cross = self._shoelace_terms()
+        doubled_area = cross.sum()
+        return (float(((x + next_x) * cross).sum() / (3 * doubled_area)),
+                float(((y + next_y) * cross).sum() / (3 * doubled_area)))
+
+    def get_area(self):
+        return round(abs(float(self._shoelace_terms()[4].sum())) / 2)
+
+    def get_perimeter(self):
+        import numpy as np
+        x, y, next_x, next_y, _ = self._shoelace_terms()
+        return round(float(np.hypot(next_x - x, next_y - y).sum()))
+
+    @classmethod
+    def validate(cls, vertices):
+        if len(vertices) % 2 or len(vertices) < 6:
+            raise ValueError("Polygon needs at least 3 vertices, given as (x, y) pairs.")
+        import numpy as np
+        x, y = np.asarray(vertices, dtype=np.float64).reshape(-1, 2).T
+        if not (x * np.roll(y, -1) - np.roll(x, -1) * y).sum():
+            raise ValueError("Polygon area is zero.")
+
+    def __str__(self):
+        return "Polygon, {} vertices".format(len(self.vertices) // 2)
+
+    def _rescale(self, k, area=None, perimeter=None):
+        self._xy()[:] *= k
+        self._origin = (self._origin[0] * k, self._origin[1] * k)
+        self.center = (self.center[0] * k, self.center[1] * k)
+        self.area = self.get_area()
+        self.perimeter = self.get_perimeter()
+
+    def world_xy(self):
+        """
+        Returns vertices where the polygon is placed.
+
+        Returns:
+            numpy.ndarray: array of shape (number of vertices, 2)
+        """
+        xy = self._xy()
+        if self.center == self._origin and not self.rotation:
+            return xy
+        import numpy as np
+        cos, sin = math.cos(self.rotation), math.sin(self.rotation)
+        x, y = xy[:, 0] - self._origin[0], xy[:, 1] - self._origin[1]
+        return np.column_stack((self.center[0] + x * cos - y * sin, self.center[1] + x * sin + y * cos))
+
+    def local_vertices(self):
+        ox, oy = self._origin
+        return [(x - ox, y - oy) for x, y in zip(self.vertices[0::2], self.vertices[1::2])]
+
+    def get_vertices(self):
+        return [tuple(vertex) for vertex in self.world_xy().tolist()]
+
+    def get_bounding_box(self):
+        xy = self.world_xy()
+        low, high = xy.min(axis=0), xy.max(axis=0)
+        return float(low[0]), float(low[1]), float(high[0]), float(high[1])
+
+    def contains_point(self, x, y):
+        return bool(self.contains([(x, y)])[0])
+
+    def is_convex(self):
+        import numpy as np
+        xy = self._xy()
+        edges = np.roll(xy, -1, axis=0) - xy
+        turns = edges[:, 0] * np.roll(edges[:, 1], -1) - edges[:, 1] * np.roll(edges[:, 0], -1)
+        return bool((turns >= 0).all() or (turns <= 0).all())
+
+    def convex_hull(self):
+        """
+        Builds convex hull of placed polygon with monotone chain algorithm in O(n log n).
+
+        Returns:
+            Polygon: hull with counterclockwise vertices, at the same place
+        """
+        import numpy as np
+        xy = self.world_xy()
+        points = xy[np.lexsort((xy[:, 1], xy[:, 0]))].tolist()
+        lower, upper = [], []
+        for chain, ordered in ((lower, points), (upper, reversed(points))):
+            for point in ordered:
+                while len(chain) >= 2 and _cross(chain[-2], chain[-1], point) <= 0:
+                    chain.pop()
+                chain.append(point)
+        return Polygon(lower[:-1] + upper[:-1])
+
+    @classmethod
+    def get_perimeter_formula(cls):
+        return cls.perimeter_formula
+
+    @classmethod
+    def get_area_formula(cls):
+        return cls.area_formula
+
+
+def _cross(origin, first, second):
+    return (first[0] - origin[0]) * (second[1] - origin[1]) - (first[1] - origin[1]) * (second[0] - origin[0])
+
+
+def _read_vertices(path):
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            x, y = line.replace(',', ' ').split()
+            yield float(x), float(y)
+
+
 class ShapeList:
     """
     This class is meant to hold geometrical shapes (objects that inherit from Shape class).
+    The same shape object may be added many times, e.g. interned shapes from `make`.
     Parent Class: None
     Args:
         shapes: list of Shape objects
+        aggregates: running area and perimeter statistics, updated on every add and remove
+        indexes: dict of sorted MetricIndex per metric, built on demand and then kept up to date
+        spatial: spatial.GridIndex of placed shapes, built on demand and then kept up to date
+        columns: shapes grouped by class for `query` and `select`, built on demand, dropped on change
     """
 
     def __init__(self):
         self.shapes = []
+        self.aggregates = MetricAggregates()
+        self.indexes = {}
+        self.spatial = None
+        self.columns = None
+        self._table = table.TableCache()
+        self._seqs = []
+        self._next_seq = 0
+
+    @classmethod
+    def from_csv(cls, path, chunk_size=100000, max_errors=1000, intern=False):
+        """
+        Loads shapes from CSV file with header, e.g. `class,r,a,b,c`, reading it in chunks
+        Rows that can't be built are skipped and reported instead of raising `ValueError`
+        param: intern: share one read-only instance between identical rows, see `make` (ShapeList only)
+        Return: tuple (collection, ingest.IngestReport)
+        """
+
+        import ingest
+        return cls._load(ingest.read_csv(path), chunk_size, max_errors, intern)
+
+    @classmethod
+    def from_jsonl(cls, path, chunk_size=100000, max_errors=1000, intern=False):
+        """
+        Loads shapes from file with one JSON object per line, e.g. {"class": "Circle", "r": 2.5}
+        Return: tuple (collection, ingest.IngestReport)
+        """
+
+        import ingest
+        return cls._load(ingest.read_jsonl(path), chunk_size, max_errors, intern)
+
+    @classmethod
+    def from_arrays(cls, shape_class, columns, chunk_size=100000, max_errors=1000, intern=False):
+        """
+        Loads shapes of one class from arrays of parameters, e.g. from_arrays(Circle, {'r': radii})
+        Return: tuple (collection, ingest.IngestReport), errors refer to array indexes
+        """
+
+        import ingest
+        report = ingest.IngestReport(max_errors)
+        shapes = cls()
+        ingest.load(ingest.iter_array_batches(shape_class, columns, report, chunk_size), shapes, intern)
+        return shapes, report
+
+    def save(self, path):
+        """
+        Saves shapes to binary columnar file, see `persistence` module
+        Polygon has no fixed parameters, so it can't be saved: `TypeError` is raised
+        """
+
+        import persistence
+        persistence.save(self.shapes, path)
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        """
+        Loads shapes saved with `save`
+        For ShapeList every shape object is built; ShapeStore.open maps the file without copying it
+        """
+
+        import persistence
+        shapes = cls()
+        shapes.extend(view.to_shape() for view in persistence.open_store(path, mmap))
+        return shapes
+
+    @classmethod
+    def _load(cls, records, chunk_size, max_errors, intern=False):
+        import ingest
+        report = ingest.IngestReport(max_errors)
+        shapes = cls()
+        ingest.load(ingest.iter_batches(records, report, chunk_size), shapes, intern)
+        return shapes, report
 
     def add_shape(self, shape):
         """
@@ -286,37 +885,293 @@ class ShapeList:
 
         if isinstance(shape, Shape):
             self.shapes.append(shape)
+            self._seqs.append(self._next_seq)
+            self.aggregates.add(shape, self._next_seq)
+            for index in self.indexes.values():
+                index.add(shape, self._next_seq)
+            if self.spatial is not None:
+                self.spatial.add(shape, self._next_seq)
+            self.columns = None
+            self._next_seq += 1
         else:
             raise TypeError
 
-    def get_shapes_table(self):
+    def extend(self, shapes):
+        """
+        Adds many shapes at once
+        When the batch is bigger than the collection, aggregates and sorted indexes are rebuilt
+        with one heapify or sort instead of inserting shapes one by one
+        """
+
+        shapes = list(shapes)
+        if not all(isinstance(shape, Shape) for shape in shapes):
+            raise TypeError
+        rebuild = len(shapes) > len(self.shapes)
+        seqs = list(range(self._next_seq, self._next_seq + len(shapes)))
+        self._next_seq += len(shapes)
+        self.shapes.extend(shapes)
+        self._seqs.extend(seqs)
+        self.aggregates.add_many(shapes, seqs)
+        self.columns = None
+        for metric, index in self.indexes.items():
+            if rebuild:
+                self.build_index(metric)
+            else:
+                for shape, seq in zip(shapes, seqs):
+                    index.add(shape, seq)
+        if self.spatial is not None:
+            for shape, seq in zip(shapes, seqs):
+                self.spatial.add(shape, seq)
+
+    def remove_shape(self, shape):
+        """
+        Removes first occurrence of the shape object from shapes list
+        Raise `ValueError` if shape is not on the list
+        """
+
+        for idx, item in enumerate(self.shapes):
+            if item is shape:
+                del self.shapes[idx]
+                self._table.truncate(idx)
+                self.columns = None
+                seq = self._seqs.pop(idx)
+                self.aggregates.remove(shape, seq)
+                for index in self.indexes.values():
+                    index.remove(shape, seq)
+                if self.spatial is not None:
+                    self.spatial.remove(shape, seq)
+                return
+        raise ValueError("Shape is not on the list.")
+
+    def scale(self, k, backend=None):
+        """
+        Scales all shapes in place by factor k (and centers of placed shapes), e.g. to change units
+        Shapes are scaled class by class with Shape.scale_many, without validating them again.
+        Interned shapes are shared, so they are replaced with interned scaled shapes instead.
+        Statistics, sorted indexes and spatial index are rebuilt once at the end.
+        param: backend: name of backend computing new metrics, see `backends`
+        Raise `ValueError` if k is not above 0, `TypeError` if the list holds read-only shape views
+        of ShapeStore (nothing is scaled then)
+        """
+
+        _validate_scale(k)
+        by_type = {}
+        for shape in dict.fromkeys(self.shapes):
+            if type(shape) is not shape.__class__:
+                raise TypeError("{} is a read-only view of ShapeStore and can't be scaled in place; "
+                                "scale the store or add view.to_shape() instead.".format(shape))
+            group = by_type.get(type(shape))
+            if group is None:
+                group = by_type[type(shape)] = []
+            group.append(shape)
+        grouped = {}
+        for shape_type, shapes in by_type.items():
+            if shape_type.__setattr__ is _read_only:
+                self._scale_interned(shape_type, k)
+            else:
+                grouped.setdefault(getattr(shape_type, 'full_class', shape_type), []).extend(shapes)
+        for shape_class, shapes in grouped.items():
+            shape_class.scale_many(shapes, k, backend)
+        self.aggregates = MetricAggregates()
+        self.aggregates.add_many(self.shapes, self._seqs)
+        for metric in self.indexes:
+            self.build_index(metric)
+        if self.spatial is not None:
+            self.build_spatial_index(self.spatial.cell_size * k)
+        self._table = table.TableCache()
+        self.columns = None
+
+    def _scale_interned(self, shape_type, k):
+        full_class = shape_type.full_class
+        for idx, shape in enumerate(self.shapes):
+            if type(shape) is shape_type:
+                self.shapes[idx] = make(full_class, *(getattr(shape, name) * k if name in full_class.length_params
+                                                      else getattr(shape, name) for name in full_class.params))
+
+    def stats(self):
+        """
+        Returns call counts and wall times of instrumented methods, see `instrumentation` module
+        Data is collected for whole process, only while instrumentation is enabled
+        """
+
+        import instrumentation
+        return instrumentation.snapshot()
+
+    def get_summary(self, metric, shape_class=None):
+        """
+        Returns statistics of 'area' or 'perimeter' of all shapes, or of shapes of given class only
+        Return: dict with 'count', 'sum', 'mean', 'min' and 'max' values
+        """
+
+        return self.aggregates.get(metric, shape_class).summary()
+
+    def aggregate(self, workers=None, chunk_size=1000000):
+        """
+        Computes area and perimeter statistics on a process pool, see `parallel.aggregate`
+        param: workers: number of processes, None for number of CPUs, 0 to compute in this process
+        Return: dict with 'count', 'area', 'perimeter', 'by_class', 'largest_by_area', 'largest_by_perimeter'
+        """
+
+        import parallel
+        return parallel.aggregate(self, workers, chunk_size)
+
+    def build_index(self, metric):
+        """
+        Builds sorted index of 'area' or 'perimeter' with one sort; from now on it is kept up to date
+        Return: MetricIndex
+        """
+
+        self.indexes[metric] = MetricIndex(metric, zip(self._seqs, self.shapes))
+        return self.indexes[metric]
+
+    def _get_index(self, metric):
+        if metric not in self.indexes:
+            return self.build_index(metric)
+        return self.indexes[metric]
+
+    def top_k(self, by, k):
+        """
+        Returns list of k shapes with largest 'area' or 'perimeter', largest first
+        """
+
+        return self._get_index(by).top_k(k)
+
+    def shapes_between(self, by, lo, hi):
+        """
+        Returns list of shapes with lo <= 'area' or 'perimeter' <= hi, in increasing order
+        """
+
+        return self._get_index(by).between(lo, hi)
+
+    def rank(self, shape, by='area'):
+        """
+        Returns number of shapes with larger 'area' or 'perimeter' than given shape (0 for the largest)
+        """
+
+        return self._get_index(by).rank(getattr(shape, by))
+
+    def percentile(self, by, q):
+        """
+        Returns 'area' or 'perimeter' value at q-th percentile (nearest-rank), None for empty list
+        """
+
+        return self._get_index(by).percentile(q)
+
+    def build_spatial_index(self, cell_size=None):
+        """
+        Builds grid index of placed shapes (see Shape.place); from now on it is kept up to date
+        param: cell_size: size of grid cell, by default mean size of bounding boxes of placed shapes
+        Return: spatial.GridIndex
+        """
+
+        import spatial
+        if cell_size is None:
+            sizes = [max(box[2] - box[0], box[3] - box[1])
+                     for box in (shape.get_bounding_box() for shape in self.shapes) if box is not None]
+            cell_size = sum(sizes) / len(sizes) if sizes and sum(sizes) else 1.0
+        self.spatial = spatial.GridIndex(cell_size, zip(self._seqs, self.shapes))
+        return self.spatial
+
+    def _get_spatial(self):
+        if self.spatial is None:
+            return self.build_spatial_index()
+        return self.spatial
+
+    def shapes_in_window(self, x_min, y_min, x_max, y_max):
+        """
+        Returns list of placed shapes whose bounding boxes intersect the window, in order of adding
+        """
+
+        return self._get_spatial().window(x_min, y_min, x_max, y_max)
+
+    def shapes_at(self, x, y):
+        """
+        Returns list of placed shapes containing point (x, y), in order of adding
+        """
+
+        return self._get_spatial().at_point(x, y)
+
+    def nearest_shapes(self, x, y, k=1):
+        """
+        Returns list of k placed shapes closest to point (x, y), closest first
+        Distance is measured to the edge of the shape, 0 for shapes containing the point
+        """
+
+        return [shape for _, shape in self._get_spatial().nearest(x, y, k)]
+
+    def contains(self, points):
+        """
+        Checks which placed shapes contain which points, vectorized with NumPy
+        param: points: array-like of shape (N, 2)
+        Return: boolean array of shape (number of shapes, N)
+        """
+
+        import containment
+        return containment.contains_many(self.shapes, points)
+
+    def _get_columns(self):
+        if self.columns is None:
+            import query
+            self.columns = query.object_columns(self.shapes)
+        return self.columns
+
+    def query(self, text):
+        """
+        Returns list of shapes matching query expression, in insertion order, e.g.
+        query('class in (Circle, Square) and area > 100 and perimeter < 50'), see `query` module
+        The expression is evaluated on whole columns of every class instead of shape by shape
+        """
+
+        import query
+        return query.compile(text).filter(self)
+
+    def select(self, text, *fields):
+        """
+        Returns values of fields of shapes matching query expression, e.g. select('area > 10', 'class', 'area')
+        Return: dict mapping field to numpy array, rows in insertion order
+        """
+
+        import query
+        return query.compile(text).select(self, *fields)
+
+    def find_overlaps(self):
+        """
+        Yields pairs of overlapping placed shapes, each pair once, the shape added first goes first
+        Candidates come from the spatial index, so sparse scenes take about linear time
+        Return: generator of (Shape, Shape) tuples
+        """
+
+        return self._get_spatial().overlaps()
+
+    def get_shapes_table(self, fmt='table'):
         """
         Create table with data of all objects
+        Cells of every shape are formatted once and cached, so after adding a shape
+        only its row is formatted; when a column gets wider only padding is redone
+        param: fmt: one of 'table', 'csv', 'tsv', 'markdown'
         Return: table(str)
         """
 
-        title_list = ['idx', 'Class', '__str__', 'Perimeter', 'Perimeter Formula', 'Area', 'Area Formula']
-        cell_length = []
-        table = ''
-        for title in title_list:
-            cell_length.append(len(title))
-        cell_length = self.get_length(cell_length)
-        for i in range(len(cell_length)):
-            cell_length[i] += 2
-        table += '/' + '-' * (sum(cell_length) + len(title_list)-1) + '\\\n'
-        for i in range(len(title_list)):
-            table += '|{:^{}}'.format(title_list[i], cell_length[i])
-        table += '|\n'
-        idx = 0
-        for shape in self.shapes:
-            table += '|' + '-' * (sum(cell_length) + len(title_list)-1) + '|\n'
-            table += '|{:^{}}|{:^{}}|{:^{}}|{:^{}}|{:^{}}|{:^{}}|{:^{}}|\n'. \
-                format(idx, cell_length[0], shape.__class__.__name__, cell_length[1],
-                       shape.__str__(), cell_length[2], round(shape.perimeter, 2), cell_length[3],
-                       shape.get_perimeter_formula(), cell_length[4], round(shape.area, 2),
-                       cell_length[5], shape.get_area_formula(), cell_length[6])
-        table += '\\' + '-' * (sum(cell_length) + len(title_list) - 1) + '/\n'
-        return table
+        self._table.update(self.shapes)
+        return ''.join(self._table.iter_lines(fmt))
+
+    def write_shapes_table(self, out, fmt='table'):
+        """
+        Write table with data of all objects to file-like object, line by line
+        param: out: object with `write` method
+        param: fmt: one of 'table', 'csv', 'tsv', 'markdown'
+        """
+
+        table.write_table(self.shapes, out, fmt)
+
+    def iter_shapes_table(self, fmt='table'):
+        """
+        Yield table with data of all objects line by line
+        param: fmt: one of 'table', 'csv', 'tsv', 'markdown'
+        Return: generator of strings
+        """
+
+        return table.iter_lines(self.shapes, fmt)
 
     def get_length(self, start_length):
         """
@@ -325,49 +1180,171 @@ class ShapeList:
         Return start_length: list contain update cell size
         """
 
-        id_shape = 0
-        for shape in self.shapes:
-            if len(str(id_shape)) > start_length[0]:
-                start_length[0] = len(str(id_shape))
-            if len(shape.__class__.__name__) > start_length[1]:
-                start_length[1] = len(shape.__class__.__name__)
-            if start_length[2] < len(shape.__str__()):
-                start_length[2] = len(shape.__str__())
-            if len(str(round(shape.perimeter, 2))) > start_length[3]:
-                start_length[3] = len(str(round(shape.perimeter, 2)))
-            if len(shape.perimeter_formula) > start_length[4]:
-                start_length[4] = len(shape.perimeter_formula)
-            if len(str(round(shape.area, 2))) > start_length[5]:
-                start_length[5] = len(str(round(shape.area, 2)))
-            if len(shape.area_formula) > start_length[6]:
-                start_length[6] = len(shape.area_formula)
-            id_shape += 1
+        self._table.update(self.shapes)
+        for i, width in enumerate(self._table.widths):
+            if width > start_length[i]:
+                start_length[i] = width
         return start_length
 
-    def get_largest_shape_by_perimeter(self):
+    def get_largest_shape_by_perimeter(self, shape_class=None):
         """
-        Returns shape with largest perimeter
+        Returns shape with largest perimeter, optionally only among shapes of given class
         """
 
-        if self.shapes:
-            largest_shape = self.shapes[0]
-            for shape in self.shapes:
-                if shape.get_perimeter().__gt__(largest_shape.get_perimeter()):
-                    largest_shape = shape
-            return largest_shape
-        else:
-            return False
+        return self.aggregates.get('perimeter', shape_class).max() or False
 
-    def get_largest_shape_by_area(self):
+    def get_largest_shape_by_area(self, shape_class=None):
         """
-        Returns shape with largest area
+        Returns shape with largest area, optionally only among shapes of given class
         """
 
-        if self.shapes:
-            largest_shape = self.shapes[0]
-            for shape in self.shapes:
-                if shape.get_area().__gt__(largest_shape.get_area()):
-                    largest_shape = shape
-            return largest_shape
-        else:
-            return False
+        return self.aggregates.get('area', shape_class).max() or False
+
+    def get_smallest_shape_by_perimeter(self, shape_class=None):
+        """
+        Returns shape with smallest perimeter, optionally only among shapes of given class
+        """
+
+        return self.aggregates.get('perimeter', shape_class).min() or False
+
+    def get_smallest_shape_by_area(self, shape_class=None):
+        """
+        Returns shape with smallest area, optionally only among shapes of given class
+        """
+
+        return self.aggregates.get('area', shape_class).min() or False
+
+
+def _read_only(self, *args):
+    raise AttributeError("Interned {} is shared and can't be changed.".format(self.__class__.__name__))
+
+
+def _reduce_interned(self):
+    return make, (self.full_class,) + tuple(getattr(self, name) for name in self.full_class.params)
+
+
+_INTERNED_CLASSES = {}
+
+
+def _interned_class(shape_class):
+    """
+    Returns read-only subclass of shape_class used for interned shapes, created once per class
+    """
+
+    if shape_class not in _INTERNED_CLASSES:
+        _INTERNED_CLASSES[shape_class] = type(shape_class.__name__, (shape_class,), {
+            '__slots__': (),
+            '__doc__': "Shared, read-only {} returned by `make`.".format(shape_class.__name__),
+            'full_class': shape_class,
+            '__setattr__': _read_only,
+            '__delattr__': _read_only,
+            '__reduce__': _reduce_interned,
+        })
+    return _INTERNED_CLASSES[shape_class]
+
+
+class ShapeInterner:
+    """
+    This class returns one shared instance for every distinct (shape class, parameters) pair.
+    Instances are kept in a least recently used cache of bounded size; shapes evicted from the cache
+    stay valid, a later request just builds a new instance. Interned shapes are read-only
+    (they can't be placed or changed), and `isinstance` checks and class statistics treat them
+    as their shape class.
+    Parent Class: None
+    Args:
+        capacity (int): maximal number of cached instances
+        hits (int), misses (int), evictions (int): counters since creation or `clear`
+    """
+
+    def __init__(self, capacity=65536):
+        if capacity < 1:
+            raise ValueError("Capacity must be positive.")
+        self.capacity = capacity
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make(self, shape_class, *params):
+        """
+        Returns shared instance of shape_class built with params, see `make`
+        """
+
+        key = (shape_class,) + params
+        shape = self._cache.get(key)
+        if shape is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return shape
+        self.misses += 1
+        shape = shape_class(*params)
+        shape.__class__ = _interned_class(shape_class)
+        self._cache[key] = shape
+        if len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+        return shape
+
+    def resize(self, capacity):
+        if capacity < 1:
+            raise ValueError("Capacity must be positive.")
+        self.capacity = capacity
+        while len(self._cache) > capacity:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Return: dict with 'hits', 'misses', 'evictions', 'size', 'capacity' and 'hit_rate'
+        """
+
+        requests = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._cache), 'capacity': self.capacity,
+                'hit_rate': self.hits / requests if requests else None}
+
+
+interner = ShapeInterner()
+
+
+def make(shape_class, *params):
+    """
+    Returns shared, read-only shape for given class and parameters, e.g. make(Circle, 2.5).
+    Identical requests return the same object, so duplicated data costs one instance and one
+    area and perimeter calculation. Equal numbers are the same key: make(Circle, 2) is make(Circle, 2.0).
+    Uses module-level `interner`; its capacity is changed with `interner.resize`.
+    Raises `ValueError` for invalid parameters, like the constructor.
+    """
+
+    return interner.make(shape_class, *params)
+
+
+def compute_metrics(shape_class, columns, backend=None):
+    """
+    Computes rounded area and perimeter of many shapes of one class without keeping shape objects,
+    e.g. compute_metrics(Circle, {'r': radii}). Work is done by the backend selected in `backends`
+    ('python' reference or vectorized 'numpy', see GEOMETRY_BACKEND), imported on first use.
+    param: columns: dict mapping every name of `shape_class.params` to sequence of values
+    param: backend: name of backend to use for this call instead of the selected one
+    Return: tuple (areas, perimeters), lists or arrays; `ValueError` if any row is invalid
+    """
+
+    import backends
+    selected = backends.current() if backend is None else backends.BACKENDS[backend]()
+    return selected.metrics(shape_class, columns)
+
+
+def stream(path, chunk_size=100000, max_errors=1000):
+    """
+    Opens lazy pipeline over shapes in .csv, .jsonl or binary file, see `streaming.ShapeStream`, e.g.
+    stream('shapes.jsonl').of_class(Circle).filter(lambda shape: shape.r > 2).count()
+    The file is read in chunks of chunk_size records only when a terminal operation runs.
+    Return: streaming.ShapeStream
+    """
+
+    import streaming
+    return streaming.ShapeStream(streaming.ShapeSource(path, chunk_size, max_errors))
@@ -0,0 +1,247 @@
+import csv
+import json
+from itertools import islice
+
+import numpy as np
+
+from geometry import (Circle, Triangle, EquilateralTriangle, Rectangle, Square, RegularPentagon, RegularPolygon, make,
+                      triangle_area)
+
+SHAPE_CLASSES = {shape_class.__name__: shape_class for shape_class in
+                 (Circle, Triangle, EquilateralTriangle, Rectangle, Square, RegularPentagon, RegularPolygon)}
+
+CHUNK_SIZE = 100000
+
+
+def _valid_triangle(a, b, c):
+    # the same exact check as Triangle.validate, done by the area kernel
+    return np.isfinite(a) & np.isfinite(b) & np.isfinite(c) & ~np.isnan(triangle_area(a, b, c))
+
+
+# Vectorized counterparts of `validate` classmethods: boolean mask of rows that can be built;
+# infinite parameters are rejected too (np.isfinite is also False for NaN)
+VALID_ROWS = {
+    Circle: lambda r: np.isfinite(r) & (r > 0),
+    Triangle: _valid_triangle,
+    EquilateralTriangle: lambda a: np.isfinite(a) & (a > 0),
+    Rectangle: lambda a, b: np.isfinite(a) & np.isfinite(b) & (a > 0) & (b > 0),
+    Square: lambda a: np.isfinite(a) & (a > 0),
+    RegularPentagon: lambda a: np.isfinite(a) & (a > 0),
+    RegularPolygon: lambda n, a: np.isfinite(n) & np.isfinite(a) & (n >= 3) & (n == np.floor(n)) & (a > 0),
+}
+
+
+class IngestReport:
+    """
+    This class collects result of bulk loading: number of loaded shapes and per-row errors.
+    Parent Class: None
+    Args:
+        max_errors (int): how many error messages are kept; all errors are counted anyway
+    """
+
+    def __init__(self, max_errors=1000):
+        self.max_errors = max_errors
+        self.loaded = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row, message):
+        """
+        Records error of given row (line number of the file or index of the array)
+        Errors come chunk by chunk; inside a chunk they are not sorted by row
+        """
+
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row, message))
+
+    @property
+    def ok(self):
+        return not self.error_count
+
+    def __str__(self):
+        return "Loaded {} shapes, {} rows rejected.".format(self.loaded, self.error_count)
+
+
+def read_csv(path):
+    """
+    Yields (line number, record) pairs from CSV file with header, e.g. `class,r,a,b,c`.
+    Column `class` holds shape class name, other columns hold parameters; unused cells stay empty.
+    """
+
+    with open(path, newline='') as file:
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def read_jsonl(path, chunk_size=CHUNK_SIZE):
+    """
+    Yields (line number, record) pairs from file with one JSON object per line,
+    e.g. {"class": "Circle", "r": 2.5}. Empty lines are skipped.
+    Lines are decoded chunk by chunk with one `json.loads` call; a chunk with
+    malformed line (or with line holding several values) is decoded again line by line.
+    """
+
+    with open(path) as file:
+        numbered = ((line_num, line) for line_num, line in enumerate(file, 1) if line.strip())
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                return
+            try:
+                records = json.loads('[' + ','.join(line for _, line in chunk) + ']')
+            except ValueError:
+                records = None
+            if records is None or len(records) != len(chunk):
+                records = [_decode(line) for _, line in chunk]
+            yield from zip((line_num for line_num, _ in chunk), records)
+
+
+def _decode(line):
+    try:
+        return json.loads(line)
+    except ValueError as error:
+        return error
+
+
+def iter_batches(records, report, chunk_size=CHUNK_SIZE):
+    """
+    Parses records chunk by chunk and checks whole columns at once
+    param: records: iterable of (row number, record) pairs, record is a mapping with 'class' key
+    param: report: IngestReport receiving errors of rejected rows
+    Return: generator of lists of (shape_class, columns, rows) tuples, one list per chunk,
+        at most one tuple per shape class; `columns` maps parameter names to float64 arrays
+        of valid rows only and `rows` holds their row numbers
+    """
+
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        grouped = {}
+        for row, record in chunk:
+            if not isinstance(record, dict):
+                report.add_error(row, "Row is not an object: {}".format(record))
+                continue
+            name = record.get('class')
+            if not isinstance(name, str):
+                report.add_error(row, "Unknown shape class {!r}.".format(name))
+            elif name in grouped:
+                grouped[name][0].append(row)
+                grouped[name][1].append(record)
+            elif name in SHAPE_CLASSES:
+                grouped[name] = ([row], [record])
+            else:
+                report.add_error(row, "Unknown shape class {!r}.".format(name))
+        batch = []
+        for name, (rows, group) in grouped.items():
+            rows, columns = _columns(SHAPE_CLASSES[name], rows, group, report)
+            batch.append(_check(SHAPE_CLASSES[name], rows, columns, report))
+        yield batch
+
+
+def iter_array_batches(shape_class, columns, report, chunk_size=CHUNK_SIZE):
+    """
+    Same as `iter_batches`, for parameters of one shape class already held in arrays
+    param: columns: dict mapping every name of `shape_class.params` to array-like of values
+    """
+
+    arrays = [np.asarray(columns[name], dtype=np.float64) for name in shape_class.params]
+    length = len(arrays[0]) if arrays else 0
+    for start in range(0, length, chunk_size):
+        rows = np.arange(start, min(start + chunk_size, length))
+        yield [_check(shape_class, rows, [array[start:start + chunk_size] for array in arrays], report)]
+
+
+def _columns(shape_class, rows, records, report):
+    """
+    Converts parameters of records to float64 columns; rows with missing or non-numeric values are reported
+    Return: (rows, columns) of remaining rows
+    """
+
+    rows = np.array(rows)
+    columns = []
+    for param in shape_class.params:
+        values = [record.get(param) for record in records]
+        try:
+            column = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            column = None
+        if column is None or column.ndim != 1:
+            # e.g. lists of equal length in every row, which NumPy turns into a 2D array
+            column = np.array([_to_float(value) for value in values], dtype=np.float64)
+        columns.append(column)
+    missing = np.zeros(len(rows), dtype=bool)
+    for param, column in zip(shape_class.params, columns):
+        for idx in np.flatnonzero(np.isnan(column) & ~missing):
+            value = records[idx].get(param)
+            if _to_float(value) != _to_float(value):
+                missing[idx] = True
+                report.add_error(int(rows[idx]), "{} parameter {} is missing or not a number: {!r}.".format(
+                    shape_class.__name__, param, value))
+    if missing.any():
+        return rows[~missing], [column[~missing] for column in columns]
+    return rows, columns
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _check(shape_class, rows, columns, report):
+    rows = np.asarray(rows)
+    columns = [np.asarray(column, dtype=np.float64) for column in columns]
+    valid = VALID_ROWS[shape_class](*columns)
+    if not valid.all():
+        for idx in np.flatnonzero(~valid):
+            values = [float(column[idx]) for column in columns]
+            try:
+                shape_class.validate(*values)
+                message = "{} parameters are incorrect: {}.".format(shape_class.__name__, values)
+            except (ValueError, OverflowError) as error:
+                message = str(error)
+            report.add_error(int(rows[idx]), message)
+        rows = rows[valid]
+        columns = [column[valid] for column in columns]
+    report.loaded += len(rows)
+    return shape_class, dict(zip(shape_class.params, columns)), rows
+
+
+def build_shapes(batch, intern=False):
+    """
+    Builds shape objects of one validated batch
+    param: intern: if True, shared instances from `geometry.make` are used, one per distinct row
+    Return: list of shapes in the order of rows
+    """
+
+    shapes = []
+    for shape_class, columns, rows in batch:
+        values = zip(*(columns[name].tolist() for name in shape_class.params))
+        if intern:
+            for row, params in zip(rows.tolist(), values):
+                shapes.append((row, make(shape_class, *params)))
+            continue
+        for row, params in zip(rows.tolist(), values):
+            shapes.append((row, shape_class(*params)))
+    shapes.sort(key=lambda item: item[0])
+    return [shape for _, shape in shapes]
+
+
+def load(batches, target, intern=False):
+    """
+    Adds validated batches to target collection, keeping the order of rows
+    param: batches: generator returned by `iter_batches` or `iter_array_batches`
+    param: target: ShapeStore (columns are appended directly) or ShapeList (shapes are built)
+    param: intern: if True, ShapeList gets shared instances from `geometry.make`, one per distinct row
+    """
+
+    for batch in batches:
+        if hasattr(target, 'extend_columns'):
+            target.extend_columns(batch)
+        else:
+            target.extend(build_shapes(batch, intern))
@@ -0,0 +1,133 @@
+import contextlib
+import functools
+import json
+import marshal
+import time
+
+import geometry
+
+SHAPE_METHODS = ('__init__', 'get_area', 'get_perimeter', '__str__')
+SHAPE_LIST_METHODS = ('add_shape', 'get_length', 'get_shapes_table')
+
+_originals = {}
+_counters = {}
+_stack = []
+
+
+def _targets():
+    for shape_class in (geometry.Shape, geometry.Circle, geometry.Triangle, geometry.EquilateralTriangle,
+                        geometry.Rectangle, geometry.Square, geometry.RegularPentagon, geometry.RegularPolygon,
+                        geometry.Polygon):
+        for name in SHAPE_METHODS:
+            if name in shape_class.__dict__:
+                yield shape_class, name
+    for name in SHAPE_LIST_METHODS:
+        yield geometry.ShapeList, name
+
+
+def _timed(function):
+    counter = _counters.setdefault(function.__qualname__, {
+        'calls': 0, 'total': 0.0, 'own': 0.0,
+        'code': (function.__code__.co_filename, function.__code__.co_firstlineno, function.__name__)})
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        _stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = _stack.pop()
+            if _stack:
+                _stack[-1] += elapsed
+            counter['calls'] += 1
+            counter['total'] += elapsed
+            counter['own'] += elapsed - children
+    return wrapper
+
+
+def enable():
+    """
+    Starts counting calls and wall time of hot methods of `geometry` classes.
+    Methods are replaced by timing wrappers only while instrumentation is enabled,
+    so disabled instrumentation costs nothing.
+    """
+
+    if _originals:
+        return
+    for owner, name in _targets():
+        function = owner.__dict__[name]
+        _originals[owner, name] = function
+        setattr(owner, name, _timed(function))
+
+
+def disable():
+    """
+    Restores original methods; collected data is kept until `reset`
+    """
+
+    for (owner, name), function in _originals.items():
+        setattr(owner, name, function)
+    _originals.clear()
+
+
+def is_enabled():
+    return bool(_originals)
+
+
+def reset():
+    _counters.clear()
+
+
+def snapshot():
+    """
+    Return: dict mapping method name (e.g. 'Circle.get_area') to dict with 'calls',
+        'total' (seconds, including called methods) and 'own' (seconds, without instrumented callees)
+    """
+
+    return {name: {'calls': counter['calls'], 'total': counter['total'], 'own': counter['own']}
+            for name, counter in _counters.items() if counter['calls']}
+
+
+@contextlib.contextmanager
+def instrumented(clear=True):
+    """
+    Context manager enabling instrumentation inside `with` block:
+
+        with instrumentation.instrumented() as stats:
+            shapes.get_shapes_table()
+        print(stats)
+
+    Yields dict that is filled with `snapshot` when the block ends
+    """
+
+    if clear:
+        reset()
+    was_enabled = is_enabled()
+    enable()
+    stats = {}
+    try:
+        yield stats
+    finally:
+        if not was_enabled:
+            disable()
+        stats.update(snapshot())
+
+
+def export_json(path):
+    with open(path, 'w') as file:
+        json.dump(snapshot(), file, indent=2, sort_keys=True)
+
+
+def export_pstats(path):
+    """
+    Writes collected data in the format of cProfile stats files, readable by `pstats.Stats(path)`
+    """
+
+    stats = {}
+    for counter in _counters.values():
+        if counter['calls']:
+            stats[counter['code']] = (counter['calls'], counter['calls'], counter['own'], counter['total'], {})
+    with open(path, 'wb') as file:
+        marshal.dump(stats, file)
@@ -1,6 +1,10 @@
+import argparse
+import json
 import geometry
-import os
 import sys
+import table
+
+REPORTS = ('count', 'largest-area', 'largest-perimeter', 'summary', 'table')
 
 
 def main():
@@ -10,7 +14,7 @@ def main():
 
     shapes = geometry.ShapeList()  # object containing all shapes added by the user
     while True:
-        os.system('clear')
+        clear_screen()
         print(
             "LEARN GEOMETRY\n\n"
             "What do you want to do?\n"
@@ -24,18 +28,18 @@ def main():
 
         option = input("Select an option: ")
         if option == "1":
-            os.system('clear')
+            clear_screen()
             print_list_of_shapes()
             user_choice = input('Select an option: ')
             if user_choice == '1':
-                os.system('clear')
+                clear_screen()
                 print('Enter the length of circle radius: ')
                 radius = input_value()
                 circle = geometry.Circle(radius)
                 shapes.add_shape(circle)
 
             elif user_choice == '2':
-                os.system('clear')
+                clear_screen()
                 print('Enter length of first side of triangle: ')
                 first_side = input_value()
                 print('Enter length of second side of triangle: ')
@@ -50,14 +54,14 @@ def main():
                           .format(first_side, second_side, third_side))
 
             elif user_choice == '3':
-                os.system('clear')
+                clear_screen()
                 print('Enter length of equilateral triangle side:')
                 triangle_side = input_value()
                 equilateral_triangle = geometry.EquilateralTriangle(triangle_side)
                 shapes.add_shape(equilateral_triangle)
 
             elif user_choice == '4':
-                os.system('clear')
+                clear_screen()
                 print('Enter length of first side of rectangle: ')
                 first_side_of_rectangle = input_value()
                 print('Enter length of secound side of rectangle: ')
@@ -66,27 +70,40 @@ def main():
                 shapes.add_shape(rectangle)
 
             elif user_choice == '5':
-                os.system('clear')
+                clear_screen()
                 print('Enter length of side of square: ')
                 square_side = input_value()
                 square = geometry.Square(square_side)
                 shapes.add_shape(square)
 
             elif user_choice == '6':
-                os.system('clear')
+                clear_screen()
                 print('Enter length of side of regular pentagon: ')
                 pentagon_side = input_value()
                 pentagon = geometry.RegularPentagon(pentagon_side)
                 shapes.add_shape(pentagon)
 
+            elif user_choice == '7':
+                clear_screen()
+                print('Enter number of sides of regular polygon: ')
+                sides = input_value()
+                print('Enter length of side of regular polygon: ')
+                polygon_side = input_value()
+                try:
+                    polygon = geometry.RegularPolygon(sides, polygon_side)
+                    shapes.add_shape(polygon)
+                except ValueError:
+                    input("Wrong value. Regular polygon needs whole number of sides, at least 3, not {}."
+                          .format(sides))
+
             elif user_choice == '0':
-                main()
+                continue
 
             else:
                 raise ValueError("Wrong input")
 
         elif option == "2":
-            os.system('clear')
+            clear_screen()
             if len(shapes.shapes) == 0:
                 input('First add some shapes!\n\n Enter to back to menu')
             else:
@@ -94,7 +111,7 @@ def main():
                 input('\nEnter = main menu')
 
         elif option == "3":
-            os.system('clear')
+            clear_screen()
             if len(shapes.shapes) == 0:
                 input('First add some shapes! \n Enter to back to menu')
             else:
@@ -104,7 +121,7 @@ def main():
                 input('\nEnter to back to menu')
 
         elif option == "4":
-            os.system('clear')
+            clear_screen()
             if len(shapes.shapes) == 0:
                 input('First add some shapes! \n Enter to back menu')
             else:
@@ -114,7 +131,7 @@ def main():
                 input('\nEnter to back to menu')
 
         elif option == "5":
-            os.system('clear')
+            clear_screen()
             print_list_of_shapes()
             show_formulas = input("Enter number to get a shape formulas: ")
             if show_formulas == '1':
@@ -147,10 +164,18 @@ def main():
                 area = geometry.RegularPentagon.get_area_formula()
                 perimeter = geometry.RegularPentagon.get_perimeter_formula()
 
+            elif show_formulas == '7':
+                shape = 'Regular Polygon'
+                area = geometry.RegularPolygon.get_area_formula()
+                perimeter = geometry.RegularPolygon.get_perimeter_formula()
+
             elif show_formulas == '0':
-                main()
+                continue
+
+            else:
+                continue
 
-            os.system('clear')
+            clear_screen()
             print('\n{}\n\nFormulas:\nArea: {}\nPerimeter: {}'.format(shape, area, perimeter))
             input('\nEnter to back to menu')
 
@@ -158,12 +183,20 @@ def main():
             sys.exit()
 
 
+def clear_screen():
+    """
+    Clears terminal with ANSI escape codes, without starting a shell
+    """
+
+    print('\033[H\033[J', end='')
+
+
 def print_list_of_shapes():
     """
     Function only for printing shapes list
     """
 
-    os.system('clear')
+    clear_screen()
     print(
         "Please choose shape type :\n\n"
         "\t(1) Circle\n"
@@ -172,6 +205,7 @@ def print_list_of_shapes():
         "\t(4) Rectangle\n"
         "\t(5) Square\n"
         "\t(6) Regular Pentagon\n"
+        "\t(7) Regular Polygon\n"
         "\t(0) Back to menu\n"
     )
 
@@ -202,5 +236,90 @@ def input_value():
 
     return float_value
 
+
+def load_shapes(path, engine):
+    """
+    Loads shapes from .csv, .jsonl or binary (.bin) file
+    param: engine: 'list' for geometry.ShapeList, 'store' for columnar shape_store.ShapeStore
+    Return: tuple (collection, list of errors as (row, message))
+    """
+
+    if engine == 'store':
+        from shape_store import ShapeStore
+        collection_class = ShapeStore
+    else:
+        collection_class = geometry.ShapeList
+    if path.endswith('.csv'):
+        shapes, report = collection_class.from_csv(path)
+    elif path.endswith(('.jsonl', '.json')):
+        shapes, report = collection_class.from_jsonl(path)
+    else:
+        return collection_class.open(path), []
+    return shapes, report.errors
+
+
+def run_batch(argv):
+    """
+    Non-interactive mode: loads shapes from file and prints chosen reports, e.g.
+    python main.py run --input shapes.jsonl --report largest-area,table --format csv
+    Return: exit code
+    """
+
+    parser = argparse.ArgumentParser(prog='main.py', description="Learn geometry in batch mode.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="load shapes from file and print reports")
+    run.add_argument('--input', required=True, help="shapes file: .csv, .jsonl or binary file saved by ShapeStore")
+    run.add_argument('--report', default='table',
+                     help="comma separated list of reports: {}".format(', '.join(REPORTS)))
+    run.add_argument('--format', default='table', choices=('table', 'csv', 'tsv', 'markdown'),
+                     help="format of table and largest shape reports")
+    run.add_argument('--engine', default='store', choices=('store', 'list'),
+                     help="keep shapes in columnar ShapeStore (default) or in ShapeList of objects")
+    run.add_argument('--output', help="write reports to this file instead of standard output")
+    args = parser.parse_args(argv)
+
+    reports = args.report.split(',')
+    unknown = [report for report in reports if report not in REPORTS]
+    if unknown:
+        parser.error("unknown report: {}".format(', '.join(unknown)))
+
+    shapes, errors = load_shapes(args.input, args.engine)
+    for row, message in errors:
+        print('{}:{}: {}'.format(args.input, row, message), file=sys.stderr)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for report in reports:
+            write_report(shapes, report, args.format, out)
+    finally:
+        if args.output:
+            out.close()
+    return 1 if errors else 0
+
+
+def write_report(shapes, report, fmt, out):
+    """
+    Writes one report about shapes to file-like object
+    """
+
+    if report == 'count':
+        out.write('{}\n'.format(len(shapes.shapes)))
+    elif report in ('largest-area', 'largest-perimeter'):
+        if report == 'largest-area':
+            largest = shapes.get_largest_shape_by_area()
+        else:
+            largest = shapes.get_largest_shape_by_perimeter()
+        table.write_table([largest] if largest else [], out, fmt)
+    elif report == 'summary':
+        summary = shapes.aggregate(workers=0)
+        for key in ('largest_by_area', 'largest_by_perimeter'):
+            summary[key] = str(summary[key]) if summary[key] else None
+        out.write(json.dumps(summary, indent=2) + '\n')
+    elif report == 'table':
+        shapes.write_shapes_table(out, fmt)
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_batch(sys.argv[1:]))
     main()
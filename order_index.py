@@ -0,0 +1,205 @@
+import bisect
+import math
+from itertools import accumulate
+
+
+class SortedIndex:
+    """
+    This class is a sorted sequence of keys split into blocks of bounded size (a blocked sorted list).
+    Insert and remove cost O(log n) comparisons plus moving at most one block,
+    positional access and bisection cost O(log n).
+    Parent Class: None
+    Args:
+        keys: iterable of comparable keys used for bulk build (sorted once)
+    """
+
+    LOAD = 1000
+
+    def __init__(self, keys=()):
+        ordered = sorted(keys)
+        self._blocks = [ordered[i:i + self.LOAD] for i in range(0, len(ordered), self.LOAD)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._length = len(ordered)
+        self._offsets = None
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def __reversed__(self):
+        for block in reversed(self._blocks):
+            yield from reversed(block)
+
+    def add(self, key):
+        """
+        Inserts key keeping the order
+        """
+
+        self._offsets = None
+        self._length += 1
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            return
+        pos = bisect.bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._blocks[pos].append(key)
+            self._maxes[pos] = key
+        else:
+            bisect.insort(self._blocks[pos], key)
+        block = self._blocks[pos]
+        if len(block) > 2 * self.LOAD:
+            self._blocks[pos:pos + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self._maxes[pos:pos + 1] = [block[self.LOAD - 1], block[-1]]
+
+    def remove(self, key):
+        """
+        Removes key, raise `ValueError` if it is not in the index
+        """
+
+        pos = bisect.bisect_left(self._maxes, key)
+        if pos < len(self._blocks):
+            block = self._blocks[pos]
+            idx = bisect.bisect_left(block, key)
+            if idx < len(block) and block[idx] == key:
+                self._offsets = None
+                self._length -= 1
+                del block[idx]
+                if block:
+                    self._maxes[pos] = block[-1]
+                else:
+                    del self._blocks[pos]
+                    del self._maxes[pos]
+                return
+        raise ValueError("Key is not in the index.")
+
+    def _block_offsets(self):
+        if self._offsets is None:
+            self._offsets = [0] + list(accumulate(len(block) for block in self._blocks))
+        return self._offsets
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self._length
+        if not 0 <= idx < self._length:
+            raise IndexError("SortedIndex index out of range")
+        offsets = self._block_offsets()
+        pos = bisect.bisect_right(offsets, idx) - 1
+        return self._blocks[pos][idx - offsets[pos]]
+
+    def bisect_left(self, key):
+        """
+        Return: number of keys lower than key
+        """
+
+        pos = bisect.bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._length
+        return self._block_offsets()[pos] + bisect.bisect_left(self._blocks[pos], key)
+
+    def bisect_right(self, key):
+        """
+        Return: number of keys lower or equal to key
+        """
+
+        pos = bisect.bisect_right(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._length
+        return self._block_offsets()[pos] + bisect.bisect_right(self._blocks[pos], key)
+
+    def islice(self, start, stop, reverse=False):
+        """
+        Yields keys with positions in range(start, stop), in reversed order if `reverse` is set
+        """
+
+        start, stop = max(start, 0), min(stop, self._length)
+        if start >= stop:
+            return
+        offsets = self._block_offsets()
+        if reverse:
+            pos = bisect.bisect_right(offsets, stop - 1) - 1
+            idx = stop - 1
+            while idx >= start:
+                block = self._blocks[pos]
+                low = max(start - offsets[pos], 0)
+                for key in reversed(block[low:idx - offsets[pos] + 1]):
+                    yield key
+                idx = offsets[pos] - 1
+                pos -= 1
+        else:
+            pos = bisect.bisect_right(offsets, start) - 1
+            idx = start
+            while idx < stop:
+                block = self._blocks[pos]
+                high = min(stop - offsets[pos], len(block))
+                yield from block[idx - offsets[pos]:high]
+                idx = offsets[pos] + high
+                pos += 1
+
+
+class MetricIndex:
+    """
+    This class keeps shapes sorted by one metric ('area' or 'perimeter') and answers
+    top-k, range, rank and percentile queries in O(log n + k).
+    Keys are (value, -seq, shape): among equal values the shape added first comes out first from top_k.
+    Parent Class: None
+    Args:
+        metric (str): 'area' or 'perimeter'
+        entries: iterable of (seq, shape) pairs for bulk build
+    """
+
+    def __init__(self, metric, entries=()):
+        self.metric = metric
+        self.keys = SortedIndex(self._key(shape, seq) for seq, shape in entries)
+
+    def _key(self, shape, seq):
+        return getattr(shape, self.metric), -seq, shape
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, shape, seq):
+        self.keys.add(self._key(shape, seq))
+
+    def remove(self, shape, seq):
+        self.keys.remove(self._key(shape, seq))
+
+    def top_k(self, k):
+        """
+        Return: list of k shapes with largest metric, largest first
+        """
+
+        length = len(self.keys)
+        return [key[2] for key in self.keys.islice(length - k, length, reverse=True)]
+
+    def between(self, lo, hi):
+        """
+        Return: list of shapes with lo <= metric <= hi, in increasing order of metric
+        """
+
+        start = self.keys.bisect_left((lo,))
+        stop = self.keys.bisect_right((hi, math.inf))
+        return [key[2] for key in self.keys.islice(start, stop)]
+
+    def rank(self, value):
+        """
+        Return: number of shapes with metric larger than value (0 for the largest shape)
+        """
+
+        return len(self.keys) - self.keys.bisect_right((value, math.inf))
+
+    def percentile(self, q):
+        """
+        Return: metric value at q-th percentile (0 <= q <= 100), nearest-rank method
+        """
+
+        if not 0 <= q <= 100:
+            raise ValueError("Percentile must be between 0 and 100.")
+        if not len(self.keys):
+            return None
+        position = max(math.ceil(q / 100 * len(self.keys)) - 1, 0)
+        return self.keys[position][0]
@@ -0,0 +1,160 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from shape_store import KERNELS, ShapeStore
+
+SHAPE_CLASSES = {shape_class.__name__: shape_class for shape_class in KERNELS}
+METRICS = ('area', 'perimeter')
+CHUNK_SIZE = 1000000
+
+
+def _columns_of(shapes):
+    """
+    Converts collection to compact parameter arrays; shapes without vectorized kernels (Polygon)
+    are summarised right away from the metrics they hold
+    Return: (list of (class name, 2D float64 array with one row per parameter, int64 positions),
+        list of partial results of shapes without kernels, see `aggregate_chunk`)
+    """
+
+    if isinstance(shapes, ShapeStore):
+        return [(column.shape_class.__name__,
+                 np.array([column.column(name) for name in column.shape_class.params]),
+                 np.asarray(column.positions))
+                for column in shapes.columns.values() if column.length], []
+    grouped = {}
+    objects = {}
+    for position, shape in enumerate(shapes.shapes):
+        shape_class = getattr(shape.__class__, 'full_class', shape.__class__)
+        if shape_class not in KERNELS:
+            objects.setdefault(shape_class.__name__, []).append((position, shape))
+            continue
+        positions, values = grouped.setdefault(shape_class.__name__, ([], []))
+        positions.append(position)
+        values.append([getattr(shape, name) for name in shape_class.params])
+    columns = [(name, np.array(values, dtype=np.float64).T, np.array(positions, dtype=np.int64))
+               for name, (positions, values) in grouped.items()]
+    partials = [_partial(name, [np.array([getattr(shape, metric) for _, shape in members], dtype=np.float64)
+                                for metric in METRICS],
+                         [position for position, _ in members])
+                for name, members in objects.items()]
+    return columns, partials
+
+
+def aggregate_chunk(class_name, params, positions):
+    """
+    Worker task: computes metrics of one chunk of shapes of one class
+    param: params: 2D array, one row per parameter in `params` order
+    param: positions: indexes of the shapes in the whole collection
+    Return: partial result {class name: {'count': n, 'area': stats, 'perimeter': stats}},
+        where stats is (sum, min, position of min, max, position of max)
+    """
+
+    kernels = KERNELS[SHAPE_CLASSES[class_name]]
+    return _partial(class_name, [np.rint(kernel(*params)) for kernel in kernels], positions)
+
+
+def _partial(class_name, metrics, positions):
+    partial = {'count': len(positions)}
+    for metric, values in zip(METRICS, metrics):
+        low, high = int(np.argmin(values)), int(np.argmax(values))
+        partial[metric] = (float(values.sum()), float(values[low]), int(positions[low]),
+                           float(values[high]), int(positions[high]))
+    return {class_name: partial}
+
+
+def merge(partials):
+    """
+    Merges partial results of `aggregate_chunk`; on equal values the lower position wins
+    """
+
+    merged = {}
+    for partial in partials:
+        for class_name, stats in partial.items():
+            if class_name not in merged:
+                merged[class_name] = stats
+                continue
+            current = merged[class_name]
+            merged[class_name] = {'count': current['count'] + stats['count']}
+            for metric in METRICS:
+                merged[class_name][metric] = _merge_stats(current[metric], stats[metric])
+    return merged
+
+
+def _merge_stats(first, second):
+    total = first[0] + second[0]
+    low = min((first[1], first[2]), (second[1], second[2]))
+    high = max((first[3], -first[4]), (second[3], -second[4]))
+    return total, low[0], low[1], high[0], -high[1]
+
+
+def _summary(merged, shapes):
+    result = {'count': sum(stats['count'] for stats in merged.values()), 'by_class': {}}
+    for metric in METRICS:
+        total = (0, None, None, None, None)
+        for stats in merged.values():
+            total = stats[metric] if total[1] is None else _merge_stats(total, stats[metric])
+        result[metric] = _metric_summary(total, result['count'])
+        result['largest_by_' + metric] = shapes.shapes[total[4]] if total[4] is not None else False
+    for class_name, stats in merged.items():
+        result['by_class'][class_name] = {'count': stats['count']}
+        for metric in METRICS:
+            result['by_class'][class_name][metric] = _metric_summary(stats[metric], stats['count'])
+    return result
+
+
+def _metric_summary(stats, count):
+    return {'sum': stats[0], 'mean': stats[0] / count if count else None, 'min': stats[1], 'max': stats[3]}
+
+
+def aggregate(shapes, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Computes count, sum, mean, min and max of area and perimeter, overall and per class,
+    and finds largest shapes by area and perimeter. Chunks of parameter arrays are sent to
+    a process pool, so workers never receive pickled Shape objects. Polygons have no vectorized
+    kernels: they are summarised in this process from the metrics they hold.
+    param: shapes: ShapeList or ShapeStore
+    param: workers: number of worker processes, None for number of CPUs, 0 to compute in this process
+        (ShapeStore then uses its metric columns as they are, e.g. cached or attached from shared memory)
+    param: chunk_size: maximal number of shapes in one task; collections of at most chunk_size shapes
+        are computed in this process, starting a pool costs more than it saves
+    Return: dict with 'count', 'area', 'perimeter', 'by_class', 'largest_by_area', 'largest_by_perimeter'
+    """
+
+    if workers == 0 and isinstance(shapes, ShapeStore):
+        partials = [_partial(column.shape_class.__name__, [column.metric(metric) for metric in METRICS],
+                             column.positions)
+                    for column in shapes.columns.values() if column.length]
+        return _summary(merge(partials), shapes)
+    tasks = []
+    columns, partials = _columns_of(shapes)
+    for class_name, params, positions in columns:
+        for start in range(0, len(positions), chunk_size):
+            tasks.append((class_name, params[:, start:start + chunk_size], positions[start:start + chunk_size]))
+    if workers == 0 or sum(len(positions) for _, _, positions in columns) <= chunk_size:
+        partials += [aggregate_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials += executor.map(aggregate_chunk, *zip(*tasks))
+    return _summary(merge(partials), shapes)
+
+
+def matches_serial(shapes, workers=None, chunk_size=CHUNK_SIZE, rel_tol=1e-9):
+    """
+    Checks that parallel aggregation gives the same result as computing everything in this process
+    Sums may differ by rounding only, because they are added in different order
+    Return: bool
+    """
+
+    return _same(aggregate(shapes, workers, chunk_size), aggregate(shapes, 0, len(shapes.shapes) or 1), rel_tol)
+
+
+def _same(first, second, rel_tol):
+    if isinstance(first, dict):
+        return first.keys() == second.keys() and all(_same(first[key], second[key], rel_tol) for key in first)
+    if isinstance(first, float) and isinstance(second, float):
+        return math.isclose(first, second, rel_tol=rel_tol)
+    if first is None or second is None or isinstance(first, (int, str, bool)):
+        return first == second
+    return first is second or str(first) == str(second)
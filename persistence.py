@@ -0,0 +1,173 @@
+import mmap as mmap_module
+import struct
+
+import numpy as np
+
+from shape_store import KERNELS, ShapeStore
+
+# File layout (all numbers little-endian, every array starts at offset divisible by 8):
+#   header:     magic, version, number of sections, number of shapes, offset of order array
+#   directory:  one entry per section (shape class): class name, number of params, number of rows,
+#               offset of positions array, offset of the first parameter column
+#   data:       order (uint8 section number per shape, in insertion order),
+#               per section: positions (int64) and one float64 column per parameter, in `params` order;
+#               version 2 adds rounded area and perimeter columns after the parameters
+MAGIC = b'SHAPECOL'
+VERSION = 1
+METRICS_VERSION = 2
+METRICS = ('area', 'perimeter')
+HEADER = struct.Struct('<8sIIQQ')
+SECTION = struct.Struct('<32sIQQQ')
+
+SHAPE_CLASSES = {shape_class.__name__: shape_class for shape_class in KERNELS}
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def as_store(shapes):
+    """
+    Return: shapes if it is ShapeStore, otherwise new ShapeStore with all shapes
+    """
+
+    if isinstance(shapes, ShapeStore):
+        return shapes
+    store = ShapeStore()
+    for shape in shapes:
+        store.add_shape(shape)
+    return store
+
+
+class Layout:
+    """
+    This class computes where every array of a ShapeStore goes in the binary format
+    Parent Class: None
+    Args:
+        store: ShapeStore
+        metrics (bool): store area and perimeter columns too (version 2)
+        size (int): number of bytes of the whole layout
+    """
+
+    def __init__(self, store, metrics=False):
+        self.columns = [column for column in store.columns.values() if column.length]
+        self.length = len(store)
+        self.version = METRICS_VERSION if metrics else VERSION
+        self.metrics = metrics
+        codes = {column.shape_class: code for code, column in enumerate(self.columns)}
+        self.order = np.empty(self.length, dtype=np.uint8)
+        for column in self.columns:
+            self.order[column.positions] = codes[column.shape_class]
+
+        offset = _align(HEADER.size + SECTION.size * len(self.columns))
+        self.order_offset = offset
+        offset = _align(offset + self.length)
+        self.entries = []
+        for column in self.columns:
+            positions_offset = offset
+            columns_offset = positions_offset + 8 * column.length
+            offset = columns_offset + 8 * column.length * len(self._names(column))
+            self.entries.append((column, positions_offset, columns_offset))
+        self.size = offset
+
+    def _names(self, column):
+        return column.shape_class.params + (METRICS if self.metrics else ())
+
+    def header(self):
+        return HEADER.pack(MAGIC, self.version, len(self.columns), self.length, self.order_offset) + b''.join(
+            SECTION.pack(column.shape_class.__name__.encode('ascii'), len(column.shape_class.params),
+                         column.length, positions_offset, columns_offset)
+            for column, positions_offset, columns_offset in self.entries)
+
+    def arrays(self):
+        """
+        Return: generator of (offset, array) pairs in increasing order of offsets
+        """
+
+        yield self.order_offset, self.order
+        for column, positions_offset, columns_offset in self.entries:
+            yield positions_offset, column.positions.astype('<i8')
+            for idx, name in enumerate(self._names(column)):
+                values = column.metric(name) if name in METRICS else column.column(name)
+                yield columns_offset + 8 * column.length * idx, values.astype('<f8')
+
+
+def save(shapes, path):
+    """
+    Writes shapes to binary columnar file
+    param: shapes: ShapeStore (columns are written as they are) or any iterable of Shape objects
+    """
+
+    layout = Layout(as_store(shapes))
+    with open(path, 'wb') as file:
+        file.write(layout.header())
+        for offset, array in layout.arrays():
+            _write_at(file, offset, array)
+
+
+def _write_at(file, offset, array):
+    file.write(b'\0' * (offset - file.tell()))
+    file.write(np.ascontiguousarray(array).tobytes())
+
+
+def write_into(layout, buffer):
+    """
+    Writes store described by layout into writable buffer of at least `layout.size` bytes,
+    e.g. shared memory
+    """
+
+    target = np.frombuffer(buffer, dtype=np.uint8, count=layout.size)
+    header = layout.header()
+    target[:len(header)] = np.frombuffer(header, dtype=np.uint8)
+    for offset, array in layout.arrays():
+        data = np.ascontiguousarray(array).view(np.uint8)
+        target[offset:offset + len(data)] = data
+
+
+def open_store(path, mmap=True):
+    """
+    Opens file written by `save` as ShapeStore
+    param: mmap: if True, columns are read-only views on memory-mapped file (nothing is read up front,
+        metrics are computed lazily from the mapped buffers); first append copies the column to memory.
+        If False, whole file is read into memory.
+    Return: ShapeStore
+    """
+
+    with open(path, 'rb') as file:
+        if mmap:
+            buffer = mmap_module.mmap(file.fileno(), 0, access=mmap_module.ACCESS_READ)
+        else:
+            buffer = file.read()
+    return attach_buffer(buffer, path)
+
+
+def attach_buffer(buffer, name='buffer'):
+    """
+    Builds ShapeStore whose columns are views on buffer in the binary format, without copying;
+    with version 2 stored metrics are used instead of computing them
+    param: name: shown in error messages
+    Return: ShapeStore
+    """
+
+    magic, version, sections, length, order_offset = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("{} is not a shapes file.".format(name))
+    if version not in (VERSION, METRICS_VERSION):
+        raise ValueError("Unsupported shapes file version {}.".format(version))
+
+    attached = []
+    for idx in range(sections):
+        class_name, params, rows, positions_offset, columns_offset = SECTION.unpack_from(
+            buffer, HEADER.size + SECTION.size * idx)
+        shape_class = SHAPE_CLASSES[class_name.rstrip(b'\0').decode('ascii')]
+        if len(shape_class.params) != params:
+            raise ValueError("{} section has wrong number of parameters.".format(shape_class.__name__))
+        names = shape_class.params + (METRICS if version == METRICS_VERSION else ())
+        arrays = {column: np.frombuffer(buffer, '<f8', rows, columns_offset + 8 * rows * number)
+                  for number, column in enumerate(names)}
+        data = {param: arrays[param] for param in shape_class.params}
+        metrics = {metric: arrays[metric] for metric in METRICS if metric in arrays}
+        attached.append((shape_class, data, np.frombuffer(buffer, '<i8', rows, positions_offset), metrics))
+    store = ShapeStore()
+    store.attach(attached, np.frombuffer(buffer, np.uint8, length, order_offset))
+    return store
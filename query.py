@@ -0,0 +1,515 @@
+import functools
+import math
+import operator
+import re
+
+import numpy as np
+
+from geometry import (Circle, Triangle, EquilateralTriangle, Rectangle, Square, RegularPentagon,
+                      RegularPolygon, Polygon)
+from shape_store import ALIASES, ShapeStore
+
+# Query expressions filter shape collections, e.g.
+#
+#     class in (Circle, Square) and area > 100 and not perimeter >= 50
+#
+# Fields are 'area', 'perimeter', 'class' and parameters of shape classes. Operators:
+# or, and, not, comparisons (< <= > >= == !=), class tests (class == Circle,
+# class in (...), class not in (...)) and arithmetic (+ - * /) on numbers.
+#
+# A query is parsed once, then specialised for every shape class: class tests, fields the class
+# doesn't have and constant parameters (e.g. n of Square) are folded away. Like NULL in SQL,
+# a comparison on a missing field is false, and so is its negation: `not` is pushed down into
+# the comparisons (`not r == 2` becomes `r != 2`) before they are folded. Classes for which
+# the query is always false are skipped, the remaining ones are evaluated as whole-column
+# NumPy operations.
+CLASSES = {shape_class.__name__: shape_class for shape_class in
+           (Circle, Triangle, EquilateralTriangle, Rectangle, Square, RegularPentagon, RegularPolygon, Polygon)}
+METRICS = ('area', 'perimeter')
+FIELDS = set(METRICS).union(*(shape_class.params for shape_class in CLASSES.values())) - {'vertices'}
+
+COMPARISONS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+               '==': operator.eq, '!=': operator.ne}
+NEGATED = {'<': '>=', '<=': '>', '>': '<=', '>=': '<', '==': '!=', '!=': '=='}
+ARITHMETIC = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv}
+KEYWORDS = ('and', 'or', 'not', 'in')
+
+TOKEN = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|([A-Za-z_]\w*)|'
+                   r'(<=|>=|==|!=|<|>|[()+\-*/,]))')
+
+
+class ObjectColumn:
+    """
+    This class holds shapes of a single class from ShapeList and gives them the interface
+    of shape_store.ShapeColumn used by queries. Columns are read from the objects once.
+    Parent Class: None
+    Args:
+        shape_class (type): geometry class of the shapes
+        shapes: list of the shapes
+        positions: numpy array of their indexes in the collection, in increasing order
+    """
+
+    def __init__(self, shape_class, shapes, positions):
+        self.shape_class = shape_class
+        self.shapes = shapes
+        self.positions = np.array(positions, dtype=np.int64)
+        self.length = len(shapes)
+        self._data = {}
+
+    def __len__(self):
+        return self.length
+
+    def column(self, name):
+        """
+        Returns numpy array with values of given attribute of all shapes
+        """
+
+        if name not in self._data:
+            self._data[name] = np.fromiter(map(operator.attrgetter(name), self.shapes),
+                                           dtype=np.float64, count=self.length)
+        return self._data[name]
+
+    def metric(self, name):
+        """
+        Returns 'area' or 'perimeter' of all shapes, exactly as computed by the objects
+        """
+
+        return self.column(name)
+
+
+_CLASS_OF = operator.attrgetter('__class__')
+
+
+def object_columns(shapes):
+    """
+    Groups shape objects by class, without a Python loop over the shapes; shape_store.ShapeView
+    rows are grouped by the class they stand for (their `__class__`), not by type(view)
+    Return: dict mapping geometry class to ObjectColumn
+    """
+
+    types = list(map(_CLASS_OF, shapes))
+    codes = {shape_type: code for code, shape_type in enumerate(set(types))}
+    kinds = np.fromiter(map(codes.__getitem__, types), dtype=np.int64, count=len(types))
+    grouped = {}
+    for shape_type, code in codes.items():
+        shape_class = getattr(shape_type, 'full_class', shape_type)
+        grouped.setdefault(shape_class, []).append(np.flatnonzero(kinds == code))
+    columns = {}
+    for shape_class, parts in grouped.items():
+        positions = np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+        members = list(map(shapes.__getitem__, positions.tolist()))
+        columns[shape_class] = ObjectColumn(shape_class, members, positions)
+    return columns
+
+
+def _columns_of(shapes):
+    if isinstance(shapes, ShapeStore):
+        return [column for column in shapes.columns.values() if column.length]
+    return list(shapes._get_columns().values())
+
+
+def tokenize(text):
+    """
+    Return: list of (kind, value, position) tuples, kind is 'number', 'name', 'op' or 'end'
+    """
+
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None:
+            raise ValueError("Query syntax error at position {}: unexpected {!r}.".format(
+                position, text[position:].split()[0]))
+        number, name, op = match.groups()
+        if number is not None:
+            tokens.append(('number', float(number), match.start(1)))
+        elif name is not None:
+            tokens.append(('name', name, match.start(2)))
+        else:
+            tokens.append(('op', op, match.start(3)))
+        position = match.end()
+    tokens.append(('end', None, len(text)))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser building tree of tuples, e.g. ('cmp', '>', ('field', 'area'), ('const', 100.0))
+    Every parse method returns (node, type), type is 'bool', 'number', 'class' or 'classname'
+    """
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self, value=None):
+        kind, token, _ = self.tokens[self.index]
+        if value is None:
+            return token if kind != 'end' else None
+        return kind in ('name', 'op') and token == value
+
+    def take(self, value=None):
+        kind, token, position = self.tokens[self.index]
+        if value is not None and not (kind in ('name', 'op') and token == value):
+            self.error("expected {!r}".format(value))
+        self.index += 1
+        return token
+
+    def error(self, message):
+        kind, token, position = self.tokens[self.index]
+        found = 'end of query' if kind == 'end' else repr(token)
+        raise ValueError("Query syntax error at position {}: {}, found {}.".format(position, message, found))
+
+    def expect(self, parsed, wanted):
+        node, kind = parsed
+        if kind != wanted:
+            self.error("expected {} expression".format('boolean' if wanted == 'bool' else 'numeric'))
+        return node
+
+    def parse(self, wanted='bool'):
+        start = self.index
+        node, kind = self.parse_or()
+        if self.peek() is not None:
+            self.error("expected end of query")
+        if wanted == 'field' and kind in ('number', 'class'):
+            return node
+        if kind != wanted:
+            self.index = start
+            self.error("expected {} expression".format('boolean' if wanted == 'bool' else 'numeric'))
+        return node
+
+    def parse_or(self):
+        node, kind = self.parse_and()
+        while self.peek('or'):
+            node = self.expect((node, kind), 'bool')
+            self.take()
+            node, kind = ('or', node, self.expect(self.parse_and(), 'bool')), 'bool'
+        return node, kind
+
+    def parse_and(self):
+        node, kind = self.parse_not()
+        while self.peek('and'):
+            node = self.expect((node, kind), 'bool')
+            self.take()
+            node, kind = ('and', node, self.expect(self.parse_not(), 'bool')), 'bool'
+        return node, kind
+
+    def parse_not(self):
+        if self.peek('not'):
+            self.take()
+            return ('not', self.expect(self.parse_not(), 'bool')), 'bool'
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left, kind = self.parse_sum()
+        negate = self.peek('not') and self.tokens[self.index + 1][1] == 'in'
+        if self.peek('in') or negate:
+            if kind != 'class':
+                self.error("only 'class' can be tested with 'in'")
+            if negate:
+                self.take()
+            self.take('in')
+            self.take('(')
+            classes = [self.take_class()]
+            while self.peek(','):
+                self.take()
+                classes.append(self.take_class())
+            self.take(')')
+            node = ('in', frozenset(classes))
+            return (('not', node) if negate else node), 'bool'
+        op = self.peek()
+        if op not in COMPARISONS:
+            return left, kind
+        self.take()
+        right, right_kind = self.parse_sum()
+        if kind == 'class' or right_kind == 'class':
+            if op not in ('==', '!=') or {kind, right_kind} != {'class', 'classname'}:
+                self.error("'class' can only be compared with == or != to a class name")
+            name = left if kind == 'classname' else right
+            node = ('in', frozenset([name[1]]))
+            return (('not', node) if op == '!=' else node), 'bool'
+        if kind != 'number' or right_kind != 'number':
+            self.error("expected numeric expressions around {!r}".format(op))
+        return ('cmp', op, left, right), 'bool'
+
+    def take_class(self):
+        name = self.peek()
+        if name not in CLASSES:
+            self.error("expected shape class name")
+        self.take()
+        return CLASSES[name]
+
+    def parse_sum(self):
+        node, kind = self.parse_term()
+        while self.peek('+') or self.peek('-'):
+            node = self.expect((node, kind), 'number')
+            op = self.take()
+            node, kind = ('arith', op, node, self.expect(self.parse_term(), 'number')), 'number'
+        return node, kind
+
+    def parse_term(self):
+        node, kind = self.parse_unary()
+        while self.peek('*') or self.peek('/'):
+            node = self.expect((node, kind), 'number')
+            op = self.take()
+            node, kind = ('arith', op, node, self.expect(self.parse_unary(), 'number')), 'number'
+        return node, kind
+
+    def parse_unary(self):
+        if self.peek('-'):
+            self.take()
+            return ('neg', self.expect(self.parse_unary(), 'number')), 'number'
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind, token, _ = self.tokens[self.index]
+        if kind == 'number':
+            self.take()
+            return ('const', token), 'number'
+        if self.peek('('):
+            self.take()
+            parsed = self.parse_or()
+            self.take(')')
+            return parsed
+        if kind == 'name' and token not in KEYWORDS:
+            if token == 'class':
+                self.take()
+                return ('class',), 'class'
+            if token in CLASSES:
+                self.take()
+                return ('classname', CLASSES[token]), 'classname'
+            if token in FIELDS:
+                self.take()
+                return ('field', token), 'number'
+            raise ValueError("Unknown field {!r} in query, use one of: class, {}.".format(
+                token, ', '.join(sorted(FIELDS))))
+        self.error("expected number, field or '('")
+
+
+def fold(node, shape_class, negate=False):
+    """
+    Specialises parsed query for shapes of one class: class tests and fields missing in the class
+    become constants (NaN in numeric expressions), and constant parts are evaluated
+    param: negate: fold negation of the node; `not` nodes are removed this way
+    Return: node; ('const', value) when the result doesn't depend on the shapes
+    """
+
+    kind = node[0]
+    if kind == 'field':
+        name = node[1]
+        if name in METRICS:
+            return ('metric', name)
+        if name in shape_class.params:
+            return node
+        if name in ALIASES.get(shape_class, {}):
+            return ('field', ALIASES[shape_class][name])
+        value = getattr(shape_class, name, None)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return ('const', float(value))
+        return ('const', math.nan)
+    if kind == 'class':
+        return ('const', shape_class.__name__)
+    if kind == 'in':
+        return ('const', (shape_class in node[1]) != negate)
+    if kind == 'cmp':
+        op = NEGATED[node[1]] if negate else node[1]
+        left, right = fold(node[2], shape_class), fold(node[3], shape_class)
+        if _is_missing(left) or _is_missing(right):
+            return ('const', False)
+        if left[0] == 'const' and right[0] == 'const':
+            return ('const', COMPARISONS[op](left[1], right[1]))
+        return (kind, op, left, right)
+    if kind == 'arith':
+        left, right = fold(node[2], shape_class), fold(node[3], shape_class)
+        if left[0] == 'const' and right[0] == 'const':
+            return ('const', _constant(ARITHMETIC[node[1]], left[1], right[1]))
+        return (kind, node[1], left, right)
+    if kind == 'neg':
+        operand = fold(node[1], shape_class)
+        return ('const', -operand[1]) if operand[0] == 'const' else ('neg', operand)
+    if kind == 'not':
+        return fold(node[1], shape_class, not negate)
+    if kind in ('and', 'or'):
+        if negate:
+            kind = 'or' if kind == 'and' else 'and'
+        # 'and' is decided by a false operand, 'or' by a true one
+        decisive = kind == 'or'
+        left = fold(node[1], shape_class, negate)
+        if left[0] == 'const' and left[1] == decisive:
+            return left
+        right = fold(node[2], shape_class, negate)
+        if right[0] == 'const':
+            return right if right[1] == decisive else left
+        if left[0] == 'const':
+            return right
+        return (kind, left, right)
+    return node
+
+
+def _is_missing(node):
+    return node[0] == 'const' and isinstance(node[1], float) and math.isnan(node[1])
+
+
+def _constant(function, left, right):
+    try:
+        return function(left, right)
+    except ZeroDivisionError:
+        return math.nan
+
+
+def _evaluate(node, column):
+    kind = node[0]
+    if kind == 'const':
+        return node[1]
+    if kind == 'metric':
+        return column.metric(node[1])
+    if kind == 'field':
+        return column.column(node[1])
+    if kind == 'cmp':
+        return COMPARISONS[node[1]](_evaluate(node[2], column), _evaluate(node[3], column))
+    if kind == 'arith':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return ARITHMETIC[node[1]](_evaluate(node[2], column), _evaluate(node[3], column))
+    if kind == 'neg':
+        return -_evaluate(node[1], column)
+    if kind == 'and':
+        return _evaluate(node[1], column) & _evaluate(node[2], column)
+    return _evaluate(node[1], column) | _evaluate(node[2], column)
+
+
+def render(node, shape_class=None):
+    """
+    Writes node as text; with shape_class metrics are written as formulas of the class
+    """
+
+    kind = node[0]
+    if kind == 'const':
+        value = node[1]
+        if isinstance(value, float):
+            return '{:g}'.format(value)
+        return str(value)
+    if kind == 'metric':
+        formula = shape_class.area_formula if node[1] == 'area' else shape_class.perimeter_formula
+        return '({})'.format(formula)
+    if kind == 'field':
+        return node[1]
+    if kind == 'class':
+        return 'class'
+    if kind == 'in':
+        return 'class in ({})'.format(', '.join(sorted(shape.__name__ for shape in node[1])))
+    if kind in ('cmp', 'arith'):
+        return '{} {} {}'.format(render(node[2], shape_class), node[1], render(node[3], shape_class))
+    if kind == 'neg':
+        return '-{}'.format(render(node[1], shape_class))
+    if kind == 'not':
+        return 'not ({})'.format(render(node[1], shape_class))
+    return '({} {} {})'.format(render(node[1], shape_class), kind, render(node[2], shape_class))
+
+
+class Query:
+    """
+    This class is compiled query expression, see `compile`
+    Parent Class: None
+    Args:
+        text (str): query expression
+        tree: parsed expression
+        plans: dict mapping shape class to the expression specialised for it, see `fold`
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tree = _Parser(text).parse()
+        self.plans = {}
+
+    def plan(self, shape_class):
+        if shape_class not in self.plans:
+            self.plans[shape_class] = fold(self.tree, shape_class)
+        return self.plans[shape_class]
+
+    def mask(self, column):
+        """
+        Evaluates the query on all rows of ShapeColumn or ObjectColumn in one pass
+        Return: boolean numpy array
+        """
+
+        result = _evaluate(self.plan(column.shape_class), column)
+        return np.broadcast_to(np.asarray(result, dtype=bool), (len(column),))
+
+    def positions(self, shapes):
+        """
+        Return: increasing numpy array of indexes of matching shapes in ShapeList or ShapeStore
+        """
+
+        found = []
+        for column in _columns_of(shapes):
+            plan = self.plan(column.shape_class)
+            if plan == ('const', False):
+                continue
+            if plan == ('const', True):
+                found.append(column.positions)
+            else:
+                found.append(column.positions[self.mask(column)])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(found))
+
+    def filter(self, shapes):
+        """
+        Return: list of matching shapes, in order of the collection
+        """
+
+        return [shapes.shapes[position] for position in self.positions(shapes).tolist()]
+
+    def count(self, shapes):
+        return len(self.positions(shapes))
+
+    def select(self, shapes, *fields):
+        """
+        Projects matching shapes on fields: 'class', 'area', 'perimeter', parameters or numeric
+        expressions of them, e.g. 'area / perimeter'; parameters missing in a class are NaN
+        Return: dict mapping field to numpy array, rows in order of the collection
+        """
+
+        trees = {field: _Parser(field).parse('field') for field in fields}
+        parts = []
+        for column in _columns_of(shapes):
+            plan = self.plan(column.shape_class)
+            if plan == ('const', False):
+                continue
+            mask = None if plan == ('const', True) else self.mask(column)
+            values = {}
+            for field, tree in trees.items():
+                value = _evaluate(fold(tree, column.shape_class), column)
+                value = np.broadcast_to(value, (len(column),))
+                values[field] = value if mask is None else value[mask]
+            positions = column.positions if mask is None else column.positions[mask]
+            parts.append((positions, values))
+        positions = np.concatenate([part[0] for part in parts]) if parts else np.empty(0, dtype=np.int64)
+        order = np.argsort(positions, kind='stable')
+        result = {}
+        for field, tree in trees.items():
+            dtype = object if tree == ('class',) else np.float64
+            values = [part[1][field] for part in parts]
+            result[field] = np.concatenate(values).astype(dtype)[order] if values else np.empty(0, dtype=dtype)
+        return result
+
+    def explain(self, classes=None):
+        """
+        Shows what is evaluated for every shape class, with metrics written as formulas of the class
+        Return: list of lines like 'Circle: (π × r^2) > 100'
+        """
+
+        classes = CLASSES.values() if classes is None else classes
+        return ['{}: {}'.format(shape_class.__name__, render(self.plan(shape_class), shape_class))
+                for shape_class in classes]
+
+
+@functools.lru_cache(maxsize=256)
+def compile(text):
+    """
+    Parses query expression; compiled queries are cached by their text
+    Return: Query, `ValueError` if the expression is incorrect
+    """
+
+    return Query(text)
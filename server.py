@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import struct
+
+import geometry
+import table
+
+# Every message is a JSON object preceded by its length in bytes (4 bytes, big-endian).
+# Request:  {"id": 1, "op": "add", "shapes": [{"class": "Circle", "r": 2.5}]}
+# Response: {"id": 1, "ok": true, "result": {...}} or {"id": 1, "ok": false, "error": "..."}
+# Clients may send many requests without waiting (pipelining); responses of one connection
+# come in the order of requests.
+LENGTH = struct.Struct('>I')
+MAX_MESSAGE = 64 * 1024 * 1024
+HOST = '127.0.0.1'
+PORT = 8765
+
+
+async def read_message(reader):
+    """
+    Return: decoded message or None when the other side closed connection
+    """
+
+    try:
+        header = await reader.readexactly(LENGTH.size)
+    except asyncio.IncompleteReadError:
+        return None
+    length, = LENGTH.unpack(header)
+    if length > MAX_MESSAGE:
+        raise ValueError("Message of {} bytes is too long.".format(length))
+    return json.loads(await reader.readexactly(length))
+
+
+def encode_message(message):
+    data = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    return LENGTH.pack(len(data)) + data
+
+
+def shape_record(shape):
+    """
+    Return: dict describing the shape in the format accepted by `add`, e.g. {'class': 'Circle', 'r': 2.5}
+    """
+
+    shape_class = getattr(shape.__class__, 'full_class', shape.__class__)
+    record = {'class': shape_class.__name__}
+    for name in shape_class.params:
+        record[name] = getattr(shape, name)
+    return record
+
+
+class ShapeServer:
+    """
+    This class holds one ShapeList and answers requests of many clients over TCP.
+    Requests are handled one at a time on the event loop, so the collection needs no locks.
+    Parent Class: None
+    Args:
+        shapes: geometry.ShapeList served to clients
+    """
+
+    def __init__(self, shapes=None):
+        self.shapes = geometry.ShapeList() if shapes is None else shapes
+        self.requests = 0
+        self._server = None
+
+    def handle(self, request):
+        """
+        Runs one request
+        Return: response message
+        """
+
+        self.requests += 1
+        if not isinstance(request, dict):
+            return {'id': None, 'ok': False, 'error': "Request must be an object."}
+        response = {'id': request.get('id')}
+        handler = getattr(self, 'op_' + str(request.get('op')), None)
+        if handler is None:
+            response.update(ok=False, error="Unknown operation {!r}.".format(request.get('op')))
+            return response
+        try:
+            response.update(ok=True, result=handler(request))
+        except (ValueError, TypeError, KeyError, OverflowError) as error:
+            response.update(ok=False, error=str(error) or error.__class__.__name__)
+        return response
+
+    def op_add(self, request):
+        """
+        Adds batch of shape records, see `ingest.iter_batches`; invalid records are skipped
+        Return: {'added': number of added shapes, 'errors': [[index in batch, message], ...]}
+        """
+
+        import ingest
+        report = ingest.IngestReport()
+        ingest.load(ingest.iter_batches(enumerate(request['shapes']), report), self.shapes)
+        return {'added': report.loaded, 'errors': sorted(report.errors)}
+
+    def op_count(self, request):
+        return len(self.shapes.shapes)
+
+    def op_largest(self, request):
+        """
+        Return: record of the shape with largest 'area' or 'perimeter' (request['by']), None for empty list
+        """
+
+        if request.get('by', 'area') == 'area':
+            largest = self.shapes.get_largest_shape_by_area()
+        elif request['by'] == 'perimeter':
+            largest = self.shapes.get_largest_shape_by_perimeter()
+        else:
+            raise ValueError("Unknown metric {!r}.".format(request['by']))
+        return shape_record(largest) if largest else None
+
+    def op_summary(self, request):
+        """
+        Return: running count, sum, mean, min and max of area and perimeter, see ShapeList.get_summary
+        """
+
+        return {metric: self.shapes.get_summary(metric) for metric in ('area', 'perimeter')}
+
+    def op_aggregate(self, request):
+        """
+        Return: result of ShapeList.aggregate computed in this process, largest shapes as records
+        """
+
+        summary = self.shapes.aggregate(workers=0)
+        for key in ('largest_by_area', 'largest_by_perimeter'):
+            summary[key] = shape_record(summary[key]) if summary[key] else None
+        return summary
+
+    def op_table(self, request):
+        fmt = request.get('format', 'table')
+        if fmt not in table.FORMATS:
+            raise ValueError("Unknown table format {!r}.".format(fmt))
+        return self.shapes.get_shapes_table(fmt)
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except ValueError as error:
+                    writer.write(encode_message({'id': None, 'ok': False, 'error': str(error)}))
+                    break
+                if request is None:
+                    break
+                writer.write(encode_message(self.handle(request)))
+                # waits only when the client doesn't read responses fast enough
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=HOST, port=PORT):
+        """
+        Starts listening; port 0 picks a free port, see `port`
+        """
+
+        self._server = await asyncio.start_server(self.serve_connection, host, port)
+        return self
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def serve_forever(self, host=HOST, port=PORT):
+        await self.start(host, port)
+        async with self._server:
+            await self._server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve one collection of shapes over TCP.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--input', help="load shapes from .csv, .jsonl or binary file first")
+    args = parser.parse_args(argv)
+
+    shapes = None
+    if args.input:
+        import main as main_module
+        shapes, _ = main_module.load_shapes(args.input, 'list')
+    try:
+        asyncio.run(ShapeServer(shapes).serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,453 @@
+import math
+from collections.abc import Sequence
+
+import numpy as np
+
+import table
+
+from geometry import (Shape, ShapeList, Circle, Triangle, EquilateralTriangle, Rectangle, Square,
+                      RegularPentagon, RegularPolygon, polygon_coefficients, triangle_area, _validate_scale)
+
+
+PENTAGON_AREA_FACTOR = math.sqrt(5 * (5 + 2 * math.sqrt(5)))
+
+
+def polygon_area_coefficients(n):
+    """
+    Vectorized lookup with geometry.polygon_coefficients: every distinct number of sides is looked up once
+    param: n: array of numbers of sides
+    Return: float64 array of area coefficients, area = coefficient * a2
+    """
+
+    n = np.asarray(n)
+    values, inverse = np.unique(n, return_inverse=True)
+    table = np.array([polygon_coefficients(int(value))[0] for value in values], dtype=np.float64)
+    return table[inverse].reshape(n.shape)
+
+
+def polygon_metrics(n, a):
+    """
+    Area and perimeter of regular polygons given by arrays of (n, a) pairs, not rounded
+    Return: tuple of two float64 arrays
+    """
+
+    n, a = np.asarray(n, dtype=np.float64), np.asarray(a, dtype=np.float64)
+    return a ** 2 * polygon_area_coefficients(n), n * a
+
+# Vectorized (area, perimeter) kernels. Every kernel takes parameter columns in the
+# order of `shape_class.params` and mirrors the scalar formula of that class.
+KERNELS = {
+    Circle: (lambda r: math.pi * r ** 2,
+             lambda r: 2 * math.pi * r),
+    Triangle: (triangle_area,
+               lambda a, b, c: a + b + c),
+    EquilateralTriangle: (lambda a: triangle_area(a, a, a),
+                          lambda a: a + a + a),
+    Rectangle: (lambda a, b: a * b,
+                lambda a, b: 2 * (a + b)),
+    Square: (lambda a: a * a,
+             lambda a: 2 * (a + a)),
+    RegularPentagon: (lambda a: a ** 2 * PENTAGON_AREA_FACTOR / 4,
+                      lambda a: a * 5),
+    RegularPolygon: (lambda n, a: a ** 2 * polygon_area_coefficients(n),
+                     lambda n, a: n * a),
+}
+
+# Attributes of specialised shapes that are stored only once, e.g. Square.b is always Square.a
+ALIASES = {
+    EquilateralTriangle: {'b': 'a', 'c': 'a'},
+    Square: {'b': 'a'},
+}
+
+
+class ShapeColumn:
+    """
+    This class holds parameters of all shapes of a single class as contiguous float64 columns.
+    Parent Class: None
+    Args:
+        shape_class (type): Shape subclass stored in this column
+    """
+
+    INITIAL_CAPACITY = 16
+
+    def __init__(self, shape_class):
+        self.shape_class = shape_class
+        self.length = 0
+        self._data = {name: np.empty(self.INITIAL_CAPACITY) for name in shape_class.params}
+        self._position = np.empty(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._metrics = {}
+
+    def __len__(self):
+        return self.length
+
+    def append(self, values, position):
+        """
+        Appends one row, doubling the capacity of the columns when they are full
+        param: values: parameter values in `shape_class.params` order
+        param: position: index of the shape in the whole store
+        """
+
+        if self.length == len(self._position):
+            self._grow()
+        for name, value in zip(self.shape_class.params, values):
+            self._data[name][self.length] = value
+        self._position[self.length] = position
+        self.length += 1
+        self._metrics.clear()
+
+    def attach(self, data, positions, metrics=None):
+        """
+        Replaces content of the column with existing arrays (e.g. views on memory-mapped file)
+        without copying them. Arrays may be read-only: first append copies them to memory.
+        param: data: dict mapping every name of `shape_class.params` to array of values
+        param: positions: array of indexes of the rows in the whole store
+        param: metrics: dict with already computed 'area' and/or 'perimeter' arrays, used as cache
+        """
+
+        self._data = dict(data)
+        self._position = positions
+        self.length = len(positions)
+        self._metrics = dict(metrics or {})
+
+    def extend(self, columns, positions):
+        """
+        Appends many rows at once
+        param: columns: dict mapping every name of `shape_class.params` to array of values
+        param: positions: array of indexes of the new rows in the whole store
+        """
+
+        count = len(positions)
+        self._grow(self.length + count)
+        for name in self.shape_class.params:
+            self._data[name][self.length:self.length + count] = columns[name]
+        self._position[self.length:self.length + count] = positions
+        self.length += count
+        self._metrics.clear()
+
+    def _grow(self, required=None):
+        capacity = 2 * len(self._position)
+        if required is not None:
+            if required <= len(self._position):
+                return
+            capacity = max(capacity, required)
+        for name, column in self._data.items():
+            self._data[name] = np.resize(column, capacity)
+        self._position = np.resize(self._position, capacity)
+
+    def column(self, name):
+        """
+        Returns view on the filled part of the parameter column
+        """
+
+        return self._data[name][:self.length]
+
+    @property
+    def positions(self):
+        """
+        Returns indexes of the rows in the whole store, in increasing order
+        """
+
+        return self._position[:self.length]
+
+    def scale(self, k):
+        """
+        Multiplies length parameters of all rows by k at once, e.g. to change units
+        Arrays are replaced, not changed, so memory-mapped files stay untouched; cached metrics
+        are rounded, so they are dropped and computed again on first use
+        """
+
+        for name in self.shape_class.length_params:
+            if name in self._data:
+                self._data[name] = self.column(name) * k
+        self._position = self.positions
+        self._metrics.clear()
+
+    def metric(self, name):
+        """
+        Calculates 'area' or 'perimeter' of every row at once. Result is cached until next append.
+        Values are rounded the same way as in Shape.get_area and Shape.get_perimeter.
+        Return: numpy array of float64
+        """
+
+        if name not in self._metrics:
+            area_kernel, perimeter_kernel = KERNELS[self.shape_class]
+            kernel = area_kernel if name == 'area' else perimeter_kernel
+            columns = [self.column(param) for param in self.shape_class.params]
+            self._metrics[name] = np.rint(kernel(*columns))
+        return self._metrics[name]
+
+    def row(self, index):
+        """
+        Returns tuple of parameters stored in given row
+        """
+
+        return tuple(float(self._data[name][index]) for name in self.shape_class.params)
+
+
+class ShapeView:
+    """
+    This class is a lightweight view on a single row of ShapeStore that acts like a Shape object.
+    isinstance() checks against its shape class pass, so views can be added to a ShapeList.
+    Parent Class: None
+    Args:
+        column (ShapeColumn): column holding the row
+        index (int): row number in the column
+    """
+
+    __slots__ = ('_column', '_index')
+
+    def __init__(self, column, index):
+        self._column = column
+        self._index = index
+
+    @property
+    def __class__(self):
+        return self._column.shape_class
+
+    def __getattr__(self, name):
+        column = self._column
+        name = ALIASES.get(column.shape_class, {}).get(name, name)
+        if name in column.shape_class.params:
+            return float(column.column(name)[self._index])
+        if name in ('area', 'perimeter'):
+            return float(column.metric(name)[self._index])
+        return getattr(column.shape_class, name)
+
+    def __setattr__(self, name, value):
+        if name in ShapeView.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            raise AttributeError("Shape views are read-only.")
+
+    def get_area(self):
+        return self._column.shape_class.get_area(self)
+
+    def get_perimeter(self):
+        return self._column.shape_class.get_perimeter(self)
+
+    def to_shape(self):
+        """
+        Builds regular Shape object with the same parameters
+        """
+
+        return self._column.shape_class(*self._column.row(self._index))
+
+    def __str__(self):
+        return self._column.shape_class.__str__(self)
+
+    def __repr__(self):
+        return '<{} view: {}>'.format(self._column.shape_class.__name__, self)
+
+
+class ShapeStore(Sequence):
+    """
+    This class holds geometrical shapes in columnar form: one set of float64 columns per shape class.
+    It is a drop-in alternative to ShapeList for very large collections.
+    Parent Class: Sequence
+    Args:
+        columns: dict mapping shape class to ShapeColumn
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self._kinds = []
+        self._class_codes = {}
+        self._order = np.empty(ShapeColumn.INITIAL_CAPACITY, dtype=np.uint8)
+        self._length = 0
+
+    @property
+    def shapes(self):
+        """
+        Store itself is a sequence of shape views, so it can replace `ShapeList.shapes`
+        """
+
+        return self
+
+    def get_shapes_table(self, fmt='table'):
+        """
+        Create table with data of all shapes; rows are not cached, unlike in ShapeList
+        """
+
+        return table.render_table(self, fmt)
+
+    write_shapes_table = ShapeList.write_shapes_table
+    iter_shapes_table = ShapeList.iter_shapes_table
+    aggregate = ShapeList.aggregate
+    query = ShapeList.query
+    select = ShapeList.select
+    from_csv = classmethod(ShapeList.from_csv.__func__)
+    from_jsonl = classmethod(ShapeList.from_jsonl.__func__)
+    from_arrays = classmethod(ShapeList.from_arrays.__func__)
+    _load = classmethod(ShapeList._load.__func__)
+
+    def save(self, path):
+        """
+        Saves store to binary columnar file, see `persistence` module
+        """
+
+        import persistence
+        persistence.save(self, path)
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        """
+        Opens file saved with `save`. With mmap=True opening doesn't read the columns:
+        they are zero-copy views on the mapped file and metrics are computed on first use.
+        """
+
+        import persistence
+        return persistence.open_store(path, mmap)
+
+    def get_length(self, start_length):
+        """
+        Calculate cell size for table, like ShapeList.get_length; cells are formatted every time
+        param: start_length: list contain cell size
+        Return start_length: list contain update cell size
+        """
+
+        return table._grow_widths(start_length, table.iter_cells(self))
+
+    def add_shape(self, shape):
+        """
+        Adds shape to the store
+        Check if shape's has Shape class as it's ancestor. If not it should raise `TypeError`
+        """
+
+        if not isinstance(shape, Shape):
+            raise TypeError
+        shape_class = type(shape) if not isinstance(shape, ShapeView) else shape.__class__
+        shape_class = getattr(shape_class, 'full_class', shape_class)
+        if shape_class not in KERNELS:
+            raise TypeError("{} has no columnar layout, only shapes with fixed parameters can be stored "
+                            "in columns.".format(shape_class.__name__))
+        column = self._column_for(shape_class)
+        column.append([getattr(shape, name) for name in shape_class.params], self._length)
+        if self._length == len(self._order):
+            self._order = np.resize(self._order, 2 * len(self._order))
+        self._order[self._length] = self._class_codes[shape_class]
+        self._length += 1
+
+    def extend_columns(self, batches):
+        """
+        Adds shapes given as parameter columns, without building Shape objects
+        param: batches: list of (shape_class, columns, rows) tuples, where `columns` maps parameter
+            names to arrays and `rows` is increasing array of row numbers used to order
+            shapes of different classes among each other; at most one batch per class
+        """
+
+        batches = [batch for batch in batches if len(batch[2])]
+        if not batches:
+            return
+        for shape_class, _, _ in batches:
+            if shape_class not in KERNELS:
+                raise TypeError("{} has no columnar layout.".format(shape_class.__name__))
+            self._column_for(shape_class)
+        rows = np.concatenate([batch[2] for batch in batches])
+        codes = np.concatenate([np.full(len(batch[2]), self._class_codes[batch[0]], dtype=np.uint8)
+                                for batch in batches])
+        codes = codes[np.argsort(rows, kind='stable')]
+        for shape_class, columns, _ in batches:
+            positions = self._length + np.flatnonzero(codes == self._class_codes[shape_class])
+            self.columns[shape_class].extend(columns, positions)
+        if self._length + len(codes) > len(self._order):
+            self._order = np.resize(self._order, max(2 * len(self._order), self._length + len(codes)))
+        self._order[self._length:self._length + len(codes)] = codes
+        self._length += len(codes)
+
+    def attach(self, sections, order):
+        """
+        Replaces content of the store with existing arrays, without copying them
+        param: sections: list of (shape_class, data, positions, metrics) tuples, see ShapeColumn.attach
+        param: order: uint8 array with number of the section of every shape, in insertion order
+        """
+
+        self.__init__()
+        for shape_class, data, positions, metrics in sections:
+            self._column_for(shape_class).attach(data, positions, metrics)
+        self._order = order
+        self._length = len(order)
+
+    def _column_for(self, shape_class):
+        if shape_class not in self.columns:
+            self._class_codes[shape_class] = len(self._kinds)
+            self._kinds.append(shape_class)
+            self.columns[shape_class] = ShapeColumn(shape_class)
+        return self.columns[shape_class]
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._length))]
+        if idx < 0:
+            idx += self._length
+        if not 0 <= idx < self._length:
+            raise IndexError("ShapeStore index out of range")
+        column = self.columns[self._kinds[self._order[idx]]]
+        row = int(np.searchsorted(column.positions, idx))
+        return ShapeView(column, row)
+
+    def __iter__(self):
+        next_row = [0] * len(self._kinds)
+        columns = [self.columns[kind] for kind in self._kinds]
+        for code in self._order[:self._length]:
+            row = next_row[code]
+            next_row[code] += 1
+            yield ShapeView(columns[code], row)
+
+    def scale(self, k):
+        """
+        Scales all shapes by factor k, one vectorized operation per parameter column
+        Raise `ValueError` if k is not above 0
+        """
+
+        _validate_scale(k)
+        for column in self.columns.values():
+            column.scale(k)
+
+    def get_areas(self, shape_class):
+        """
+        Returns numpy array with areas of all shapes of given class
+        """
+
+        return self.columns[shape_class].metric('area') if shape_class in self.columns else np.empty(0)
+
+    def get_perimeters(self, shape_class):
+        """
+        Returns numpy array with perimeters of all shapes of given class
+        """
+
+        return self.columns[shape_class].metric('perimeter') if shape_class in self.columns else np.empty(0)
+
+    def get_largest_shape_by_perimeter(self):
+        """
+        Returns shape view with largest perimeter
+        """
+
+        return self._get_largest('perimeter')
+
+    def get_largest_shape_by_area(self):
+        """
+        Returns shape view with largest area
+        """
+
+        return self._get_largest('area')
+
+    def _get_largest(self, metric):
+        """
+        Finds the first inserted shape with the largest metric, same as ShapeList does
+        """
+
+        best = None
+        for column in self.columns.values():
+            if not column.length:
+                continue
+            values = column.metric(metric)
+            row = int(np.argmax(values))
+            key = (values[row], -column.positions[row])
+            if best is None or key > best[0]:
+                best = (key, column, row)
+        if best is None:
+            return False
+        return ShapeView(best[1], best[2])
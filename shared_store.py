@@ -0,0 +1,239 @@
+import mmap
+import os
+import struct
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import persistence
+from shape_store import ShapeStore
+
+# Control segment: magic and number of the last published generation (0 before the first publish).
+# The generation number is 8-byte aligned and written with one store, so readers see either
+# the old or the new number. Generation n lives in its own segment '<name>_<n>' in the binary
+# format of `persistence` (version 2, with metric columns); it is never changed after publishing.
+MAGIC = b'SHAPESHM'
+CONTROL = struct.Struct('<8sq')
+ATTACH_RETRIES = 100
+
+# Readers must not register segments with the resource tracker, or the tracker unlinks them
+# when the reader exits. Python 3.13 has SharedMemory(track=False) for that; on older versions
+# POSIX segments are opened directly with the private _posixshmem module that SharedMemory uses
+# (Windows has no tracker for shared memory, so plain SharedMemory is fine there).
+if sys.version_info >= (3, 13) or os.name == 'nt':
+    _posixshmem = None
+else:
+    import _posixshmem
+
+
+def segment_name(name, generation):
+    return '{}_{}'.format(name, generation)
+
+
+class _Mapping:
+    """
+    Read-only mapping of existing shared memory segment
+    Args:
+        buffer: read-only buffer with content of the segment, valid until `close`
+    """
+
+    def __init__(self, name):
+        self._segment = None
+        if _posixshmem is None:
+            options = {'track': False} if sys.version_info >= (3, 13) else {}
+            self._segment = shared_memory.SharedMemory(name=name, **options)
+            self.buffer = self._segment.buf.toreadonly()
+            return
+        fd = _posixshmem.shm_open('/' + name, os.O_RDONLY, mode=0o600)
+        try:
+            self.buffer = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """
+        Unmaps the segment; `BufferError` if arrays still use it
+        """
+
+        if self._segment is None:
+            self.buffer.close()
+        else:
+            self.buffer.release()
+            self._segment.close()
+
+
+class SharedShapeWriter:
+    """
+    This class publishes shapes to shared memory, where any number of local processes can
+    attach them with SharedShapeReader. There can be only one writer of a name: creating
+    the control segment fails with FileExistsError if it already exists.
+    Every `publish` copies `store` to a new generation segment and then switches the generation
+    number in the control segment; published generations are never written again, so readers
+    need no locks. The last `keep` generations stay available for attaching, older ones are unlinked
+    (readers that already attached them keep their mappings until they refresh).
+    Parent Class: None
+    Args:
+        name (str): name of the control segment, readers attach with it
+        store: ShapeStore with shapes of the next generation, parameters stay in private memory
+        generation (int): number of the last published generation
+        keep (int): number of generations kept in shared memory
+    """
+
+    def __init__(self, name, shapes=(), keep=2):
+        if keep < 1:
+            raise ValueError("At least one generation must be kept.")
+        self.name = name
+        self.keep = keep
+        self.store = persistence.as_store(shapes)
+        self.generation = 0
+        self._segments = []
+        self._control = shared_memory.SharedMemory(name=name, create=True, size=CONTROL.size)
+        CONTROL.pack_into(self._control.buf, 0, MAGIC, 0)
+        self._published = np.frombuffer(self._control.buf, dtype=np.int64, count=1, offset=len(MAGIC))
+
+    def publish(self, shapes=()):
+        """
+        Adds shapes to `store` and publishes all of it as a new generation
+        Return: number of the new generation
+        """
+
+        for shape in shapes:
+            self.store.add_shape(shape)
+        layout = persistence.Layout(self.store, metrics=True)
+        generation = self.generation + 1
+        segment = shared_memory.SharedMemory(name=segment_name(self.name, generation), create=True,
+                                             size=layout.size)
+        persistence.write_into(layout, segment.buf)
+        self._published[0] = generation
+        self.generation = generation
+        self._segments.append(segment)
+        while len(self._segments) > self.keep:
+            self._release(self._segments.pop(0))
+        return generation
+
+    @staticmethod
+    def _release(segment):
+        segment.close()
+        segment.unlink()
+
+    def close(self):
+        """
+        Unlinks control segment and all generations; attached readers keep what they mapped
+        """
+
+        if self._control is None:
+            return
+        for segment in self._segments:
+            self._release(segment)
+        self._segments = []
+        del self._published
+        self._release(self._control)
+        self._control = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SharedShapeReader:
+    """
+    This class attaches shapes published by SharedShapeWriter read-only and without copying:
+    `store` is a ShapeStore whose parameter and metric columns are views on the shared segment,
+    so `store.get_largest_shape_by_area()`, `store.aggregate(workers=0)` or `store.query(...)`
+    run directly on the shared buffers and metrics are never computed again. Appending to `store`
+    copies the changed column into private memory.
+    `refresh` switches to the newest generation and unmaps the previous one; if views of the old
+    store are still held somewhere, it is unmapped on a later `refresh` or `close` after they are gone.
+    Parent Class: None
+    Args:
+        name (str): name used by the writer
+        store: ShapeStore of the attached generation (empty before the first publish)
+        generation (int): number of the attached generation
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._control = _Mapping(name)
+        magic, _ = CONTROL.unpack_from(self._control.buffer, 0)
+        if magic != MAGIC:
+            self._control.close()
+            raise ValueError("{} is not a shared shapes segment.".format(name))
+        self._published = np.frombuffer(self._control.buffer, dtype=np.int64, count=1, offset=len(MAGIC))
+        self._mapping = None
+        self._retired = []
+        self.generation = 0
+        self.store = ShapeStore()
+        self.refresh()
+
+    def refresh(self):
+        """
+        Attaches the last published generation
+        Return: True if `store` was replaced
+        """
+
+        for _ in range(ATTACH_RETRIES):
+            generation = int(self._published[0])
+            if generation == self.generation:
+                return False
+            try:
+                mapping = _Mapping(segment_name(self.name, generation))
+            except FileNotFoundError:
+                # the writer published again and unlinked this generation meanwhile
+                continue
+            self.store = persistence.attach_buffer(mapping.buffer, segment_name(self.name, generation))
+            self.generation = generation
+            self._retire(mapping)
+            return True
+        raise FileNotFoundError("Generation {} of {} is not available.".format(generation, self.name))
+
+    def _retire(self, mapping=None):
+        """
+        Replaces the current mapping and unmaps every previous one that no array uses anymore
+        """
+
+        if self._mapping is not None:
+            self._retired.append(self._mapping)
+        self._mapping = mapping
+        used = []
+        for old in self._retired:
+            try:
+                old.close()
+            except BufferError:
+                used.append(old)
+        self._retired = used
+
+    def close(self):
+        """
+        Drops `store` and unmaps all segments; mappings still used by views kept elsewhere stay
+        until they are garbage collected
+        """
+
+        if self._control is None:
+            return
+        self.store = ShapeStore()
+        self._retire()
+        del self._published
+        self._control.close()
+        self._control = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_largest_shape_by_area(self):
+        return self.store.get_largest_shape_by_area()
+
+    def get_largest_shape_by_perimeter(self):
+        return self.store.get_largest_shape_by_perimeter()
+
+    def aggregate(self):
+        """
+        Computes `parallel.aggregate` summary from the shared metric columns in this process
+        """
+
+        return self.store.aggregate(workers=0)
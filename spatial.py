@@ -0,0 +1,255 @@
+import heapq
+import math
+
+
+class GridIndex:
+    """
+    This class is a uniform grid over the plane answering window, point and nearest-neighbour queries.
+    Every placed shape is registered in all cells its bounding box touches, so a query only looks
+    at shapes from the cells around it. Shapes covering more than MAX_CELLS cells are kept
+    in a separate list checked by every query. Shapes that are not placed are ignored.
+    Parent Class: None
+    Args:
+        cell_size (float): width and height of one cell, about the size of a typical shape works best
+        entries: iterable of (seq, shape) pairs for bulk build
+    """
+
+    MAX_CELLS = 64
+
+    def __init__(self, cell_size, entries=()):
+        if cell_size <= 0:
+            raise ValueError("Cell size must be positive.")
+        self.cell_size = cell_size
+        self.cells = {}
+        self.large = {}
+        self.boxes = {}
+        self._extent = None
+        for seq, shape in entries:
+            self.add(shape, seq)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def _cell_range(self, box):
+        low_x, low_y = self._cell(box[0], box[1])
+        high_x, high_y = self._cell(box[2], box[3])
+        return low_x, low_y, high_x, high_y
+
+    def add(self, shape, seq):
+        """
+        Registers placed shape under unique seq (see ShapeList); shapes without position are skipped
+        """
+
+        box = shape.get_bounding_box()
+        if box is None:
+            return
+        self.boxes[seq] = box
+        low_x, low_y, high_x, high_y = self._cell_range(box)
+        if (high_x - low_x + 1) * (high_y - low_y + 1) > self.MAX_CELLS:
+            self.large[seq] = shape
+            return
+        for ix in range(low_x, high_x + 1):
+            for iy in range(low_y, high_y + 1):
+                self.cells.setdefault((ix, iy), {})[seq] = shape
+        if self._extent is None:
+            self._extent = [low_x, low_y, high_x, high_y]
+        else:
+            extent = self._extent
+            extent[:] = min(extent[0], low_x), min(extent[1], low_y), max(extent[2], high_x), max(extent[3], high_y)
+
+    def remove(self, shape, seq):
+        box = self.boxes.pop(seq, None)
+        if box is None:
+            return
+        if self.large.pop(seq, None) is not None:
+            return
+        low_x, low_y, high_x, high_y = self._cell_range(box)
+        for ix in range(low_x, high_x + 1):
+            for iy in range(low_y, high_y + 1):
+                cell = self.cells[ix, iy]
+                del cell[seq]
+                if not cell:
+                    del self.cells[ix, iy]
+
+    def _candidates(self, low_x, low_y, high_x, high_y):
+        found = dict(self.large)
+        if (high_x - low_x + 1) * (high_y - low_y + 1) > len(self.cells):
+            for (ix, iy), cell in self.cells.items():
+                if low_x <= ix <= high_x and low_y <= iy <= high_y:
+                    found.update(cell)
+        else:
+            for ix in range(low_x, high_x + 1):
+                for iy in range(low_y, high_y + 1):
+                    cell = self.cells.get((ix, iy))
+                    if cell:
+                        found.update(cell)
+        return found
+
+    def window(self, x_min, y_min, x_max, y_max):
+        """
+        Return: list of shapes whose bounding boxes intersect the window, in order of adding
+        """
+
+        found = self._candidates(*self._cell_range((x_min, y_min, x_max, y_max)))
+        hits = []
+        for seq, shape in found.items():
+            box = self.boxes[seq]
+            if _boxes_intersect(box, (x_min, y_min, x_max, y_max)):
+                hits.append((seq, shape))
+        hits.sort(key=lambda hit: hit[0])
+        return [shape for _, shape in hits]
+
+    def at_point(self, x, y):
+        """
+        Return: list of shapes containing point (x, y), in order of adding
+        """
+
+        ix, iy = self._cell(x, y)
+        found = self._candidates(ix, iy, ix, iy)
+        return [shape for seq, shape in sorted(found.items(), key=lambda item: item[0])
+                if shape.contains_point(x, y)]
+
+    def nearest(self, x, y, k=1):
+        """
+        Finds k shapes closest to point (x, y), see Shape.distance_to; cells are visited
+        in growing rings around the point until no unvisited shape can be closer
+        Return: list of (distance, shape) pairs, closest first, on ties the shape added first
+        """
+
+        if k <= 0 or not self.boxes:
+            return []
+        best = []
+        seen = set()
+
+        def consider(seq, shape):
+            seen.add(seq)
+            entry = (-shape.distance_to(x, y), -seq, shape)
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry[:2] > best[0][:2]:
+                heapq.heapreplace(best, entry)
+
+        for seq, shape in self.large.items():
+            consider(seq, shape)
+        if self._extent is not None:
+            ix, iy = self._cell(x, y)
+            low_x, low_y, high_x, high_y = self._extent
+            first = max(low_x - ix, ix - high_x, low_y - iy, iy - high_y, 0)
+            last = max(ix - low_x, high_x - ix, iy - low_y, high_y - iy, 0)
+            for ring in range(first, last + 1):
+                # shapes outside of rings visited so far are at least `ring - 1` cells away
+                if len(best) == k and -best[0][0] <= (ring - 1) * self.cell_size:
+                    break
+                for cell in _ring(ix, iy, ring, self._extent):
+                    for seq, shape in self.cells.get(cell, {}).items():
+                        if seq not in seen:
+                            consider(seq, shape)
+        return [(-distance, shape) for distance, _, shape in sorted(best, reverse=True)]
+
+    def overlaps(self):
+        """
+        Yields pairs (first added, second added) of overlapping shapes, touching shapes included.
+        Broad phase: only shapes sharing a grid cell are paired, and every pair is checked only in the cell
+        holding the lower left corner of the intersection of their bounding boxes, so no pair comes twice.
+        Narrow phase: exact test, see `shapes_overlap`. Don't change the index while iterating.
+        """
+
+        for cell_key, cell in self.cells.items():
+            entries = list(cell.items())
+            for idx, (seq, shape) in enumerate(entries):
+                box = self.boxes[seq]
+                for other_seq, other in entries[idx + 1:]:
+                    other_box = self.boxes[other_seq]
+                    if not _boxes_intersect(box, other_box):
+                        continue
+                    if self._cell(max(box[0], other_box[0]), max(box[1], other_box[1])) != cell_key:
+                        continue
+                    if shapes_overlap(shape, other):
+                        yield (shape, other) if seq < other_seq else (other, shape)
+        for seq, shape in self.large.items():
+            box = self.boxes[seq]
+            for other_seq, other in self._candidates(*self._cell_range(box)).items():
+                if other_seq in self.large and other_seq <= seq:
+                    continue
+                if _boxes_intersect(box, self.boxes[other_seq]) and shapes_overlap(shape, other):
+                    yield (shape, other) if seq < other_seq else (other, shape)
+
+
+def _ring(ix, iy, ring, extent):
+    """
+    Yields cells at Chebyshev distance `ring` from cell (ix, iy) lying inside extent (low x, low y, high x, high y)
+    """
+
+    low_x, low_y, high_x, high_y = extent
+    if not ring:
+        yield ix, iy
+        return
+    for cell_y in (iy - ring, iy + ring):
+        if low_y <= cell_y <= high_y:
+            for cell_x in range(max(ix - ring, low_x), min(ix + ring, high_x) + 1):
+                yield cell_x, cell_y
+    for cell_x in (ix - ring, ix + ring):
+        if low_x <= cell_x <= high_x:
+            for cell_y in range(max(iy - ring + 1, low_y), min(iy + ring - 1, high_y) + 1):
+                yield cell_x, cell_y
+
+
+def _boxes_intersect(first, second):
+    return first[0] <= second[2] and second[0] <= first[2] and first[1] <= second[3] and second[1] <= first[3]
+
+
+def shapes_overlap(first, second):
+    """
+    Exact intersection test of two placed shapes, touching shapes overlap.
+    Shapes without vertices are circles: circle-circle compares distance of centers with sum of radii,
+    circle-polygon compares distance from center to polygon with radius,
+    polygon-polygon uses separating axis theorem when both are convex; otherwise polygons overlap
+    if any of their edges cross or one holds a vertex of the other.
+    Return: bool
+    """
+
+    first_vertices, second_vertices = first.get_vertices(), second.get_vertices()
+    if first_vertices is None and second_vertices is None:
+        (x1, y1), (x2, y2) = first.center, second.center
+        return (x1 - x2) ** 2 + (y1 - y2) ** 2 <= (first.r + second.r) ** 2
+    if first_vertices is None:
+        return second.distance_to(*first.center) <= first.r
+    if second_vertices is None:
+        return first.distance_to(*second.center) <= second.r
+    if not (first.is_convex() and second.is_convex()):
+        return (_edges_cross(first_vertices, second_vertices) or first.contains_point(*second_vertices[0])
+                or second.contains_point(*first_vertices[0]))
+    for vertices in (first_vertices, second_vertices):
+        for (x1, y1), (x2, y2) in zip(vertices, vertices[1:] + vertices[:1]):
+            axis_x, axis_y = y1 - y2, x2 - x1
+            first_projection = [x * axis_x + y * axis_y for x, y in first_vertices]
+            second_projection = [x * axis_x + y * axis_y for x, y in second_vertices]
+            if max(first_projection) < min(second_projection) or max(second_projection) < min(first_projection):
+                return False
+    return True
+
+
+def _edges_cross(first_vertices, second_vertices):
+    """
+    Checks all pairs of edges of two polygons at once with NumPy (imported only for concave polygons)
+    """
+
+    import numpy as np
+    first, second = np.array(first_vertices), np.array(second_vertices)
+    a, b = first[:, np.newaxis, :], np.roll(first, -1, axis=0)[:, np.newaxis, :]
+    c, d = second[np.newaxis, :, :], np.roll(second, -1, axis=0)[np.newaxis, :, :]
+
+    def side(origin, end, point):
+        return np.sign((end[..., 0] - origin[..., 0]) * (point[..., 1] - origin[..., 1])
+                       - (end[..., 1] - origin[..., 1]) * (point[..., 0] - origin[..., 0]))
+
+    def boxes_meet(axis):
+        return ((np.minimum(a[..., axis], b[..., axis]) <= np.maximum(c[..., axis], d[..., axis]))
+                & (np.minimum(c[..., axis], d[..., axis]) <= np.maximum(a[..., axis], b[..., axis])))
+
+    # orientation test; the box test rejects collinear edges that don't touch
+    return bool(((side(a, b, c) * side(a, b, d) <= 0) & (side(c, d, a) * side(c, d, b) <= 0)
+                 & boxes_meet(0) & boxes_meet(1)).any())
@@ -0,0 +1,225 @@
+import functools
+
+import numpy as np
+
+import ingest
+from shape_store import KERNELS
+
+METRICS = ('area', 'perimeter')
+_NOTHING = object()
+
+
+class ShapeSource:
+    """
+    This class reads validated batches of shape parameters from a file, chunk by chunk.
+    Every iteration reads the file again and starts a new `report`.
+    Parent Class: None
+    Args:
+        path (str): .csv, .jsonl or binary file saved by ShapeStore/ShapeList `save` (memory-mapped)
+        chunk_size (int): number of records in one batch
+        report: ingest.IngestReport of the last iteration, rejected rows are skipped
+    """
+
+    def __init__(self, path, chunk_size=ingest.CHUNK_SIZE, max_errors=1000):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.report = ingest.IngestReport(max_errors)
+
+    def batches(self):
+        """
+        Return: generator of batches in the format of `ingest.iter_batches`, in the order of rows
+        """
+
+        self.report = ingest.IngestReport(self.max_errors)
+        if self.path.endswith('.csv'):
+            return ingest.iter_batches(ingest.read_csv(self.path), self.report, self.chunk_size)
+        if self.path.endswith(('.jsonl', '.json')):
+            return ingest.iter_batches(ingest.read_jsonl(self.path, self.chunk_size), self.report, self.chunk_size)
+        return self._stored_batches()
+
+    def _stored_batches(self):
+        import persistence
+        store = persistence.open_store(self.path, mmap=True)
+        columns = [column for column in store.columns.values() if column.length]
+        for start in range(0, len(store), self.chunk_size):
+            stop = start + self.chunk_size
+            batch = []
+            for column in columns:
+                low, high = np.searchsorted(column.positions, (start, stop))
+                if low < high:
+                    batch.append((column.shape_class,
+                                  {name: column.column(name)[low:high] for name in column.shape_class.params},
+                                  column.positions[low:high]))
+            self.report.loaded += sum(len(rows) for _, _, rows in batch)
+            yield batch
+
+
+class ShapeStream:
+    """
+    This class is a lazy pipeline over shapes read from a file, e.g.
+
+        geometry.stream('shapes.jsonl').filter(lambda shape: shape.area > 10).map(str).reduce(max)
+
+    Nothing is read until a terminal operation (iteration, `reduce`, `count`, `summary`, `largest`)
+    runs; then the file is read in chunks and only one chunk is kept in memory, so memory use
+    doesn't grow with the size of the file. Stages before the first `filter` or `map` work on
+    parameter columns; shape objects are built only for stages that need them.
+    Every stage returns a new stream, the original one can be used again.
+    Parent Class: None
+    Args:
+        source: ShapeSource
+        classes: shape classes kept by `of_class` applied on columns, None for all
+        stages: tuple of ('filter', predicate), ('map', function) or ('class', classes) applied on objects
+    """
+
+    def __init__(self, source, classes=None, stages=()):
+        self.source = source
+        self.classes = classes
+        self.stages = stages
+
+    @property
+    def report(self):
+        """
+        Returns ingest.IngestReport of the last run
+        """
+
+        return self.source.report
+
+    def _with(self, classes=None, stage=None):
+        if stage is None:
+            return ShapeStream(self.source, classes, self.stages)
+        return ShapeStream(self.source, self.classes, self.stages + (stage,))
+
+    def of_class(self, *classes):
+        """
+        Keeps shapes of given classes only (exact classes, like `ShapeList.get_summary`)
+        """
+
+        if self.stages:
+            return self._with(stage=('class', classes))
+        kept = set(classes) if self.classes is None else self.classes & set(classes)
+        return self._with(classes=kept)
+
+    def filter(self, predicate):
+        return self._with(stage=('filter', predicate))
+
+    def map(self, function):
+        return self._with(stage=('map', function))
+
+    def _batches(self):
+        for batch in self.source.batches():
+            if self.classes is not None:
+                batch = [entry for entry in batch if entry[0] in self.classes]
+            yield batch
+
+    def __iter__(self):
+        for batch in self._batches():
+            items = ingest.build_shapes(batch)
+            for kind, argument in self.stages:
+                if kind == 'filter':
+                    items = filter(argument, items)
+                elif kind == 'map':
+                    items = map(argument, items)
+                else:
+                    items = (item for item in items if type(item) in argument)
+            yield from items
+
+    def reduce(self, function, initial=_NOTHING):
+        """
+        Folds all items with function(accumulated, item), like functools.reduce
+        """
+
+        if initial is _NOTHING:
+            return functools.reduce(function, self)
+        return functools.reduce(function, self, initial)
+
+    def count(self):
+        if not self.stages:
+            return sum(len(rows) for batch in self._batches() for _, _, rows in batch)
+        return sum(1 for _ in self)
+
+    def largest(self, by='area'):
+        """
+        Returns shape with largest 'area' or 'perimeter', first one on ties, False if there is none
+        """
+
+        return self.summary()['largest_by_' + by]
+
+    def summary(self):
+        """
+        Computes in one pass: count, sum, mean, min and max of area and perimeter, count of every
+        class and largest shapes. Without `filter` and `map` stages metrics are computed on columns
+        and only the largest shapes are built.
+        Return: dict with 'count', 'area', 'perimeter', 'by_class', 'largest_by_area', 'largest_by_perimeter'
+        """
+
+        if any(kind == 'map' for kind, _ in self.stages):
+            raise TypeError("Summary needs shapes, but the stream was mapped.")
+        totals = _Totals()
+        if self.stages:
+            for row, shape in enumerate(self):
+                totals.add_shape(row, shape)
+        else:
+            for batch in self._batches():
+                for shape_class, columns, rows in batch:
+                    totals.add_columns(shape_class, columns, rows)
+        return totals.result()
+
+
+class _Totals:
+    """
+    Running state of `ShapeStream.summary`; largest entries are kept as (value, -row, shape),
+    where shape may be (shape class, parameters) built only at the end
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.by_class = {}
+        self.metrics = {metric: {'sum': 0.0, 'min': None, 'max': None} for metric in METRICS}
+        self.largest = {metric: None for metric in METRICS}
+
+    def _update(self, metric, total, low, high, row, shape):
+        stats = self.metrics[metric]
+        stats['sum'] += total
+        stats['min'] = low if stats['min'] is None else min(stats['min'], low)
+        stats['max'] = high if stats['max'] is None else max(stats['max'], high)
+        best = self.largest[metric]
+        if best is None or (high, -row) > best[:2]:
+            self.largest[metric] = (high, -row, shape)
+
+    def add_columns(self, shape_class, columns, rows):
+        if not len(rows):
+            return
+        self.count += len(rows)
+        self.by_class[shape_class.__name__] = self.by_class.get(shape_class.__name__, 0) + len(rows)
+        params = [columns[name] for name in shape_class.params]
+        for metric, kernel in zip(METRICS, KERNELS[shape_class]):
+            values = np.rint(kernel(*params))
+            top = int(np.argmax(values))
+            self._update(metric, float(values.sum()), float(values.min()), float(values[top]), int(rows[top]),
+                         (shape_class, tuple(float(column[top]) for column in params)))
+
+    def add_shape(self, row, shape):
+        self.count += 1
+        name = shape.__class__.__name__
+        self.by_class[name] = self.by_class.get(name, 0) + 1
+        for metric in METRICS:
+            value = getattr(shape, metric)
+            self._update(metric, value, value, value, row, shape)
+
+    def result(self):
+        result = {'count': self.count, 'by_class': self.by_class}
+        for metric in METRICS:
+            stats = dict(self.metrics[metric])
+            stats['mean'] = stats['sum'] / self.count if self.count else None
+            result[metric] = stats
+            best = self.largest[metric]
+            if not best:
+                result['largest_by_' + metric] = False
+            elif isinstance(best[2], tuple):
+                shape_class, params = best[2]
+                result['largest_by_' + metric] = shape_class(*params)
+            else:
+                result['largest_by_' + metric] = best[2]
+        return result
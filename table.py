@@ -0,0 +1,176 @@
+import csv
+import io
+import itertools
+
+TITLES = ('idx', 'Class', '__str__', 'Perimeter', 'Perimeter Formula', 'Area', 'Area Formula')
+FORMATS = ('table', 'csv', 'tsv', 'markdown')
+
+
+def iter_cells(shapes):
+    """
+    Formats every cell of shapes table exactly once
+    param: shapes: iterable of Shape objects
+    Return: generator of tuples of strings, one tuple per shape
+    """
+
+    for idx, shape in enumerate(shapes):
+        yield format_cells(idx, shape)
+
+
+def format_cells(idx, shape):
+    """
+    Return: tuple of strings, cells of table row of the shape
+    """
+
+    return (str(idx), shape.__class__.__name__, str(shape), str(round(shape.perimeter, 2)),
+            shape.get_perimeter_formula(), str(round(shape.area, 2)), shape.get_area_formula())
+
+
+def iter_lines(shapes, fmt='table'):
+    """
+    Renders shapes table line by line
+    param: shapes: iterable of Shape objects
+    param: fmt: one of 'table', 'csv', 'tsv', 'markdown'
+    Return: generator of strings, every one ending with new line
+
+    'csv', 'tsv' and 'markdown' are rendered in constant memory. 'table' pads cells to common width,
+    so it keeps formatted cells of all rows until the widths are known.
+    """
+
+    return _iter_lines_of_cells(iter_cells(shapes), fmt)
+
+
+def _iter_lines_of_cells(rows, fmt):
+    if fmt == 'table':
+        return _iter_box_lines(rows)
+    if fmt in ('csv', 'tsv'):
+        return _iter_delimited_lines(rows, ',' if fmt == 'csv' else '\t')
+    if fmt == 'markdown':
+        return _iter_markdown_lines(rows)
+    raise ValueError("Unknown table format {}. Use one of: {}.".format(fmt, ', '.join(FORMATS)))
+
+
+def write_table(shapes, out, fmt='table'):
+    """
+    Writes shapes table to file-like object
+    param: shapes: iterable of Shape objects
+    param: out: object with `write` method, e.g. opened file or sys.stdout
+    param: fmt: one of 'table', 'csv', 'tsv', 'markdown'
+    """
+
+    for line in iter_lines(shapes, fmt):
+        out.write(line)
+
+
+def render_table(shapes, fmt='table'):
+    """
+    Return: whole table as string
+    """
+
+    return ''.join(iter_lines(shapes, fmt))
+
+
+def _iter_box_lines(rows, titles=TITLES):
+    rows = list(rows)
+    widths = [width + 2 for width in _grow_widths([len(title) for title in titles], rows)]
+    return _iter_padded_box_lines((_box_row(row, widths) for row in rows), widths, titles)
+
+
+def _grow_widths(widths, rows):
+    """
+    Widens columns in place to fit cells of given rows
+    Return: widths
+    """
+
+    for row in rows:
+        for i, cell in enumerate(row):
+            if len(cell) > widths[i]:
+                widths[i] = len(cell)
+    return widths
+
+
+def _iter_padded_box_lines(lines, widths, titles=TITLES):
+    inner = sum(widths) + len(widths) - 1
+    separator = '|' + '-' * inner + '|\n'
+    yield '/' + '-' * inner + '\\\n'
+    yield _box_row(titles, widths)
+    for line in lines:
+        yield separator
+        yield line
+    yield '\\' + '-' * inner + '/\n'
+
+
+def _box_row(cells, widths):
+    return ''.join('|{:^{}}'.format(cell, width) for cell, width in zip(cells, widths)) + '|\n'
+
+
+def _iter_delimited_lines(rows, delimiter):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator='\n')
+    for row in itertools.chain([TITLES], rows):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _iter_markdown_lines(rows):
+    yield _markdown_row(TITLES)
+    yield '|' + '---|' * len(TITLES) + '\n'
+    for row in rows:
+        yield _markdown_row(row)
+
+
+def _markdown_row(cells):
+    return '| ' + ' | '.join(cell.replace('|', '\\|') for cell in cells) + ' |\n'
+
+
+class TableCache:
+    """
+    This class keeps formatted cells and padded lines of table rows between renders.
+    New shapes are formatted once; when a column gets wider only padding of cached cells is redone.
+    Parent Class: None
+    Args:
+        cells: list of tuples of formatted cells, one per rendered shape
+        widths: current width of every column, without margins
+    """
+
+    def __init__(self):
+        self.cells = []
+        self.widths = [len(title) for title in TITLES]
+        self._lines = []
+        self._line_widths = None
+
+    def update(self, shapes):
+        """
+        Formats shapes that were added since last update
+        param: shapes: the same list that was passed before, possibly with new shapes at the end
+        """
+
+        start = len(self.cells)
+        self.cells.extend(format_cells(idx, shapes[idx]) for idx in range(start, len(shapes)))
+        _grow_widths(self.widths, self.cells[start:])
+
+    def truncate(self, count):
+        """
+        Forgets rows from position `count`, e.g. because a shape was removed and indexes changed
+        """
+
+        del self.cells[count:]
+        del self._lines[count:]
+        self.widths = _grow_widths([len(title) for title in TITLES], self.cells)
+
+    def iter_lines(self, fmt='table'):
+        """
+        Renders cached rows, see `iter_lines` module function
+        """
+
+        if fmt != 'table':
+            return _iter_lines_of_cells(self.cells, fmt)
+        widths = [width + 2 for width in self.widths]
+        if widths != self._line_widths:
+            self._lines = []
+            self._line_widths = widths
+        for cells in self.cells[len(self._lines):]:
+            self._lines.append(_box_row(cells, widths))
+        return _iter_padded_box_lines(self._lines, widths)
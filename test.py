@@ -1,6 +1,26 @@
 import unittest
 import math
 from geometry import *
+from shape_store import ShapeStore
+import io
+import table
+import compact
+import os
+import tempfile
+import parallel
+import shared_store
+from benchmarks import suite
+import instrumentation
+import pstats
+import containment
+import query
+import backends
+import subprocess
+import sys
+import asyncio
+import server
+from client import ShapeClient, ServerError
+import main as main_module
 
 
 class CircleTester(unittest.TestCase):
@@ -54,6 +74,24 @@ class TriangleTester(unittest.TestCase):
         perimeter = a + b + c
         self.assertEqual(t.get_perimeter(), perimeter)
 
+    def test_needle_area(self):
+        # reference from Heron's formula in 50-digit decimal arithmetic
+        self.assertAlmostEqual(triangle_area(100000.0, 99999.99979, 0.00029) / 10.000000077021038, 1.0, places=12)
+        self.assertAlmostEqual(triangle_area(1.0, 1.0, 1e-10) / 5e-11, 1.0, places=12)
+
+    def test_area_arrays(self):
+        areas = triangle_area([3.0, 1.0, 0.0, 5.0], [4.0, 1.0, 1.0, 3.0], [5.0, 2.0, 1.0, 4.0])
+        self.assertEqual(areas[0], 6.0)
+        self.assertEqual(areas[3], 6.0)
+        self.assertTrue(math.isnan(areas[1]) and math.isnan(areas[2]))
+        self.assertTrue(math.isnan(triangle_area(1, 2, 3)))
+
+    def test_inequality_error(self):
+        with self.assertRaisesRegex(ValueError, "Triangle cant be build"):
+            Triangle(0.1, 0.2, 0.30000000000000004)
+        with self.assertRaisesRegex(ValueError, "side of triangle"):
+            Triangle(0, 1, 1)
+
 
 class EquilateralTriangleTester(unittest.TestCase):
 
@@ -152,6 +190,108 @@ class RegularPentagonTester(unittest.TestCase):
         self.assertEqual(p.get_perimeter(), perimeter)
 
 
+class RegularPolygonTester(unittest.TestCase):
+
+    def test_constructor(self):
+        p = RegularPolygon(6, 2)
+        self.assertEqual((p.n, p.a), (6, 2))
+        self.assertIsInstance(RegularPentagon(2), RegularPolygon)
+
+    def test_value_error(self):
+        for n, a in ((2, 1), (4.5, 1), (6, -1), (math.inf, 1), (math.nan, 1)):
+            with self.assertRaises(ValueError):
+                RegularPolygon(n, a)
+
+    def test_area(self):
+        self.assertEqual(RegularPolygon(6, 2).get_area(), round(6 * 2**2 / (4 * math.tan(math.pi / 6))))
+        for a in (1, 3, 7.5, 11):
+            self.assertEqual(RegularPolygon(5, a).get_area(), RegularPentagon(a).get_area())
+            self.assertEqual(RegularPolygon(4, a).get_area(), Square(a).get_area())
+
+    def test_perimeter(self):
+        self.assertEqual(RegularPolygon(7, 3).get_perimeter(), 21)
+
+    def test_coefficient_table(self):
+        self.assertIs(polygon_coefficients(9), polygon_coefficients(9))
+        self.assertAlmostEqual(polygon_coefficients(3)[0], math.sqrt(3) / 4)
+        import geometry
+        for n in range(6, 6 + 2 * geometry.POLYGON_CACHE_SIZE):
+            polygon_coefficients(n)
+        self.assertEqual(len(geometry.POLYGON_COEFFICIENTS), 3)
+        self.assertLessEqual(geometry._computed_polygon_coefficients.cache_info().currsize,
+                             geometry.POLYGON_CACHE_SIZE)
+
+    def test_vectorized(self):
+        import shape_store
+        areas, perimeters = shape_store.polygon_metrics([3, 5, 6], [2, 2, 2])
+        self.assertEqual(list(perimeters), [6, 10, 12])
+        for area, n in zip(areas, (3, 5, 6)):
+            self.assertAlmostEqual(area, polygon_coefficients(n)[0] * 4)
+
+
+class PolygonTester(unittest.TestCase):
+
+    def setUp(self):
+        self.l_shape = Polygon([(0, 0), (4, 0), (4, 1), (1, 1), (1, 4), (0, 4)])
+
+    def test_constructor(self):
+        self.assertEqual(len(self.l_shape.vertices), 12)
+        self.assertEqual(self.l_shape.center, (19 / 14, 19 / 14))
+
+    def test_value_error(self):
+        with self.assertRaises(ValueError):
+            Polygon([(0, 0), (1, 1)])
+        with self.assertRaises(ValueError):
+            Polygon([(0, 0), (1, 1), (2, 2)])
+
+    def test_area_and_perimeter(self):
+        self.assertEqual(self.l_shape.get_area(), 7)
+        self.assertEqual(self.l_shape.get_perimeter(), 16)
+        self.assertEqual(Polygon(reversed([(0, 0), (3, 0), (3, 3), (0, 3)])).get_area(), 9)
+
+    def test_convex_hull(self):
+        hull = self.l_shape.convex_hull()
+        self.assertFalse(self.l_shape.is_convex())
+        self.assertTrue(hull.is_convex())
+        self.assertEqual(hull.get_vertices(), [(0, 0), (4, 0), (4, 1), (1, 4), (0, 4)])
+
+    def test_contains(self):
+        self.assertEqual(list(self.l_shape.contains([(0.5, 3), (2, 2), (3, 0.5)])), [True, False, True])
+        self.l_shape.place(0, 0, math.pi)
+        self.assertTrue(self.l_shape.contains_point(0.85, -1.64))
+        self.assertFalse(self.l_shape.contains_point(0.5, 3))
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'footprint.txt')
+            with open(path, 'w') as file:
+                file.write('# x y\n0 0\n2,0\n\n2 2\n0 2\n')
+            self.assertEqual(Polygon.from_file(path).get_area(), 4)
+
+    def test_shape_list(self):
+        sl = ShapeList()
+        sl.extend([Square(2), self.l_shape, Square(1).place(3, 3.5)])
+        self.assertIs(sl.get_largest_shape_by_area(), self.l_shape)
+        self.assertIn('Polygon, 6 vertices', sl.get_shapes_table())
+        self.assertEqual(list(sl.find_overlaps()), [])
+
+    def test_boundary_points(self):
+        boundary = [(0, 0), (4, 0), (4, 1), (2, 1), (1, 2.5), (0, 4), (1, 4)]
+        self.assertEqual(list(self.l_shape.contains(boundary)), [True] * len(boundary))
+        self.assertFalse(self.l_shape.contains_point(4, 1.001))
+
+    def test_aggregate_and_save(self):
+        sl = ShapeList()
+        sl.extend([Square(2), self.l_shape, Circle(1)])
+        result = sl.aggregate(workers=0)
+        self.assertIs(result['largest_by_area'], self.l_shape)
+        self.assertEqual(result['by_class']['Polygon']['perimeter']['sum'], 16)
+        self.assertTrue(parallel.matches_serial(sl, workers=2, chunk_size=1))
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaisesRegex(TypeError, 'Polygon has no columnar layout'):
+                sl.save(os.path.join(directory, 'shapes.bin'))
+
+
 class ShapeListTester(unittest.TestCase):
 
     def test_constructor(self):
@@ -200,6 +340,868 @@ class ShapeListTester(unittest.TestCase):
         self.assertEqual(sl.get_largest_shape_by_area(), c)
 
 
+class AggregatesTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        self.p = RegularPentagon(3)
+        self.s = Square(5)
+        self.t = Triangle(2, 4, 5)
+        self.c = Circle(3)
+        for shape in (self.p, self.s, self.t, self.c):
+            self.sl.add_shape(shape)
+
+    def test_summary(self):
+        summary = self.sl.get_summary('area')
+        self.assertEqual(summary['count'], 4)
+        self.assertEqual(summary['sum'], self.p.area + self.s.area + self.t.area + self.c.area)
+        self.assertEqual(summary['max'], self.c.area)
+        self.assertEqual(summary['min'], self.t.area)
+        self.assertEqual(self.sl.get_summary('perimeter', Square)['mean'], self.s.perimeter)
+
+    def test_remove_shape(self):
+        self.sl.remove_shape(self.c)
+        self.assertEqual(self.sl.get_largest_shape_by_area(), self.s)
+        self.assertEqual(self.sl.get_summary('area')['count'], 3)
+        self.assertEqual(self.sl.get_summary('area', Circle)['count'], 0)
+        with self.assertRaises(ValueError):
+            self.sl.remove_shape(self.c)
+
+    def test_per_class(self):
+        big = Square(10)
+        self.sl.add_shape(big)
+        self.assertEqual(self.sl.get_largest_shape_by_area(Square), big)
+        self.assertEqual(self.sl.get_smallest_shape_by_perimeter(Square), self.s)
+        self.assertFalse(self.sl.get_largest_shape_by_area(Rectangle))
+
+    def test_first_added_wins_ties(self):
+        sl = ShapeList()
+        first, second = Square(2), Square(2)
+        sl.add_shape(first)
+        sl.add_shape(second)
+        self.assertIs(sl.get_largest_shape_by_area(), first)
+        sl.remove_shape(first)
+        self.assertIs(sl.get_largest_shape_by_area(), second)
+        sl.remove_shape(second)
+        self.assertFalse(sl.get_largest_shape_by_area())
+
+
+class OrderIndexTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        self.squares = [Square(a) for a in (3, 1, 4, 1, 5, 9, 2, 6)]
+        self.sl.extend(self.squares)
+
+    def test_top_k(self):
+        self.assertEqual([s.a for s in self.sl.top_k('area', 3)], [9, 6, 5])
+        self.sl.add_shape(Square(7))
+        self.assertEqual([s.a for s in self.sl.top_k('perimeter', 2)], [9, 7])
+
+    def test_shapes_between(self):
+        self.assertEqual([s.a for s in self.sl.shapes_between('area', 4, 25)], [2, 3, 4, 5])
+
+    def test_rank_and_percentile(self):
+        self.assertEqual(self.sl.rank(self.squares[5]), 0)
+        self.assertEqual(self.sl.rank(self.squares[1]), 6)
+        self.assertEqual(self.sl.percentile('area', 50), 9)
+        self.assertEqual(self.sl.percentile('area', 100), 81)
+
+    def test_remove_updates_index(self):
+        self.sl.top_k('area', 1)
+        self.sl.remove_shape(self.squares[5])
+        self.assertEqual([s.a for s in self.sl.top_k('area', 1)], [6])
+        self.assertIsNone(ShapeList().percentile('area', 50))
+
+
+class SpatialTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        self.circle = Circle(1).place(0, 0)
+        self.square = Square(2).place(5, 5, math.pi / 4)
+        self.triangle = Triangle(3, 4, 5).place(20, 0)
+        self.sl.extend([self.circle, self.square, Rectangle(1, 2), self.triangle])
+
+    def test_placement(self):
+        self.assertEqual(self.circle.get_bounding_box(), (-1, -1, 1, 1))
+        self.assertIsNone(Rectangle(1, 2).get_bounding_box())
+        self.assertAlmostEqual(self.square.get_bounding_box()[2], 5 + math.sqrt(2))
+        self.assertTrue(self.square.contains_point(5, 6.4))
+        self.assertFalse(self.square.contains_point(6, 6))
+        self.assertEqual(len(RegularPentagon(1).place(0, 0).get_vertices()), 5)
+
+    def test_window(self):
+        self.assertEqual(self.sl.shapes_in_window(-2, -2, 6, 6), [self.circle, self.square])
+        self.assertEqual(self.sl.shapes_in_window(100, 100, 200, 200), [])
+
+    def test_point(self):
+        self.assertEqual(self.sl.shapes_at(0.5, 0.5), [self.circle])
+        self.assertEqual(self.sl.shapes_at(3, 3), [])
+
+    def test_nearest(self):
+        self.assertEqual(self.sl.nearest_shapes(4, 4, 2), [self.square, self.circle])
+        self.assertEqual(self.sl.nearest_shapes(30, 0), [self.triangle])
+        self.assertAlmostEqual(self.circle.distance_to(3, 4), 4)
+
+    def test_index_is_updated(self):
+        self.sl.build_spatial_index(cell_size=0.5)
+        far = Circle(1).place(100, 100)
+        self.sl.add_shape(far)
+        self.assertEqual(self.sl.shapes_at(100, 100), [far])
+        self.sl.remove_shape(self.circle)
+        self.assertEqual(self.sl.nearest_shapes(0, 0), [self.square])
+
+    def test_find_overlaps(self):
+        touching = Circle(1).place(2, 0)
+        big = Rectangle(100, 1).place(0, 20)
+        self.sl.extend([touching, Square(1).place(5, 6.5), big, Circle(1).place(-30, 20)])
+        self.sl.build_spatial_index(cell_size=1)
+        pairs = list(self.sl.find_overlaps())
+        self.assertEqual(len(pairs), 3)
+        self.assertIn((self.circle, touching), pairs)
+        self.assertIn((self.square, self.sl.shapes[5]), pairs)
+        self.assertIn((big, self.sl.shapes[7]), pairs)
+        self.assertFalse(list(ShapeList().find_overlaps()))
+
+
+class ContainmentTester(unittest.TestCase):
+
+    def setUp(self):
+        self.shapes = [Circle(2).place(1, 2, 0.3), Triangle(3, 4, 5).place(-1, 0, 1),
+                       EquilateralTriangle(3).place(0, 1, 2), Rectangle(2, 4).place(1, 1, 0.5),
+                       Square(3).place(0, 0, 0.7), RegularPentagon(2).place(0.5, 0.5, 1.1), Square(1)]
+        self.points = [(x / 4, y / 4) for x in range(-16, 17) for y in range(-16, 17)]
+
+    def test_contains_matches_contains_point(self):
+        for shape in self.shapes:
+            self.assertEqual(list(shape.contains(self.points)), [shape.contains_point(x, y) for x, y in self.points])
+
+    def test_shape_list_contains(self):
+        sl = ShapeList()
+        sl.extend(self.shapes)
+        mask = sl.contains(self.points)
+        self.assertEqual(mask.shape, (len(self.shapes), len(self.points)))
+        for row, shape in zip(mask, self.shapes):
+            self.assertEqual(list(row), list(shape.contains(self.points)))
+        self.assertFalse(mask[-1].any())
+        with self.assertRaises(ValueError):
+            sl.contains([1, 2, 3])
+
+    def test_estimate_area(self):
+        for shape in self.shapes + [compact.Triangle(3, 4, 5)]:
+            self.assertAlmostEqual(containment.estimate_area(shape, 200000, seed=1), shape.area, delta=0.6)
+
+
+class ServerTester(unittest.TestCase):
+
+    def run_with_client(self, scenario):
+        async def run():
+            shape_server = await server.ShapeServer().start('127.0.0.1', 0)
+            client = await ShapeClient.connect('127.0.0.1', shape_server.port)
+            try:
+                return await scenario(client)
+            finally:
+                await client.close()
+                await shape_server.close()
+        return asyncio.run(run())
+
+    def test_add_and_query(self):
+        async def scenario(client):
+            added = await client.add([Circle(2), {'class': 'Square', 'a': 3}, {'class': 'Circle', 'r': -1}])
+            self.assertEqual(added['added'], 2)
+            self.assertEqual([row for row, _ in added['errors']], [2])
+            self.assertEqual(await client.count(), 2)
+            self.assertEqual(await client.largest('area'), {'class': 'Circle', 'r': 2.0})
+            self.assertEqual((await client.summary())['perimeter']['max'], 13)
+            self.assertEqual((await client.aggregate())['count'], 2)
+            self.assertIn('Square', await client.table('csv'))
+        self.run_with_client(scenario)
+
+    def test_pipelining(self):
+        async def scenario(client):
+            results = await asyncio.gather(*(client.add([Square(a)]) for a in range(1, 51)))
+            self.assertEqual(sum(result['added'] for result in results), 50)
+            self.assertEqual(await client.largest('perimeter'), {'class': 'Square', 'a': 50.0})
+        self.run_with_client(scenario)
+
+    def test_errors(self):
+        async def scenario(client):
+            with self.assertRaises(ServerError):
+                await client.request('drop')
+            with self.assertRaises(ServerError):
+                await client.largest('volume')
+            self.assertIsNone(await client.largest())
+        self.run_with_client(scenario)
+
+    def test_malformed_requests(self):
+        shape_server = server.ShapeServer()
+        self.assertFalse(shape_server.handle([1])['ok'])
+        response = shape_server.handle({'id': 1, 'op': 'add', 'shapes': [{'class': 'RegularPolygon', 'n': 1e300,
+                                                                          'a': 1}]})
+        self.assertEqual(response['id'], 1)
+        self.assertEqual(shape_server.handle({'id': 2, 'op': 'count'})['result'], 0)
+
+
+class InterningTester(unittest.TestCase):
+
+    def setUp(self):
+        self.interner = ShapeInterner(capacity=2)
+
+    def test_shared_instance(self):
+        circle = self.interner.make(Circle, 2.5)
+        self.assertIs(self.interner.make(Circle, 2.5), circle)
+        self.assertIsNot(self.interner.make(Square, 2.5), circle)
+        self.assertIsInstance(circle, Circle)
+        self.assertEqual((circle.area, str(circle)), (20, "Circle, r = 2.5"))
+        self.assertEqual(self.interner.stats()['hits'], 1)
+        self.assertEqual(self.interner.stats()['misses'], 2)
+
+    def test_read_only(self):
+        square = make(Square, 3)
+        with self.assertRaises(AttributeError):
+            square.a = 4
+        with self.assertRaises(AttributeError):
+            square.place(0, 0)
+        with self.assertRaises(ValueError):
+            make(Square, -3)
+
+    def test_lru(self):
+        first = self.interner.make(Circle, 1)
+        self.interner.make(Circle, 2)
+        self.interner.make(Circle, 1)
+        self.interner.make(Circle, 3)
+        self.assertIs(self.interner.make(Circle, 1), first)
+        self.assertEqual(self.interner.stats()['evictions'], 1)
+        self.assertEqual(self.interner.stats()['size'], 2)
+
+    def test_shape_list(self):
+        sl = ShapeList()
+        sl.extend([make(Square, 3), make(Square, 3), Square(2)])
+        self.assertEqual(sl.get_summary('area', Square)['count'], 3)
+        self.assertIs(sl.get_largest_shape_by_area(Square), sl.shapes[0])
+        sl.remove_shape(sl.shapes[0])
+        self.assertEqual(len(sl.shapes), 2)
+
+    def test_load_interned(self):
+        sl, report = ShapeList.from_arrays(Circle, {'r': [1.0, 2.0, 1.0, 1.0]}, intern=True)
+        self.assertIs(sl.shapes[0], sl.shapes[3])
+        self.assertIsNot(sl.shapes[0], sl.shapes[1])
+
+
+class BackendTester(unittest.TestCase):
+
+    def tearDown(self):
+        backends.use('auto')
+
+    def test_backends_agree(self):
+        columns = {'a': [3, 5.5, 10, 7.25], 'b': [4, 5.5, 10, 8], 'c': [5, 5.5, 10.5, 9]}
+        python = compute_metrics(Triangle, columns, 'python')
+        numpy_areas, numpy_perimeters = compute_metrics(Triangle, columns, 'numpy')
+        self.assertEqual(python[0], [Triangle(*sides).area for sides in zip(*columns.values())])
+        self.assertEqual(python, ([float(area) for area in numpy_areas], [float(p) for p in numpy_perimeters]))
+
+    def test_selection(self):
+        self.assertEqual(backends.use('python').name, 'python')
+        self.assertEqual(backends.current().name, 'python')
+        self.assertEqual(compute_metrics(Square, {'a': [2, 3]}), ([4, 9], [8, 12]))
+        with self.assertRaises(ValueError):
+            backends.use('fortran')
+
+    def test_invalid_rows(self):
+        for backend in backends.BACKENDS:
+            with self.assertRaises(ValueError):
+                compute_metrics(Circle, {'r': [1, -1]}, backend)
+            with self.assertRaises(ValueError):
+                compute_metrics(Circle, {'r': [1, float('nan')]}, backend)
+
+    def test_lazy_import(self):
+        code = "import geometry, sys; print('numpy' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=dict(os.environ, GEOMETRY_BACKEND='numpy'))
+        self.assertEqual(output.stdout.strip(), 'False')
+
+
+class StreamingTester(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'shapes.csv')
+        with open(self.path, 'w') as file:
+            file.write('class,r,a,b,c\nCircle,2,,,\nSquare,,5,,\nTriangle,,1,1,5\nCircle,3,,,\n'
+                       'Square,,4,,\nCircle,-1,,,\nRectangle,,2,8,\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_summary_matches_shape_list(self):
+        sl, _ = ShapeList.from_csv(self.path)
+        summary = stream(self.path, chunk_size=2).summary()
+        self.assertEqual(summary['count'], 5)
+        self.assertEqual(summary['by_class'], {'Circle': 2, 'Square': 2, 'Rectangle': 1})
+        self.assertEqual(summary['area']['sum'], sum(shape.area for shape in sl.shapes))
+        self.assertEqual(str(summary['largest_by_area']), str(sl.get_largest_shape_by_area()))
+        self.assertEqual(str(summary['largest_by_perimeter']), "Square, a = 5.0")
+
+    def test_filter_map_reduce(self):
+        shapes = stream(self.path, chunk_size=3)
+        self.assertEqual(shapes.of_class(Circle).map(lambda circle: circle.r).reduce(max), 3.0)
+        self.assertEqual(shapes.filter(lambda shape: shape.area > 20).map(str).reduce(lambda a, b: a + '; ' + b),
+                         "Square, a = 5.0; Circle, r = 3.0")
+        self.assertEqual(shapes.filter(lambda shape: shape.area > 20).count(), 2)
+        self.assertEqual(str(shapes.filter(lambda shape: shape.area < 20).largest()), "Square, a = 4.0")
+        self.assertEqual(shapes.filter(lambda shape: False).largest(), False)
+        with self.assertRaises(TypeError):
+            shapes.map(str).summary()
+
+    def test_report(self):
+        shapes = stream(self.path)
+        self.assertEqual(shapes.count(), 5)
+        self.assertEqual(sorted(row for row, _ in shapes.report.errors), [4, 7])
+
+    def test_stored_file(self):
+        sl, _ = ShapeList.from_csv(self.path)
+        path = os.path.join(self.directory.name, 'shapes.bin')
+        sl.save(path)
+        self.assertEqual([str(shape) for shape in stream(path, chunk_size=2)], [str(shape) for shape in sl.shapes])
+        self.assertEqual(stream(path).of_class(Square, Rectangle).summary()['area']['sum'], 57)
+
+
+class QueryTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        self.sl.extend([Circle(6), Square(12), Square(3), Triangle(3, 4, 5), Circle(1), RegularPolygon(7, 3),
+                        Rectangle(2, 8), EquilateralTriangle(5)])
+
+    def test_matches_loop(self):
+        found = self.sl.query('class in (Circle, Square) and area > 100 and perimeter < 50')
+        self.assertEqual(found, [shape for shape in self.sl.shapes if type(shape) in (Circle, Square)
+                                 and shape.area > 100 and shape.perimeter < 50])
+        self.assertEqual([str(shape) for shape in found], ["Circle, r = 6", "Square, a = 12"])
+
+    def test_fields_and_operators(self):
+        self.assertEqual(len(self.sl.query('class != Circle and not (area < 10 or perimeter >= 48)')), 3)
+        self.assertEqual([str(s) for s in self.sl.query('n >= 5 or c == 5')],
+                         ["Triangle, a = 3, b = 4, c = 5", "Regular polygon, n = 7, a = 3", "Equilateral Triangle, a = 5"])
+        self.assertEqual(len(self.sl.query('a == b')), 3)
+        self.assertEqual(len(self.sl.query('area / perimeter > 2 * 1.25')), 2)
+
+    def test_columns_follow_changes(self):
+        self.assertEqual(len(self.sl.query('r > 0')), 2)
+        self.sl.add_shape(Circle(2))
+        self.sl.remove_shape(self.sl.shapes[0])
+        self.assertEqual([s.r for s in self.sl.query('r > 0')], [1, 2])
+
+    def test_missing_fields(self):
+        self.assertEqual([str(s) for s in self.sl.query('r != 2')], ["Circle, r = 6", "Circle, r = 1"])
+        self.assertEqual([str(s) for s in self.sl.query('not r == 6')], ["Circle, r = 1"])
+        self.assertEqual(len(self.sl.query('not (r > 100 or b > 100)')), 0)
+        self.assertEqual(len(self.sl.query('not (r > 100 and b > 100)')), 7)
+        self.assertEqual(len(self.sl.query('not not r == 6')), 1)
+        self.assertEqual(len(self.sl.query('not class == Circle')), 6)
+
+    def test_shape_views(self):
+        store = ShapeStore()
+        for shape in self.sl.shapes:
+            store.add_shape(shape)
+        views = ShapeList()
+        views.extend(store)
+        self.assertEqual([str(s) for s in views.query('class == Circle')], ["Circle, r = 6.0", "Circle, r = 1.0"])
+        self.assertEqual([str(s) for s in views.query('r > 1')], ["Circle, r = 6.0"])
+        self.assertEqual(len(views.query('a == b')), 3)
+
+    def test_select(self):
+        selected = self.sl.select('class not in (Triangle, RegularPolygon) and area < 40', 'class', 'area', 'b')
+        self.assertEqual(list(selected['class']), ['Square', 'Circle', 'Rectangle', 'EquilateralTriangle'])
+        self.assertEqual(list(selected['area']), [9, 3, 16, 11])
+        self.assertTrue(math.isnan(selected['b'][1]))
+        self.assertEqual(selected['b'][0], 3)
+
+    def test_store(self):
+        store = ShapeStore()
+        for shape in self.sl.shapes:
+            store.add_shape(shape)
+        self.assertEqual([s.area for s in store.query('area > 30')], [113, 144, 33])
+        self.assertEqual(list(store.select('area > 30', 'perimeter')['perimeter']), [38, 48, 21])
+
+    def test_explain(self):
+        self.assertEqual(query.compile('class == Square and area > 100').explain([Square, Circle]),
+                         ["Square: (a * a) > 100", "Circle: False"])
+
+    def test_value_error(self):
+        for text in ('area >', 'area', 'class > 3', 'diameter < 3', 'r in (Circle)', '(area < 3', 'area $ 3'):
+            with self.assertRaises(ValueError):
+                self.sl.query(text)
+
+
+class ScaleTester(unittest.TestCase):
+
+    def setUp(self):
+        self.shapes = [Circle(3), Triangle(3, 4, 5), EquilateralTriangle(2), Rectangle(2, 7), Square(1.5),
+                       RegularPentagon(2), RegularPolygon(9, 1.5)]
+
+    def test_shape_scale(self):
+        circle = Circle(3).place(1, 2).scale(2)
+        self.assertEqual((circle.r, circle.area, circle.perimeter, circle.center), (6, Circle(6).area, 38, (2, 4)))
+        with self.assertRaises(ValueError):
+            Circle(3).scale(0)
+
+    def test_backends_match_new_shapes(self):
+        for backend in ('python', 'numpy'):
+            for shape in self.shapes:
+                type(shape).scale_many([shape], 2.5, backend)
+        for shape in self.shapes:
+            scaled = type(shape)(*(getattr(shape, name) for name in shape.params))
+            self.assertEqual((shape.area, shape.perimeter), (scaled.area, scaled.perimeter), str(shape))
+        self.assertEqual(str(self.shapes[2]), "Equilateral Triangle, a = 12.5")
+        self.assertEqual(self.shapes[6].n, 9)
+
+    def test_shape_list(self):
+        sl = ShapeList()
+        sl.extend(self.shapes + [self.shapes[0], make(Square, 2), compact.Square(2)])
+        sl.build_index('area')
+        sl.scale(2)
+        self.assertEqual(str(sl.shapes[0]), "Circle, r = 6")
+        self.assertIs(sl.shapes[8], make(Square, 4))
+        self.assertEqual(sl.shapes[9].area, 16)
+        self.assertEqual(sl.get_summary('area')['sum'], sum(shape.area for shape in sl.shapes))
+        self.assertEqual(sl.top_k('area', 1), [sl.shapes[0]])
+        self.assertIn('Circle, r = 6', sl.get_shapes_table())
+
+    def test_polygon(self):
+        polygon = Polygon([(0, 0), (4, 0), (0, 4)]).scale(2)
+        self.assertEqual((polygon.area, polygon.get_vertices()[2]), (32, (0.0, 8.0)))
+
+    def test_store(self):
+        store = ShapeStore()
+        for shape in self.shapes:
+            store.add_shape(shape)
+        store.get_largest_shape_by_area()
+        store.scale(2)
+        self.assertEqual([view.area for view in store], [type(shape)(*(2 * getattr(shape, name) if name != 'n' else
+                                                                        shape.n for name in shape.params)).area
+                                                         for shape in self.shapes])
+
+    def test_shape_views(self):
+        store = ShapeStore()
+        store.add_shape(Circle(2))
+        sl = ShapeList()
+        sl.extend([Square(2), store[0]])
+        with self.assertRaisesRegex(TypeError, 'read-only view'):
+            sl.scale(2)
+        self.assertEqual(sl.shapes[0].a, 2)
+
+
+class SharedStoreTester(unittest.TestCase):
+
+    def setUp(self):
+        self.name = 'shapes_test_{}'.format(os.getpid())
+        self.writer = shared_store.SharedShapeWriter(self.name, [Square(5), Circle(3), Triangle(2, 4, 5)])
+        self.writer.publish()
+
+    def tearDown(self):
+        self.writer.close()
+
+    def test_attach(self):
+        reader = shared_store.SharedShapeReader(self.name)
+        self.assertEqual(reader.generation, 1)
+        self.assertEqual(str(reader.get_largest_shape_by_area()), "Circle, r = 3.0")
+        self.assertEqual(str(reader.get_largest_shape_by_perimeter()), "Square, a = 5.0")
+        result = reader.aggregate()
+        self.assertEqual(result['area']['sum'], Square(5).area + Circle(3).area + Triangle(2, 4, 5).area)
+        self.assertEqual(str(result['largest_by_area']), "Circle, r = 3.0")
+        self.assertEqual(len(reader.store.query('area > 20')), 2)
+
+    def test_read_only(self):
+        column = shared_store.SharedShapeReader(self.name).store.columns[Circle]
+        self.assertFalse(column.column('r').flags.writeable)
+        self.assertFalse(column.metric('area').flags.writeable)
+        self.assertEqual(column.metric('area').tolist(), [Circle(3).area])
+
+    def test_generation_swap(self):
+        reader = shared_store.SharedShapeReader(self.name)
+        old = reader.store
+        self.writer.publish([Square(20)])
+        self.writer.publish([Circle(1)])
+        self.writer.publish()
+        self.assertEqual(str(reader.get_largest_shape_by_area()), "Circle, r = 3.0")
+        self.assertTrue(reader.refresh())
+        self.assertFalse(reader.refresh())
+        self.assertEqual(reader.generation, 4)
+        self.assertEqual(len(reader.store), 5)
+        self.assertEqual(str(reader.get_largest_shape_by_area()), "Square, a = 20.0")
+        self.assertEqual(str(old.get_largest_shape_by_area()), "Circle, r = 3.0")
+        reader.close()
+
+    def test_unmap_old_generations(self):
+        with shared_store.SharedShapeReader(self.name) as reader:
+            areas = reader.store.columns[Circle].metric('area')
+            self.writer.publish([Square(20)])
+            reader.refresh()
+            self.assertEqual(len(reader._retired), 1)
+            self.assertEqual(list(areas), [Circle(3).area])
+            del areas
+            self.writer.publish()
+            reader.refresh()
+            self.assertEqual(reader._retired, [])
+
+    def test_other_process(self):
+        code = ("import shared_store; reader = shared_store.SharedShapeReader({!r}); "
+                "print(reader.get_largest_shape_by_area())".format(self.name))
+        for _ in range(2):
+            output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+            self.assertEqual(output.stdout.strip(), "Circle, r = 3.0", output.stderr)
+
+    def test_single_writer(self):
+        with self.assertRaises(FileExistsError):
+            shared_store.SharedShapeWriter(self.name)
+
+    def test_closed(self):
+        self.writer.close()
+        with self.assertRaises(FileNotFoundError):
+            shared_store.SharedShapeReader(self.name)
+
+
+class CompactShapeTester(unittest.TestCase):
+
+    def test_no_dict(self):
+        for compact_class in compact.COMPACT_CLASSES.values():
+            self.assertFalse(hasattr(compact_class(*([3] * len(compact_class.params))), '__dict__'))
+
+    def test_same_metrics(self):
+        for shape in (Circle(3), Triangle(2, 4, 5), EquilateralTriangle(2), Rectangle(2, 3), Square(2),
+                      RegularPentagon(3)):
+            small = compact.to_compact(shape)
+            self.assertEqual(type(small).__name__, type(shape).__name__)
+            self.assertEqual((small.area, small.perimeter), (shape.area, shape.perimeter))
+            self.assertEqual(str(small), str(shape))
+
+    def test_lazy_cache_invalidation(self):
+        c = compact.Circle(3)
+        self.assertIsNone(c._area)
+        self.assertEqual(c.get_area(), Circle(3).area)
+        c.r = 4
+        self.assertIsNone(c._area)
+        self.assertEqual(c.area, Circle(4).area)
+
+    def test_value_error(self):
+        with self.assertRaises(ValueError):
+            compact.Triangle(1, 1, 5)
+        with self.assertRaises(ValueError):
+            compact.Square(-1)
+
+    def test_place(self):
+        for shape in (Circle(3), Triangle(3, 4, 5), Square(2), RegularPentagon(3), RegularPolygon(6, 2)):
+            small = compact.to_compact(shape).place(1, 2, 0.5)
+            shape.place(1, 2, 0.5)
+            self.assertEqual(small.get_bounding_box(), shape.get_bounding_box())
+            self.assertEqual(small.distance_to(20, 20), shape.distance_to(20, 20))
+            self.assertEqual(list(small.contains([(1, 2), (20, 20)])), [True, False])
+        sl = ShapeList()
+        sl.extend([compact.Circle(2).place(0, 0), compact.Square(2).place(2.5, 0), compact.Square(1).place(9, 9)])
+        self.assertEqual([(str(a), str(b)) for a, b in sl.find_overlaps()], [("Circle, r = 2", "Square, a = 2")])
+
+
+class IngestTester(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    def test_from_csv(self):
+        path = self.write('shapes.csv', 'class,r,a,b,c\nCircle,2,,,\nTriangle,,1,1,5\nSquare,,3,,\n'
+                                        'Hexagon,,1,,\nTriangle,,2,4,5\n')
+        sl, report = ShapeList.from_csv(path, chunk_size=2)
+        self.assertEqual([str(s) for s in sl.shapes],
+                         ['Circle, r = 2.0', 'Square, a = 3.0', 'Triangle, a = 2.0, b = 4.0, c = 5.0'])
+        self.assertEqual(report.loaded, 3)
+        self.assertEqual(sorted(row for row, _ in report.errors), [3, 5])
+
+    def test_from_jsonl(self):
+        path = self.write('shapes.jsonl', '{"class": "Circle", "r": 2}\n\n{"class": "Circle", "r": -2}\n'
+                                          '{"class": "Rectangle", "a": 2}\nnot json\n')
+        store, report = ShapeStore.from_jsonl(path)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(sorted(report.errors)[0], (3, "Circle radius value is incorrect."))
+        self.assertEqual(sorted(row for row, _ in report.errors), [3, 4, 5])
+
+    def test_jsonl_line_with_several_values(self):
+        path = self.write('shapes.jsonl', '{"class": "Square", "a": 1}\n1, {"class": "Square", "a": 2}\n'
+                                          '{"class": "Circle", "r": 3}\n')
+        sl, report = ShapeList.from_jsonl(path)
+        self.assertEqual([str(s) for s in sl.shapes], ['Square, a = 1.0', 'Circle, r = 3.0'])
+        self.assertEqual([row for row, _ in report.errors], [2])
+
+    def test_unhashable_class_and_infinite_values(self):
+        path = self.write('shapes.jsonl', '{"class": ["Circle"], "r": 1}\n{"class": "Circle", "r": "inf"}\n'
+                                          '{"class": "Square", "a": 1e999}\n{"class": {}, "a": 1}\n'
+                                          '{"class": "Circle", "r": 2}\n')
+        sl, report = ShapeList.from_jsonl(path)
+        self.assertEqual([str(s) for s in sl.shapes], ['Circle, r = 2.0'])
+        self.assertEqual(sorted(row for row, _ in report.errors), [1, 2, 3, 4])
+
+    def test_list_values(self):
+        path = self.write('shapes.jsonl', '{"class": "Circle", "r": [2]}\n{"class": "Circle", "r": [3]}\n'
+                                          '{"class": "Square", "a": 1}\n')
+        sl, report = ShapeList.from_jsonl(path)
+        self.assertEqual([str(s) for s in sl.shapes], ['Square, a = 1.0'])
+        self.assertEqual(sorted(row for row, _ in report.errors), [1, 2])
+
+    def test_from_arrays(self):
+        sl, report = ShapeList.from_arrays(Triangle, {'a': [3, 1], 'b': [4, 1], 'c': [5, 5]})
+        self.assertEqual(len(sl.shapes), 1)
+        self.assertEqual(report.error_count, 1)
+        self.assertFalse(report.ok)
+
+
+class PersistenceTester(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'shapes.bin')
+        self.sl = ShapeList()
+        for shape in (RegularPentagon(3.0), Square(5.0), Triangle(2.0, 4.0, 5.0), Circle(3.0), Circle(1.5)):
+            self.sl.add_shape(shape)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_store_round_trip(self):
+        self.sl.save(self.path)
+        store = ShapeStore.open(self.path)
+        self.assertEqual([str(view.to_shape()) for view in store], [str(shape) for shape in self.sl.shapes])
+        self.assertEqual(str(store.get_largest_shape_by_area()), "Circle, r = 3.0")
+        store.add_shape(Square(10))
+        self.assertEqual(str(store.get_largest_shape_by_area()), "Square, a = 10.0")
+
+    def test_shape_list_round_trip(self):
+        self.sl.save(self.path)
+        loaded = ShapeList.open(self.path, mmap=False)
+        self.assertEqual([shape.area for shape in loaded.shapes], [shape.area for shape in self.sl.shapes])
+        self.assertIsInstance(loaded.shapes[2], Triangle)
+
+    def test_wrong_file(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            ShapeStore.open(self.path)
+
+
+class ParallelTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        for shape in (RegularPentagon(3), Square(5), Triangle(2, 4, 5), Circle(3), Square(1), Circle(1)):
+            self.sl.add_shape(shape)
+
+    def test_serial(self):
+        result = self.sl.aggregate(workers=0, chunk_size=1)
+        self.assertEqual(result['count'], 6)
+        self.assertEqual(result['area']['sum'], sum(shape.area for shape in self.sl.shapes))
+        self.assertIs(result['largest_by_area'], self.sl.get_largest_shape_by_area())
+        self.assertIs(result['largest_by_perimeter'], self.sl.get_largest_shape_by_perimeter())
+        self.assertEqual(result['by_class']['Square']['count'], 2)
+        self.assertEqual(result['by_class']['Circle']['perimeter']['min'], Circle(1).perimeter)
+
+    def test_process_pool_matches_serial(self):
+        self.assertTrue(parallel.matches_serial(self.sl, workers=2, chunk_size=1))
+        store = ShapeStore()
+        for shape in self.sl.shapes:
+            store.add_shape(shape)
+        self.assertTrue(parallel.matches_serial(store, workers=2, chunk_size=1))
+
+    def test_small_collection_in_process(self):
+        from unittest import mock
+        with mock.patch.object(parallel, 'ProcessPoolExecutor', side_effect=AssertionError("pool started")):
+            self.assertEqual(self.sl.aggregate()['count'], 6)
+        self.assertTrue(parallel.matches_serial(self.sl, workers=2, chunk_size=1))
+
+    def test_empty(self):
+        result = ShapeList().aggregate()
+        self.assertEqual(result['count'], 0)
+        self.assertFalse(result['largest_by_area'])
+
+
+class BenchmarkSuiteTester(unittest.TestCase):
+
+    def test_run(self):
+        result = suite.run(['construct', 'largest_by_area'], [10], 1)
+        self.assertEqual(sorted(result['results']), ['construct[10]', 'largest_by_area[10]'])
+
+    def test_compare(self):
+        baseline = {'results': {'a[10]': 1.0, 'b[10]': 1.0, 'c[10]': 1.0}}
+        current = {'results': {'a[10]': 1.05, 'b[10]': 1.5, 'd[10]': 9.0}}
+        self.assertEqual([key for key, *_ in suite.compare(current, baseline, 0.1)], ['b[10]'])
+
+
+class InstrumentationTester(unittest.TestCase):
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled_by_default(self):
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertNotIn('__wrapped__', vars(Circle.get_area))
+
+    def test_context_manager(self):
+        sl = ShapeList()
+        with instrumentation.instrumented() as stats:
+            sl.add_shape(Circle(2))
+            sl.add_shape(Square(2))
+            sl.get_shapes_table()
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertEqual(stats['ShapeList.add_shape']['calls'], 2)
+        self.assertEqual(stats['Circle.get_area']['calls'], 1)
+        self.assertEqual(stats['Square.__str__']['calls'], 1)
+        self.assertGreaterEqual(stats['Circle.__init__']['total'], stats['Circle.__init__']['own'])
+        self.assertEqual(sl.stats(), stats)
+
+    def test_export(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with instrumentation.instrumented():
+                Circle(2)
+            path = os.path.join(directory, 'geometry.prof')
+            instrumentation.export_pstats(path)
+            self.assertEqual(pstats.Stats(path).total_calls, 3)
+            path = os.path.join(directory, 'geometry.json')
+            instrumentation.export_json(path)
+            with open(path) as file:
+                self.assertIn('Circle.get_perimeter', file.read())
+
+
+class BatchModeTester(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, 'shapes.jsonl')
+        self.output = os.path.join(self.directory.name, 'report.csv')
+        with open(self.input, 'w') as file:
+            file.write('{"class": "Circle", "r": 3}\n{"class": "Square", "a": 5}\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_batch(self, *args):
+        code = main_module.run_batch(['run', '--input', self.input, '--output', self.output] + list(args))
+        with open(self.output) as file:
+            return code, file.read().splitlines()
+
+    def test_reports(self):
+        for engine in ('store', 'list'):
+            code, lines = self.run_batch('--report', 'count,largest-perimeter', '--format', 'csv', '--engine', engine)
+            self.assertEqual(code, 0)
+            self.assertEqual(lines[0], '2')
+            self.assertTrue(lines[2].startswith('0,Square,"Square, a = 5'))
+
+    def test_table(self):
+        code, lines = self.run_batch('--report', 'table', '--format', 'tsv')
+        self.assertEqual(len(lines), 3)
+
+    def test_unknown_report(self):
+        with self.assertRaises(SystemExit):
+            main_module.run_batch(['run', '--input', self.input, '--report', 'everything'])
+
+
+class ShapeStoreTester(unittest.TestCase):
+
+    def setUp(self):
+        self.shapes = [RegularPentagon(3), Square(5), Triangle(2, 4, 5), Circle(3), EquilateralTriangle(2)]
+        self.store = ShapeStore()
+        for shape in self.shapes:
+            self.store.add_shape(shape)
+
+    def test_type_error(self):
+        with self.assertRaises(TypeError):
+            self.store.add_shape("dupa")
+
+    def test_views_act_like_shapes(self):
+        self.assertEqual(len(self.store), len(self.shapes))
+        for view, shape in zip(self.store, self.shapes):
+            self.assertIsInstance(view, type(shape))
+            self.assertEqual(view.get_area(), shape.get_area())
+            self.assertEqual(view.area, shape.area)
+            self.assertEqual(view.perimeter, shape.perimeter)
+        self.assertEqual(str(self.store[4]), "Equilateral Triangle, a = 2.0")
+
+    def test_column_metrics(self):
+        self.assertEqual(list(self.store.get_areas(Circle)), [Circle(3).area])
+        self.assertEqual(list(self.store.get_perimeters(Square)), [20])
+
+    def test_largest(self):
+        self.assertEqual(str(self.store.get_largest_shape_by_area()), "Circle, r = 3.0")
+        self.assertEqual(str(self.store.get_largest_shape_by_perimeter()), "Square, a = 5.0")
+        self.assertFalse(ShapeStore().get_largest_shape_by_area())
+
+    def test_shapes_table(self):
+        self.assertIsInstance(self.store.get_shapes_table(), str)
+
+    def test_get_length(self):
+        shape_list = ShapeList()
+        for view in self.store:
+            shape_list.add_shape(view.to_shape())
+        titles = [len(title) for title in table.TITLES]
+        self.assertEqual(self.store.get_length(list(titles)), shape_list.get_length(list(titles)))
+        self.assertEqual(ShapeStore().get_length(list(titles)), titles)
+
+
+class TableTester(unittest.TestCase):
+
+    def setUp(self):
+        self.sl = ShapeList()
+        self.sl.add_shape(Square(4))
+        self.sl.add_shape(Circle(2))
+
+    def test_box_table(self):
+        lines = self.sl.get_shapes_table().splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(len(set(len(line) for line in lines)), 1)
+        self.assertIn('Square, a = 4', lines[3])
+        self.assertEqual(lines[5].split('|')[1].strip(), '1')
+
+    def test_csv(self):
+        out = io.StringIO()
+        self.sl.write_shapes_table(out, 'csv')
+        self.assertEqual(out.getvalue().splitlines()[1], '0,Square,"Square, a = 4",16,4 * a,16,a * a')
+
+    def test_generator(self):
+        lines = list(self.sl.iter_shapes_table('markdown'))
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[2].startswith('| 0 | Square |'))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            table.render_table(self.sl.shapes, 'xml')
+
+    def test_cached_rows(self):
+        self.sl.get_shapes_table()
+        self.sl.add_shape(Triangle(2, 4, 5.123456))
+        self.assertEqual(self.sl.get_shapes_table(), table.render_table(self.sl.shapes))
+        self.sl.remove_shape(self.sl.shapes[2])
+        self.assertEqual(self.sl.get_shapes_table(), table.render_table(self.sl.shapes))
+        self.assertEqual(self.sl.get_shapes_table('csv'), table.render_table(self.sl.shapes, 'csv'))
+
+    def test_new_rows_are_formatted_once(self):
+        self.sl.get_shapes_table()
+        cache = self.sl._table
+        cached = list(cache.cells)
+        self.sl.add_shape(Circle(1))
+        self.sl.get_shapes_table()
+        self.assertEqual(len(cache.cells), 3)
+        self.assertTrue(all(new is old for new, old in zip(cache.cells, cached)))
+
+
 def main():
     unittest.main(verbosity=2)
 